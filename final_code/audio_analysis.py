@@ -0,0 +1,262 @@
+"""Audio analysis on decoded PCM, with NumPy and no GUI.
+
+WAV files are decoded with the standard library; other formats need the
+optional ``soundfile`` package (libsndfile). Without it ``open_pcm``
+returns None for them and callers fall back to showing nothing.
+
+Readers offer random access (``block``, for the visualizer) and one
+sequential pass over the file (``chunks``, for ``envelope``; with
+``mono=False`` it keeps the channels apart, for loudness).
+"""
+
+import threading
+import wave
+
+import numpy as np
+
+
+class WavReader:
+    """Random-access PCM blocks from a PCM WAV file, mixed down to mono."""
+
+    def __init__(self, path):
+        self._wav = wave.open(path, "rb")
+        self.rate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.width = self._wav.getsampwidth()
+        self.frames = self._wav.getnframes()
+
+    def block(self, position_ms, size):
+        """``size`` mono float32 samples starting at ``position_ms`` (zero padded at the end)."""
+        start = min(max(0, int(position_ms * self.rate / 1000)), max(0, self.frames - 1))
+        self._wav.setpos(start)
+        mono = self._mono(self._wav.readframes(size))
+        if len(mono) < size:
+            mono = np.pad(mono, (0, size - len(mono)))
+        return mono
+
+    def chunks(self, size, mono=True):
+        """The whole file from the start, as mono chunks of ``size`` samples (the last may be shorter).
+
+        With ``mono=False`` chunks are (frames, channels) arrays instead.
+        """
+        self._wav.rewind()
+        while True:
+            raw = self._wav.readframes(size)
+            if not raw:
+                return
+            yield self._mono(raw) if mono else self._frames(raw)
+
+    def _mono(self, raw):
+        return self._frames(raw).mean(axis=1)
+
+    def _frames(self, raw):
+        if self.width == 1:
+            samples = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+        elif self.width == 3:
+            # 24-bit: widen each sample to int32 by hand
+            b = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+            samples = ((b[:, 0] << 8 | b[:, 1] << 16 | b[:, 2] << 24) >> 8).astype(np.float32) / (1 << 23)
+        else:
+            dtype = "<i2" if self.width == 2 else "<i4"
+            samples = np.frombuffer(raw, dtype).astype(np.float32) / (1 << (8 * self.width - 1))
+        return samples[: len(samples) // self.channels * self.channels].reshape(-1, self.channels)
+
+    def close(self):
+        self._wav.close()
+
+
+class SoundFileReader:
+    """Random-access PCM blocks through libsndfile (FLAC, Ogg, and MP3 on recent builds)."""
+
+    def __init__(self, path):
+        import soundfile
+
+        self._file = soundfile.SoundFile(path)
+        self.rate = self._file.samplerate
+        self.channels = self._file.channels
+        self.frames = self._file.frames
+
+    def block(self, position_ms, size):
+        start = min(max(0, int(position_ms * self.rate / 1000)), max(0, self.frames - 1))
+        self._file.seek(start)
+        mono = self._file.read(size, dtype="float32", always_2d=True).mean(axis=1)
+        if len(mono) < size:
+            mono = np.pad(mono, (0, size - len(mono)))
+        return mono
+
+    def chunks(self, size, mono=True):
+        self._file.seek(0)
+        for block in self._file.blocks(size, dtype="float32", always_2d=True):
+            yield block.mean(axis=1) if mono else block
+
+    def close(self):
+        self._file.close()
+
+
+def open_pcm(path):
+    """A PCM reader for ``path``, or None if it cannot be decoded here."""
+    if path.lower().endswith(".wav"):
+        try:
+            return WavReader(path)
+        except (wave.Error, EOFError, OSError):
+            pass  # e.g. float WAV; libsndfile may still read it
+    try:
+        return SoundFileReader(path)
+    except Exception:
+        # soundfile missing, or a format this libsndfile cannot decode
+        return None
+
+
+class Spectrum:
+    """Log-spaced band levels (0..1) from blocks of mono samples.
+
+    Levels fall back gradually (``decay`` per frame) instead of jumping,
+    which is what makes bars look smooth at a low frame rate.
+    """
+
+    def __init__(self, bands=48, block_size=2048, floor_db=-70.0, decay=0.85, low_hz=40.0, high_hz=16000.0):
+        self.bands = bands
+        self.block_size = block_size
+        self.floor_db = floor_db
+        self.decay = decay
+        self.low_hz = low_hz
+        self.high_hz = high_hz
+        self.window = np.hanning(block_size).astype(np.float32)
+        self.levels = np.zeros(bands, np.float32)
+        self._edges = None
+        self._rate = None
+
+    def reset(self):
+        self.levels = np.zeros(self.bands, np.float32)
+
+    def _band_edges(self, rate):
+        bins = self.block_size // 2 + 1
+        hz_per_bin = rate / self.block_size
+        low = max(1, int(self.low_hz / hz_per_bin))
+        high = min(bins - 1, int(min(self.high_hz, rate / 2) / hz_per_bin))
+        edges = np.geomspace(low, high, self.bands + 1).astype(np.int64)
+        # at least one bin per band, even where log spacing is finer than a bin
+        edges = np.maximum(edges, np.arange(self.bands + 1) + low)
+        return np.minimum(edges, bins - 1)
+
+    def update(self, samples, rate):
+        if rate != self._rate:
+            self._edges = self._band_edges(rate)
+            self._rate = rate
+        magnitudes = np.abs(np.fft.rfft(samples * self.window))[: self._edges[-1] + 1]
+        peaks = np.maximum.reduceat(magnitudes, self._edges[:-1])
+        db = 20 * np.log10(peaks / (self.block_size / 4) + 1e-9)
+        levels = np.clip((db - self.floor_db) / -self.floor_db, 0, 1).astype(np.float32)
+        self.levels = np.maximum(levels, self.levels * self.decay)
+        return self.levels
+
+
+class SpectrumFeed:
+    """``Spectrum`` levels of the playing track, read and transformed on a background thread.
+
+    ``set_track(path)`` and ``request(position_ms)`` only hand the work
+    over; the thread opens the file, reads the block at the latest
+    requested position and runs the FFT. ``levels`` is always the newest
+    finished result, ready to draw. A request made while the thread is
+    still busy replaces the one waiting, so slow storage drops frames
+    instead of queueing them.
+    """
+
+    def __init__(self, bands=48, open_reader=open_pcm):
+        self.spectrum = Spectrum(bands)
+        self.levels = self.spectrum.levels
+        self.computed = 0
+        self._open_reader = open_reader
+        self._cond = threading.Condition()
+        self._path = None
+        self._new_track = False
+        self._position = None
+        self._closed = False
+        self._thread = None
+
+    def set_track(self, path):
+        with self._cond:
+            self._path = path
+            self._new_track = True
+            self._position = None
+            self.levels = np.zeros(self.spectrum.bands, np.float32)
+            self._wake()
+
+    def request(self, position_ms):
+        with self._cond:
+            self._position = position_ms
+            self._wake()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    # -------------- helpers -----------------
+
+    def _wake(self):
+        if self._closed:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="spectrum-feed", daemon=True)
+            self._thread.start()
+        self._cond.notify()
+
+    def _run(self):
+        reader = None
+        try:
+            while True:
+                with self._cond:
+                    while not (self._closed or self._new_track or self._position is not None):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    path, new_track = self._path, self._new_track
+                    position, self._position = self._position, None
+                    self._new_track = False
+                if new_track:
+                    if reader is not None:
+                        reader.close()
+                    reader = self._open_reader(path) if path else None
+                    self.spectrum.reset()
+                if reader is None or position is None:
+                    continue
+                try:
+                    levels = self.spectrum.update(reader.block(position, self.spectrum.block_size), reader.rate)
+                except Exception:
+                    # a damaged file: no bars for this track rather than a dead thread
+                    reader.close()
+                    reader = None
+                    continue
+                with self._cond:
+                    if not self._new_track:
+                        self.levels = levels
+                self.computed += 1
+        finally:
+            if reader is not None:
+                reader.close()
+
+
+def envelope(reader, points=1024, chunk_frames=1 << 16):
+    """Peak and RMS of ``points`` equal slices of a track, as a (points, 2) float16 array.
+
+    The file is streamed once in chunks of about ``chunk_frames`` samples,
+    each a whole number of slices, so only one chunk is held in memory
+    however long the track is.
+    """
+    per_point = max(1, -(-reader.frames // points))
+    size = per_point * max(1, chunk_frames // per_point)
+    levels = np.zeros((points, 2), np.float32)
+    point = 0
+    for chunk in reader.chunks(size):
+        count = min(-(-len(chunk) // per_point), points - point)
+        if count <= 0:
+            break  # the header undercounted the frames
+        chunk = chunk[: count * per_point]
+        if len(chunk) < count * per_point:
+            chunk = np.pad(chunk, (0, count * per_point - len(chunk)))
+        slices = chunk.reshape(count, per_point)
+        levels[point:point + count, 0] = np.abs(slices).max(axis=1)
+        levels[point:point + count, 1] = np.sqrt(np.square(slices).mean(axis=1))
+        point += count
+    return levels.astype(np.float16)
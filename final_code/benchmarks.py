@@ -0,0 +1,1359 @@
+"""Benchmarks for the music player.
+
+Run from this folder:
+    python benchmarks.py                 # everything
+    python benchmarks.py playlist_rebuild
+"""
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+WORDS = (
+    "love night blue fire dance heart rain summer dream city gold wild river "
+    "light shadow electric sweet broken moon road home sky stone echo ghost "
+    "paper glass ocean storm silver midnight velvet neon thunder crystal"
+).split()
+
+
+def iter_synthetic_paths(count, folders=500, seed=1):
+    """Fake library paths: a few words per title, spread over artist folders."""
+    rng = random.Random(seed)
+    for i in range(count):
+        title = " ".join(rng.sample(WORDS, rng.randint(2, 4))).title()
+        ext = rng.choice((".mp3", ".mp3", ".flac", ".ogg", ".wav"))
+        folder = f"/music/artist_{rng.randrange(folders):04d}"
+        yield os.path.join(folder, f"{i % 20 + 1:02d} - {title}{ext}")
+
+
+def synthetic_paths(count, folders=500, seed=1):
+    return list(iter_synthetic_paths(count, folders, seed))
+
+
+def _id3_frame(frame_id, text):
+    body = b"\x01" + text.encode("utf-16")
+    return frame_id + struct.pack(">I", len(body)) + b"\0\0" + body
+
+
+def _vorbis_comment(fields):
+    entries = [f"{key}={value}".encode() for key, value in fields.items()]
+    return (struct.pack("<I", 6) + b"tester" + struct.pack("<I", len(entries))
+            + b"".join(struct.pack("<I", len(e)) + e for e in entries))
+
+
+def _ogg_page(packet, granule=0):
+    lacing = bytes([255] * (len(packet) // 255) + [len(packet) % 255])
+    return (b"OggS\0\0" + struct.pack("<qII", granule, 1, 0) + b"\0\0\0\0"
+            + bytes([len(lacing)]) + lacing + packet)
+
+
+def write_sample_file(path, title, artist, album, seconds):
+    """Write a small but well-formed audio file whose headers describe ``seconds`` of audio."""
+    ext = os.path.splitext(path)[1]
+    fields = {"TITLE": title, "ARTIST": artist, "ALBUM": album}
+    with open(path, "wb") as f:
+        if ext == ".mp3":
+            frames = b"".join(_id3_frame(i, v) for i, v in ((b"TIT2", title), (b"TPE1", artist), (b"TALB", album)))
+            size = len(frames)
+            f.write(b"ID3\3\0\0" + bytes([(size >> 21) & 127, (size >> 14) & 127, (size >> 7) & 127, size & 127]))
+            f.write(frames)
+            # MPEG-1 layer III, 128 kbps, 44.1 kHz: 417 byte frames of 1152 samples
+            frame = b"\xff\xfb\x90\x00" + bytes(413)
+            f.write(frame * int(seconds * 44100 / 1152))
+        elif ext == ".wav":
+            info = b"INFO"
+            for key, value in ((b"INAM", title), (b"IART", artist), (b"IPRD", album)):
+                value = value.encode() + b"\0"
+                info += key + struct.pack("<I", len(value)) + value + b"\0" * (len(value) & 1)
+            data = bytes(int(seconds * 8000) * 2)  # 8 kHz mono 16-bit
+            fmt = struct.pack("<HHIIHH", 1, 1, 8000, 16000, 2, 16)
+            body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+                    + b"LIST" + struct.pack("<I", len(info)) + info
+                    + b"data" + struct.pack("<I", len(data)) + data)
+            f.write(b"RIFF" + struct.pack("<I", len(body)) + body)
+        elif ext == ".flac":
+            packed = (44100 << 44) | (1 << 41) | (15 << 36) | int(seconds * 44100)
+            streaminfo = struct.pack(">HH", 4096, 4096) + bytes(6) + packed.to_bytes(8, "big") + bytes(16)
+            comment = _vorbis_comment(fields)
+            f.write(b"fLaC" + b"\x00" + len(streaminfo).to_bytes(3, "big") + streaminfo)
+            f.write(b"\x84" + len(comment).to_bytes(3, "big") + comment)
+            f.write(bytes(4096))
+        elif ext == ".ogg":
+            ident = b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, 44100, 0, 128000, 0) + b"\xb8\x01"
+            f.write(_ogg_page(ident) + _ogg_page(b"\x03vorbis" + _vorbis_comment(fields) + b"\x01"))
+            f.write(bytes(4096) + _ogg_page(b"", granule=int(seconds * 44100)))
+
+
+def write_sample_corpus(folder, count, seed=1):
+    """``count`` tagged files across all supported formats; returns their paths."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        ext = (".mp3", ".wav", ".flac", ".ogg")[i % 4]
+        path = os.path.join(folder, f"{i:06d}{ext}")
+        title = " ".join(rng.sample(WORDS, 2)).title()
+        write_sample_file(path, title, f"Artist {i % 50}", f"Album {i % 200}", rng.uniform(1, 4))
+        paths.append(path)
+    return paths
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+# -------------- benchmarks -----------------
+
+def bench_playlist_rebuild(sizes=(1_000, 10_000, 100_000, 1_000_000), listbox_limit=100_000):
+    """Rebuild time of the virtual playlist vs. the old ListBox Clear/Append loop."""
+    import wx
+    from playlist_view import PlaylistView
+    from track_store import TrackStore
+
+    app = wx.App(False)
+    frame = wx.Frame(None)
+    listbox = wx.ListBox(frame)
+
+    print(f"{'tracks':>10} {'virtual (ms)':>14} {'filtered (ms)':>14} {'listbox (ms)':>14}")
+    for size in sizes:
+        tracks = TrackStore()
+        tracks.extend(iter_synthetic_paths(size))
+        names = [tracks.name(i) for i in range(size)]
+        view = PlaylistView(frame, tracks)
+
+        def rebuild_virtual():
+            view.set_rows(range(len(tracks)))
+
+        def rebuild_filtered():
+            view.set_rows([i for i, name in enumerate(names) if "fire" in name.lower()])
+
+        def rebuild_listbox():
+            listbox.Clear()
+            for name in names:
+                listbox.Append(name)
+
+        virtual_ms = timed(rebuild_virtual)
+        filtered_ms = timed(rebuild_filtered)
+        if size <= listbox_limit:
+            listbox_ms = f"{timed(rebuild_listbox):14.2f}"
+        else:
+            listbox_ms = f"{'skipped':>14}"
+        print(f"{size:>10} {virtual_ms:14.2f} {filtered_ms:14.2f} {listbox_ms}")
+        view.Destroy()
+
+    frame.Destroy()
+    app.Destroy()
+
+
+def bench_search(size=1_000_000, typed=("midnight fire", "gho", "ne", "neon rain")):
+    """Per-keystroke filter time of the gram index vs. a linear scan."""
+    from row_map import RowMap
+    from search_index import SearchIndex
+
+    names = [os.path.basename(p) for p in synthetic_paths(size)]
+    index = SearchIndex()
+    index.extend(names)
+    build_ms = timed(index.index_pending)
+    print(f"indexed {size} names in {build_ms:.0f} ms")
+
+    lowered = [name.lower() for name in names]
+    print(f"{'query':>16} {'matches':>9} {'index (ms)':>11} {'scan (ms)':>10}")
+    for text in typed:
+        index.search("")
+        for end in range(1, len(text) + 1):
+            query = text[:end]
+            start = time.perf_counter()
+            result = index.search(query)
+            index_ms = (time.perf_counter() - start) * 1000
+            scan_ms = timed(lambda: [i for i, n in enumerate(lowered) if query in n])
+            print(f"{query!r:>16} {len(result):>9} {index_ms:11.2f} {scan_ms:10.2f}")
+
+    # a few tracks removed: the unfiltered view stays a range minus those, not a list
+    for track_id in range(0, size, max(1, size // 10)):
+        index.remove(track_id)
+    for query in ("", "m"):
+        start = time.perf_counter()
+        result = index.search(query)
+        index_ms = (time.perf_counter() - start) * 1000
+        row_ms = timed(lambda: RowMap(result).row_of(size - 1))
+        print(f"{query!r:>16} {len(result):>9} {index_ms:11.2f}  after removing 10 tracks; row_of {row_ms:.2f} ms")
+
+
+def bench_fuzzy_search(sizes=(10_000, 100_000, 1_000_000), limit=500, runs=5,
+                       queries=("midnight", "midnigth", "mi", "neon thundr", "velvet ghost", "kavorin")):
+    """Ranked fuzzy query latency against library size, top-``limit`` heap vs. sorting every match.
+
+    Names come from ``synthetic_paths``; artists and albums are synthetic
+    tags, with artists drawn from a few thousand made-up words so the
+    vocabulary is not just the title words.
+    """
+    from fuzzy_search import FuzzyIndex
+    from search_index import SearchIndex
+
+    rng = random.Random(5)
+    syllables = ("ka", "vo", "rin", "mel", "dra", "zu", "tes", "lio", "nar", "pe")
+    artists = sorted({"".join(rng.choice(syllables) for _ in range(3)) for _ in range(5_000)})
+
+    for size in sizes:
+        names = SearchIndex()
+        names.extend(os.path.basename(p) for p in iter_synthetic_paths(size))
+        fuzzy = FuzzyIndex(names)
+        fuzzy.add_tags(
+            (i, None, rng.choice(artists).title(), " ".join(rng.sample(WORDS, 2)).title()) for i in range(size)
+        )
+        build_ms = timed(fuzzy.index_pending)
+        print(f"{size} tracks: index built in {build_ms:.0f} ms")
+        print(f"{'query':>16} {'matches':>9} {'substring':>10} {'fuzzy':>9} {'sort all':>9}  (median ms)")
+        for query in queries:
+            def median(func):
+                return sorted(timed(func) for _ in range(runs))[runs // 2]
+
+            substring_ms = median(lambda: names.search(query))
+            fuzzy_ms = median(lambda: fuzzy.search(query, limit))
+            matches = len(fuzzy.search(query, size))
+            sort_ms = median(lambda: fuzzy.search(query, size))
+            print(f"{query!r:>16} {matches:>9} {substring_ms:10.2f} {fuzzy_ms:9.2f} {sort_ms:9.2f}")
+        print()
+
+
+def bench_track_lookup(size=100_000, copies=4, steps=2_000):
+    """Next/prev row lookups by basename (old) vs. the RowMap (new).
+
+    Every file exists in ``copies`` folders, so basename lookups are not
+    just slow but land on the wrong copy; the run checks RowMap gets them right.
+    """
+    from row_map import RowMap
+
+    unique = [os.path.basename(p) for p in synthetic_paths(size // copies)]
+    tracks = [f"/music/folder_{c}/{name}" for c in range(copies) for name in unique]
+    names = [os.path.basename(p) for p in tracks]
+    every_other = list(range(0, len(tracks), 2))
+
+    for label, rows in (("unfiltered", range(len(tracks))), ("filtered", every_other)):
+        row_map = RowMap(rows)
+        shown = [names[t] for t in rows]
+        targets = [rows[(i * 7919) % len(rows)] for i in range(steps)]
+
+        def by_basename():
+            wrong = 0
+            for track in targets:
+                row = shown.index(names[track])
+                wrong += rows[row] != track
+            return wrong
+
+        def by_row_map():
+            for track in targets:
+                assert row_map.track_at(row_map.row_of(track)) == track
+
+        start = time.perf_counter()
+        wrong = by_basename()
+        old_us = (time.perf_counter() - start) * 1e6 / steps
+        start = time.perf_counter()
+        by_row_map()
+        new_us = (time.perf_counter() - start) * 1e6 / steps
+        print(f"{label:>10}: basename {old_us:9.1f} us/lookup ({wrong}/{steps} wrong)   "
+              f"row map {new_us:6.2f} us/lookup (0 wrong)")
+
+
+def bench_track_memory(size=1_000_000):
+    """Memory held by the library: two string lists (old) vs. TrackStore (new)."""
+    import tracemalloc
+    from track_store import TrackStore
+
+    def parallel_lists():
+        tracks = list(iter_synthetic_paths(size))
+        display_names = [os.path.basename(p) for p in tracks]
+        return tracks, display_names
+
+    def track_store():
+        store = TrackStore()
+        store.extend(iter_synthetic_paths(size))
+        return store
+
+    for label, build in (("lists", parallel_lists), ("TrackStore", track_store)):
+        tracemalloc.start()
+        kept = build()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>12}: {current / 2**20:8.1f} MiB held, {peak / 2**20:8.1f} MiB peak, "
+              f"{current / size:6.1f} bytes/track")
+        del kept
+
+
+def bench_cold_start(size=100_000):
+    """Time to rebuild the library from the database, before any widget work."""
+    import tempfile
+    from library_db import LibraryDB, MetadataPager
+    from search_index import SearchIndex
+    from track_store import TrackStore
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "library.db")
+        tracks = TrackStore()
+        tracks.extend(iter_synthetic_paths(size))
+        library = LibraryDB(path)
+        library.add_tracks(tracks, 0, size)
+        library.save_snapshot(tracks)
+        library.close()
+
+        start = time.perf_counter()
+        library = LibraryDB(path)
+        tracks = TrackStore()
+        names = library.load_tracks(tracks)
+        loaded_ms = (time.perf_counter() - start) * 1000
+        index = SearchIndex()
+        index.extend(names)
+        metadata = MetadataPager(library)
+        for track_id in range(40):  # one screenful of rows
+            metadata.get(track_id)
+        ready_ms = (time.perf_counter() - start) * 1000
+        index_ms = timed(index.index_pending)
+        library.close()
+
+    print(f"{size} tracks: store loaded in {loaded_ms:.0f} ms, "
+          f"ready to show in {ready_ms:.0f} ms, "
+          f"search index built in the background in {index_ms:.0f} ms")
+
+
+def bench_folder_scan(folders=400, files_per_folder=50):
+    """Streaming folder import over a generated tree of empty audio files."""
+    import tempfile
+    import threading
+    from folder_import import FolderScanner
+
+    with tempfile.TemporaryDirectory() as root:
+        for f in range(folders):
+            folder = os.path.join(root, f"artist_{f % 40:02d}", f"album_{f:04d}")
+            os.makedirs(folder)
+            for i in range(files_per_folder):
+                ext = (".mp3", ".flac", ".txt")[i % 3]
+                open(os.path.join(folder, f"{i:02d} - track{ext}"), "w").close()
+
+        for workers in (1, 4, 8, 16):
+            done = threading.Event()
+            batches = []
+            start = time.perf_counter()
+
+            def on_batch(paths, progress):
+                batches.append((time.perf_counter() - start, len(paths)))
+
+            scanner = FolderScanner([root], on_batch, lambda progress, cancelled: done.set(), workers=workers)
+            scanner.start()
+            done.wait()
+            total_ms = (time.perf_counter() - start) * 1000
+            first_ms = batches[0][0] * 1000 if batches else float("nan")
+            found = sum(count for _, count in batches)
+            print(f"{workers:>2} workers: {found} tracks in {total_ms:7.1f} ms, "
+                  f"first batch after {first_ms:5.1f} ms, {len(batches)} batches")
+
+
+def bench_metadata(count=4_000, workers=(1, 2, 4, None)):
+    """Tag-reading throughput: serial, through the process pool, and on a cached re-import."""
+    import tempfile
+    import threading
+    from metadata import MetadataPipeline, read_metadata
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_sample_corpus(folder, count)
+
+        seconds = timed(lambda: [read_metadata(p) for p in paths]) / 1000
+        print(f"{'serial':>10}: {count / seconds:8.0f} files/s")
+
+        jobs = [(i, path, None, None) for i, path in enumerate(paths)]
+        for worker_count in workers:
+            done = threading.Event()
+            results = []
+            pipeline = MetadataPipeline(results.extend, done.set, workers=worker_count, batch_size=128)
+            start = time.perf_counter()
+            pipeline.submit(jobs)
+            done.wait()
+            seconds = time.perf_counter() - start
+            pipeline.close()
+            label = f"{worker_count or os.cpu_count()} procs"
+            print(f"{label:>10}: {count / seconds:8.0f} files/s (including pool start-up)")
+
+        # a re-import with every file already in the cache only stats them
+        cached = [(track_id, paths[track_id], mtime, size) for track_id, mtime, size, _ in results]
+        done = threading.Event()
+        reread = []
+        pipeline = MetadataPipeline(reread.extend, done.set, batch_size=128)
+        start = time.perf_counter()
+        pipeline.submit(cached)
+        done.wait()
+        seconds = time.perf_counter() - start
+        pipeline.close()
+        print(f"{'cached':>10}: {count / seconds:8.0f} files/s, {len(reread)} files re-parsed")
+
+
+def bench_progress(length_ms=240_000, pixels=(200, 500, 1200), seconds=60):
+    """Widget updates per minute of playback: 250 ms polling (old) vs. the event-driven clock (new)."""
+    from playback_clock import PlaybackClock, ProgressDisplay
+
+    # old: every tick called GetState, Length and Tell, then SetRange, SetValue and SetLabel
+    ticks = seconds * 1000 // 250
+    print(f"{'polling':>10}: {ticks:5d} wakeups/min, {3 * ticks:5d} backend calls, {3 * ticks:5d} widget updates")
+
+    for width in pixels:
+        now = [0.0]
+        clock = PlaybackClock(clock=lambda: now[0])
+        clock.length = length_ms
+        clock.sync(0, True)
+        progress = ProgressDisplay()
+        backend_calls = 0
+        shown = set()
+        while now[0] * 1000 < seconds * 1000:
+            if clock.needs_resync():
+                clock.sync(clock.position())
+                backend_calls += 1
+            pos = clock.position()
+            label, _ = progress.changes(pos, length_ms, width)
+            if label:
+                shown.add(pos // 1000)
+            now[0] += progress.next_change_in(pos, length_ms, width) / 1000
+        assert shown == set(range(seconds)), "a second was never shown"
+        stats = progress.stats()
+        updates = stats["label_updates"] + stats["slider_updates"]
+        print(f"{width:>7} px: {stats['wakeups']:5d} wakeups/min, {backend_calls:5d} backend calls, "
+              f"{updates:5d} widget updates")
+
+
+def bench_seek(drag_ms=2_000, event_every_ms=4, length_ms=240_000, settle=0.15):
+    """Backend seeks for one slider drag: a seek per EVT_SLIDER (old) vs. the SeekCoalescer (new).
+
+    The backend is a NullBackend, which counts the seeks it is asked for;
+    the coalescer's flush timer is simulated on a fake clock.
+    """
+    from playback_clock import SeekCoalescer
+    from player_core import NullBackend
+
+    events = drag_ms // event_every_ms
+    print(f"{'per event':>10}: {events + 1:5d} seeks for a {drag_ms} ms drag ({events} EVT_SLIDER + release)")
+
+    now = [0.0]
+    backend = NullBackend(track_length=length_ms, clock=lambda: now[0])
+    backend.load("drag.mp3")
+    seeker = SeekCoalescer(backend.seek, settle=settle, clock=lambda: now[0])
+    seeker.begin()
+    flush_at = None
+    for i in range(events):
+        now[0] = i * event_every_ms / 1000
+        if flush_at is not None and now[0] >= flush_at:
+            delay = seeker.flush()
+            flush_at = now[0] + delay / 1000 if delay else None
+        delay = seeker.drag(i * length_ms // events)
+        if delay:
+            flush_at = now[0] + delay / 1000
+    final = length_ms * 3 // 4
+    seeker.release(final)
+
+    assert backend.seeks == seeker.seeks
+    assert backend.seeks <= drag_ms / 1000 / settle + 2, backend.seeks
+    assert backend.tell() == final, "the release did not land"
+    print(f"{'coalesced':>10}: {backend.seeks:5d} seeks ({settle * 1000:.0f} ms settle)")
+
+    # a plain click is one seek, whether or not the last one has settled
+    for wait, target in ((0, 1_000), (settle, 5_000)):
+        now[0] += wait
+        before = backend.seeks
+        seeker.begin()
+        seeker.drag(target)
+        seeker.release(target)
+        assert backend.seeks == before + 1 and backend.tell() == target
+
+
+def bench_time_label(length_ms=240_000, drag_ms=2_000, event_every_ms=4, rounds=20):
+    """Time label text: formatted from scratch on every event (old) vs. TimeLabel's cached pieces (new).
+
+    One drag across a track (an EVT_SLIDER every few ms) and one minute of
+    playback refreshes, counting format calls and strings built (once
+    ``format_time``'s table is warm).
+    """
+    from player_core import TimeLabel, format_time
+
+    def old_format(ms):
+        try:
+            ms = int(ms)
+            if ms <= 0:
+                return "00:00"
+            s = ms // 1000
+            m = s // 60
+            s = s % 60
+            return f"{m:02d}:{s:02d}"
+        except Exception:
+            return "00:00"
+
+    for hours, expected in ((0, "04:00"), (1, "1:04:00"), (10, "10:04:00")):
+        ms = hours * 3_600_000 + length_ms
+        assert format_time(ms) == expected, (format_time(ms), expected)
+    print(f"  100 minutes: old {old_format(6_000_000)!r}, new {format_time(6_000_000)!r}")
+
+    events = drag_ms // event_every_ms
+    drag = [i * length_ms // events for i in range(events)]
+    # the timer wakes once per shown second (ProgressDisplay), plus a few resyncs
+    playback = [second * 1000 + 3 for second in range(60)]
+    for label, positions in (("drag", drag), ("playback", playback)):
+        shown = ["00:00 / 04:00"]
+
+        def old(positions=positions):
+            for pos in positions:
+                text = f"{old_format(pos)} / {old_format(length_ms)}"
+                if text != shown[0][:]:  # GetLabel hands back a new string
+                    shown[0] = text
+
+        formats = [0]
+
+        def counted(ms):
+            formats[0] += 1
+            return format_time(ms)
+
+        def new(positions=positions):
+            time_text = TimeLabel(counted)
+            time_text.set_length(length_ms)
+            for pos in positions:
+                text = time_text.text(pos)
+                if text is not None:
+                    shown[0] = text
+            return time_text
+
+        old_ms = min(timed(old) for _ in range(rounds))
+        new_ms = min(timed(new) for _ in range(rounds))
+        formats[0] = 0
+        time_text = new()
+        count = len(positions)
+        # old: two formats, the joined label and GetLabel's copy per event
+        print(f"{label:>10}: {count} events; old {2 * count} format calls, {4 * count} strings, "
+              f"{old_ms * 1000 / count:.2f} us/event")
+        # new: the joined label once per shown second; position and length texts come from the table
+        print(f"{'':>10}  new {formats[0]} format calls, {time_text.updates} strings, "
+              f"{time_text.updates} SetLabel, {new_ms * 1000 / count:.2f} us/event")
+
+
+def bench_track_loading(tracks=12, latency_ms=150, listen_ms=400, head_kib=256):
+    """UI-thread time per next on slow storage: opening in the handler (old) vs. the TrackLoader (new).
+
+    Every open of a file waits ``latency_ms``, like a share over a slow
+    link. The listener presses next every ``listen_ms``.
+    """
+    import tempfile
+
+    from track_loader import TrackLoader
+
+    def slow_open(path, mode="rb"):
+        time.sleep(latency_ms / 1000)
+        return open(path, mode)
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(tracks):
+            paths.append(os.path.join(folder, f"{i:02d}.mp3"))
+            with open(paths[-1], "wb") as f:
+                f.write(os.urandom(head_kib * 1024))
+
+        def old_next(path):
+            with slow_open(path) as f:
+                f.read()
+
+        blocked = sum(timed(old_next, path) for path in paths)
+        print(f"{'in handler':>10}: {blocked / tracks:7.1f} ms of frozen UI per next")
+
+        loader = TrackLoader(head_bytes=head_kib * 1024, warm_paths=4, open_file=slow_open)
+        opened = threading.Event()
+        blocked = waited = 0.0
+        instant = 0
+        for i, path in enumerate(paths):
+            start = time.perf_counter()
+            if loader.is_ready(path):
+                instant += 1
+            else:
+                opened.clear()
+                loader.open(path, lambda path, error: opened.set())
+            blocked += time.perf_counter() - start
+            if not opened.is_set() and not loader.is_ready(path):
+                opened.wait()
+            waited += time.perf_counter() - start
+            loader.prefetch(paths[i + 1:i + 4])
+            time.sleep(listen_ms / 1000)
+        loader.close()
+        stats = loader.stats()
+        print(f"{'loader':>10}: {blocked * 1000 / tracks:7.3f} ms of frozen UI per next, "
+              f"{waited * 1000 / tracks:6.1f} ms until playable, {instant}/{tracks} from the read-ahead")
+        print(f"{'warm':>10}: {stats['warm']} paths remembered (cap 4), no head bytes kept, "
+              f"{stats['evictions']} evictions, {stats['opened']} opened, {stats['prefetched']} read ahead")
+        assert instant == tracks - 1, "the read-ahead did not keep up"
+        assert stats["warm"] <= 4
+
+
+def bench_gapless(transitions=12, length_ms=900, load_ms=120, start_ms=30):
+    """Silence between tracks: stop/load/retry (old) vs. the preloaded standby deck (new), measured.
+
+    Runs in real time. ``FakeDeck`` players take ``load_ms`` to load and
+    ``start_ms`` from Play to sound, on timer threads; their events go
+    through one queue, read by this thread as the wx event loop would.
+    Every track plays for ``length_ms`` from its first sound. Gaps are
+    read off the monotonic clock: for the new path by the real
+    ``GaplessDecks.mark_end``/``mark_started``, so timer lateness and
+    event dispatch show up as they happen.
+    """
+    import queue
+
+    from gapless import SWAP_LEAD_MS, GaplessDecks
+
+    events = queue.Queue()
+
+    class FakeDeck:
+        def __init__(self):
+            self._timer = None
+
+        def _after(self, ms, event):
+            self._timer = threading.Timer(ms / 1000, events.put, ((event, self),))
+            self._timer.start()
+
+        def Load(self, path):
+            self.Stop()
+            self._after(load_ms, "loaded")
+            return True
+
+        def Play(self):
+            self._after(start_ms, "playing")
+
+        def Stop(self):
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def later(ms, event):
+        timer = threading.Timer(max(ms, 0) / 1000, events.put, ((event, None),))
+        timer.start()
+
+    def run_old():
+        # every 250 ms: within 500 ms of the end, Stop and Load the next track,
+        # then retry every 100 ms until it has loaded, then Play
+        deck = FakeDeck()
+        gaps, cuts = [], []
+        ends_at = stopped_at = None
+        loaded = False
+        deck.Load("first")
+        later(100, "retry")
+        while len(gaps) < transitions:
+            event, _ = events.get()
+            now = time.monotonic()
+            if event == "loaded":
+                loaded = True
+            elif event == "retry":
+                if loaded:
+                    deck.Play()
+                else:
+                    later(100, "retry")
+            elif event == "playing":
+                if stopped_at is not None:
+                    gaps.append((now - stopped_at) * 1000)
+                ends_at = now + length_ms / 1000
+                later(250, "poll")
+            elif event == "poll":
+                remaining = (ends_at - now) * 1000
+                if remaining > 500:
+                    later(250, "poll")
+                    continue
+                stopped_at = min(now, ends_at)
+                cuts.append(max(remaining, 0))
+                deck.Stop()
+                loaded = False
+                deck.Load("next")
+                later(100, "retry")
+        deck.Stop()
+        return gaps, cuts
+
+    def run_new():
+        decks = GaplessDecks(FakeDeck(), FakeDeck())
+        ends_at = None
+        decks.active.Load("first")
+        while len(decks.gaps) < transitions:
+            event, deck = events.get()
+            now = time.monotonic()
+            if event == "loaded":
+                if deck is decks.active:
+                    deck.Play()
+                else:
+                    decks.standby_loaded()
+            elif event == "playing" and deck is decks.active:
+                # on_media_loaded / start_progress: time the transition, preload, arm the swap timer
+                decks.mark_started()
+                ends_at = now + length_ms / 1000
+                decks.preload(0, "next")
+                later((ends_at - now) * 1000 - SWAP_LEAD_MS, "swap")
+            elif event == "swap":
+                # on_swap_timer
+                decks.mark_end((ends_at - now) * 1000)
+                if not decks.swap(0):
+                    raise AssertionError("the standby was not ready in time")
+        decks.active.Stop()
+        decks.standby.Stop()
+        return decks.gaps
+
+    def summary(values):
+        values = sorted(values)
+        return (f"mean {sum(values) / len(values):6.1f} ms, p95 {values[int(len(values) * 0.95)]:6.1f} ms, "
+                f"max {values[-1]:6.1f} ms")
+
+    old_gaps, old_cut = run_old()
+    new_gaps = run_new()
+    print(f"{transitions} transitions, load {load_ms} ms, start {start_ms} ms (fake decks, real clock)")
+    print(f"{'old':>10}: silence {summary(old_gaps)}; track end cut by {summary(old_cut)}")
+    print(f"{'gapless':>10}: silence {summary(new_gaps)} (negative = overlap)")
+
+
+def bench_headless(size=100_000, steps=10_000):
+    """The playlist core with a NullBackend: no display, and wx never imported."""
+    from player_core import NullBackend, Playlist, PlayerController
+
+    playlist = Playlist()
+    ms = timed(playlist.add, synthetic_paths(size))
+    print(f"{'add':>10}: {ms:8.1f} ms for {len(playlist)} tracks")
+    playlist.search_index.index_pending()
+
+    player = PlayerController(playlist, NullBackend())
+    for term in ("", "neon", "midnight fire"):
+        ms = timed(playlist.filter, term)
+        print(f"{'filter':>10}: {ms:8.2f} ms for {term!r} -> {len(playlist.view)} rows")
+
+    # next and prev follow the view; step through all of it
+    playlist.filter("")
+    ms = timed(lambda: [player.next() for _ in range(steps)])
+    # starts from "nothing loaded" (-1)
+    assert player.current_index == steps - 1
+    print(f"{'next':>10}: {ms * 1000 / steps:8.2f} us/step")
+    ms = timed(lambda: [player.prev() for _ in range(steps)])
+    assert player.current_index == size - 1
+    print(f"{'prev':>10}: {ms * 1000 / steps:8.2f} us/step")
+    assert player.backend.loads == 2 * steps
+    assert "wx" not in sys.modules, "the headless core pulled in wx"
+
+
+def bench_startup(runs=5, tracks=10_000):
+    """Process start to first painted frame, normal vs. --fast-start (needs wx and a display).
+
+    Runs the player against a scratch library of ``tracks`` tracks. The
+    import cost paid before the window shows is summed from ``-X importtime``.
+    """
+    import statistics
+    import subprocess
+    import tempfile
+
+    from library_db import LibraryDB
+    from track_store import TrackStore
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "final_code.py")
+
+    def first_frame(player_flags, env, python_flags=()):
+        """Run the player; returns (ms to first frame, stderr lines before it)."""
+        start = time.perf_counter()
+        child = subprocess.Popen(
+            [sys.executable, *python_flags, script, "--startup-probe", *player_flags],
+            env=env, stderr=subprocess.PIPE, text=True,
+        )
+        lines = []
+        elapsed = None
+        for line in child.stderr:
+            if line.startswith("first-frame"):
+                elapsed = (time.perf_counter() - start) * 1000
+                break
+            lines.append(line)
+        child.communicate()
+        if elapsed is None:
+            raise RuntimeError("player exited before showing a frame:\n" + "".join(lines))
+        return elapsed, lines
+
+    def import_ms(lines):
+        """Total self time of the imports in ``-X importtime`` output."""
+        total = 0
+        for line in lines:
+            if line.startswith("import time:"):
+                self_us = line.split(":", 1)[1].split("|")[0].strip()
+                total += int(self_us) if self_us.isdigit() else 0
+        return total / 1000
+
+    with tempfile.TemporaryDirectory() as home:
+        library = LibraryDB(os.path.join(home, "library.db"))
+        store = TrackStore()
+        store.extend(iter_synthetic_paths(tracks))
+        library.add_tracks(store, 0, len(store))
+        library.save_snapshot(store)
+        library.close()
+        env = dict(os.environ, MUSIC_PLAYER_HOME=home)
+
+        for label, flags in (("normal", []), ("fast start", ["--fast-start"])):
+            times = [first_frame(flags, env)[0] for _ in range(runs)]
+            _, lines = first_frame(flags, env, python_flags=("-X", "importtime"))
+            print(f"{label:>10}: {statistics.median(times):7.1f} ms to first frame (median of {runs}), "
+                  f"{import_ms(lines):6.1f} ms of imports before it")
+
+
+def bench_instrumentation(calls=1_000_000):
+    """Per-call cost of a handler with instrumentation off (plain method) and on."""
+    from instrumentation import Instrumentation, handler_names
+
+    class Frame:
+        def on_tick(self, event):
+            return event
+
+    for label, instrument in (("off", False), ("on", True)):
+        frame = Frame()
+        instrumentation = Instrumentation()
+        if instrument:
+            instrumentation.install(frame, handler_names(Frame))
+        handler = frame.on_tick
+        start = time.perf_counter()
+        for i in range(calls):
+            handler(i)
+        ns = (time.perf_counter() - start) * 1e9 / calls
+        print(f"{label:>10}: {ns:7.1f} ns/call")
+    stats = instrumentation.snapshot()["handlers"]["on_tick"]
+    assert stats["count"] == calls
+    print(f"{'on_tick':>10}: {stats}")
+
+
+class FakeVideo:
+    """A MediaCtrl stand-in on a simulated clock: records calls, and stops at the end like MediaCtrl does."""
+
+    STOPPED, PAUSED, PLAYING = 0, 1, 2
+
+    def __init__(self, length):
+        self.length = length
+        self.now = 0.0
+        self.state = self.STOPPED
+        self.position = 0.0
+        self.calls = {"GetState": 0, "Play": 0, "Pause": 0, "Seek": 0}
+        self.decoded = 0.0
+
+    def ends_at(self):
+        """Simulated time the video reaches its end, or None while it is not playing."""
+        return self.now + self.length - self.position if self.state == self.PLAYING else None
+
+    def advance(self, to):
+        """Let time run on to ``to``; returns True if the video reached its end (and stopped)."""
+        ended = self.state == self.PLAYING and self.position + (to - self.now) >= self.length
+        if self.state == self.PLAYING:
+            played = min(to - self.now, self.length - self.position)
+            self.position += played
+            self.decoded += played
+        if ended:
+            self.state = self.STOPPED
+        self.now = to
+        return ended
+
+    def GetState(self):
+        self.calls["GetState"] += 1
+        return self.state
+
+    def Play(self):
+        self.calls["Play"] += 1
+        if self.position >= self.length:
+            self.position = 0.0
+        self.state = self.PLAYING
+        return True
+
+    def Pause(self):
+        self.calls["Pause"] += 1
+        self.state = self.PAUSED
+        return True
+
+    def Seek(self, position):
+        self.calls["Seek"] += 1
+        self.position = position / 1000
+        return position
+
+
+def bench_video_loop(video_seconds=8.0, session=(("playing", 1800), ("paused", 600), ("minimized", 1200), ("playing", 600))):
+    """Background-video calls and wakeups over a session: 100 ms poll (old) vs. VideoLoop (new).
+
+    Both run against a ``FakeVideo`` on a simulated clock that records
+    every call. ``session`` is a list of (state, seconds): "paused" is the
+    music paused with the window shown, "minimized" the music playing in
+    a minimized window.
+    """
+    from video_loop import VideoLoop
+
+    def old_timer(media):
+        # the handler the 100 ms wx.Timer ran before the loop was event driven
+        try:
+            if media.GetState() == FakeVideo.STOPPED:
+                media.Seek(0)
+                media.Play()
+        except Exception:
+            pass
+
+    def run_old():
+        media = FakeVideo(video_seconds)
+        media.Play()
+        phases = []
+        now = 0.0
+        for state, seconds in session:
+            before, wakeups = dict(media.calls), 0
+            decoded = media.decoded
+            for tick in range(1, int(seconds * 10) + 1):
+                media.advance(now + tick / 10)
+                wakeups += 1
+                old_timer(media)
+            now += seconds
+            media.advance(now)
+            phases.append((state, wakeups, calls_since(media.calls, before), media.decoded - decoded))
+        return phases
+
+    def run_new():
+        media = FakeVideo(video_seconds)
+        shown = {"wanted": False}
+        loop = VideoLoop(media, FakeVideo.PLAYING, lambda: shown["wanted"])
+        phases = []
+        now = 0.0
+        for state, seconds in session:
+            before, wakeups = dict(media.calls), 0
+            decoded = media.decoded
+            shown["wanted"] = state == "playing"
+            # EVT_MEDIA_STATECHANGED (music paused or resumed) or EVT_ICONIZE
+            loop.update()
+            wakeups += 1
+            end = now + seconds
+            while media.ends_at() is not None and media.ends_at() <= end:
+                media.advance(media.ends_at())
+                # EVT_MEDIA_FINISHED, then the CallAfter'd restart
+                wakeups += 1
+                loop.restart()
+            media.advance(end)
+            now = end
+            phases.append((state, wakeups, calls_since(media.calls, before), media.decoded - decoded))
+        return phases
+
+    for label, phases in (("poller", run_old()), ("events", run_new())):
+        print(f"{label}:")
+        for state, wakeups, calls, decoded in phases:
+            print(f"  {state:>10}: {wakeups:6d} wakeups, GetState {calls['GetState']:6d}, Play {calls['Play']:4d}, "
+                  f"Pause {calls['Pause']:2d}, Seek {calls['Seek']:4d}, video decoded {decoded / 60:5.1f} min")
+
+
+def calls_since(calls, before):
+    return {name: count - before[name] for name, count in calls.items()}
+
+
+def write_tone_wav(path, seconds=10, rate=44100, base_hz=220):
+    """A stereo 16-bit WAV with a few sweeping tones: real PCM to analyse."""
+    import math
+    import wave
+    from array import array
+
+    samples = array("h")
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        value = 0.3 * math.sin(2 * math.pi * (base_hz + 40 * t) * t) + 0.2 * math.sin(2 * math.pi * 3000 * t)
+        sample = int(value * 32767)
+        samples.extend((sample, sample))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+def resident_kib():
+    """Peak resident memory of this process in KiB, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def bench_visualizer(fps=30, frames=3_000, seconds=10, video=None):
+    """Spectrum visualizer (new) vs. decoding animation.mp4 (old): CPU and memory.
+
+    The spectrum part runs headless. The on-screen comparison needs wx and
+    a display; ``video`` defaults to animation.mp4 next to this file.
+    """
+    import tempfile
+    import tracemalloc
+
+    from audio_analysis import Spectrum, SpectrumFeed, WavReader
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "tone.wav")
+        write_tone_wav(path, seconds=seconds)
+        reader = WavReader(path)
+        spectrum = Spectrum()
+        step_ms = 1000 / fps
+        tracemalloc.start()
+        start = time.process_time()
+        for i in range(frames):
+            spectrum.update(reader.block(i * step_ms % (seconds * 1000), spectrum.block_size), reader.rate)
+        cpu = time.process_time() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        reader.close()
+        per_frame = cpu * 1000 / frames
+        print(f"{'spectrum':>10}: {per_frame:6.3f} ms/frame, {per_frame * fps / 10:5.2f}% of a core at {fps} fps, "
+              f"{peak / 1024:7.1f} KiB peak")
+
+        # what on_frame itself pays: handing the position to the feed's thread
+        feed = SpectrumFeed()
+        feed.set_track(path)
+        ui_ms = timed(lambda: [feed.request(i * step_ms % (seconds * 1000)) for i in range(frames)])
+        feed.close()
+        print(f"{'feed':>10}: {ui_ms * 1000 / frames:6.2f} us/frame on the UI thread; "
+              f"{feed.computed} of {frames} back-to-back requests transformed, the rest superseded")
+
+        try:
+            import wx
+            import wx.media
+        except ImportError:
+            print(f"{'on screen':>10}: skipped, wx is not available")
+            return
+        from visualizer import VisualizerPanel
+
+        video = video or os.path.join(os.path.dirname(os.path.abspath(__file__)), "animation.mp4")
+        app = wx.App(False)
+
+        def run(make):
+            frame = wx.Frame(None, size=(600, 400))
+            make(frame)
+            frame.Show()
+            before_rss = resident_kib()
+            start = time.process_time()
+            wx.CallLater(seconds * 1000, frame.Close)
+            app.MainLoop()
+            after_rss = resident_kib()
+            cpu_pct = (time.process_time() - start) * 100 / seconds
+            grown = "n/a" if before_rss is None else f"{after_rss - before_rss} KiB"
+            return cpu_pct, grown
+
+        def make_video(frame):
+            player = wx.media.MediaCtrl(frame)
+            player.Bind(wx.media.EVT_MEDIA_LOADED, lambda event: player.Play())
+            if not player.Load(video):
+                raise RuntimeError(f"cannot load {video}")
+
+        def make_spectrum(frame):
+            started = time.monotonic()
+            panel = VisualizerPanel(frame, lambda: (time.monotonic() - started) * 1000 % (seconds * 1000), fps=fps)
+            panel.set_track(path)
+            panel.set_running(True)
+
+        # peak RSS only grows, so the lighter run goes first
+        for label, make in (("spectrum", make_spectrum), ("video", make_video)):
+            cpu_pct, grown = run(make)
+            print(f"{label:>10}: {cpu_pct:5.1f}% CPU on screen, peak RSS grew {grown}")
+
+
+def bench_waveform(minutes=5, points=1024):
+    """Seek-bar overview: first computation (streamed) vs. later loads from the cache."""
+    import tempfile
+    import tracemalloc
+    import wave
+
+    from waveform import EnvelopeCache
+
+    with tempfile.TemporaryDirectory() as folder:
+        tone = os.path.join(folder, "tone.wav")
+        write_tone_wav(tone, seconds=10)
+        with wave.open(tone, "rb") as f:
+            params, frames = f.getparams(), f.readframes(f.getnframes())
+        path = os.path.join(folder, "mix.wav")
+        with wave.open(path, "wb") as f:
+            f.setparams(params)
+            for _ in range(minutes * 6):
+                f.writeframes(frames)
+        size_mib = os.path.getsize(path) / (1 << 20)
+        cache = EnvelopeCache(os.path.join(folder, "waveforms"), points)
+
+        tracemalloc.start()
+        computed = timed(cache.get, path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        cached = min(timed(cache.get, path) for _ in range(20))
+        stored = sum(os.path.getsize(os.path.join(cache.folder, name)) for name in os.listdir(cache.folder))
+
+        whole_file = minutes * 60 * params.framerate * 4 / 1024
+        print(f"{minutes} min WAV, {size_mib:.0f} MiB")
+        print(f"  first load: {computed:8.1f} ms, {peak / 1024:8.1f} KiB peak "
+              f"(decoding it whole to float32: {whole_file:.0f} KiB)")
+        print(f"  cached    : {cached:8.2f} ms, {stored} bytes on disk")
+        assert cache.stats() == {"hits": 20, "misses": 1}
+
+
+def bench_duplicates(tracks=100_000, copies=1_000, seed=3):
+    """Near-duplicate search over fingerprints: LSH candidates vs. comparing every pair.
+
+    Synthetic fingerprints are random bits; each copy flips 2-8% of its
+    original's bits, about what a re-encode does. A short real-PCM check
+    follows: the same tones at another sample rate, and different tones.
+    """
+    import tempfile
+
+    import numpy as np
+
+    from fingerprint import FP_BITS, FP_BYTES, DuplicateIndex, distance, fingerprint_file
+
+    rng = np.random.default_rng(seed)
+    prints = rng.integers(0, 256, (tracks, FP_BYTES), np.uint8)
+    originals = rng.choice(tracks, copies, replace=False)
+    noisy = np.unpackbits(prints[originals], axis=1)
+    for row in noisy:
+        flips = rng.choice(FP_BITS, int(FP_BITS * rng.uniform(0.02, 0.08)), replace=False)
+        row[flips] ^= 1
+    items = [(i, row.tobytes()) for i, row in enumerate(prints)]
+    items += [(tracks + n, row.tobytes()) for n, row in enumerate(np.packbits(noisy, axis=1))]
+
+    index = DuplicateIndex()
+    indexed = timed(index.add, items)
+    groups = []
+    searched = timed(lambda: groups.extend(index.duplicates()))
+    found = {tuple(group) for group in groups}
+    expected = {(int(original), tracks + n) for n, original in enumerate(originals)}
+
+    # every pair, timed on a sample and scaled up
+    sample = items[:2_000]
+    brute = timed(lambda: [distance(a, b) for n, (_, a) in enumerate(sample) for _, b in sample[n + 1:]])
+    total = len(items)
+    all_pairs = total * (total - 1) // 2
+    sample_pairs = len(sample) * (len(sample) - 1) // 2
+    print(f"{total} fingerprints, {copies} planted duplicates")
+    print(f"  every pair: {all_pairs:>14,} comparisons, ~{brute * all_pairs / sample_pairs / 1000:8.0f} s (estimated)")
+    print(f"  LSH       : {index.compared:>14,} comparisons, {(indexed + searched) / 1000:8.1f} s "
+          f"({indexed / 1000:.1f} s keying)")
+    print(f"  found {len(found & expected)} of {len(expected)} planted, {len(found - expected)} false groups")
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = {}
+        for label, rate, base_hz in (("original", 44100, 220), ("resampled", 22050, 220), ("other", 44100, 330)):
+            paths[label] = os.path.join(folder, f"{label}.wav")
+            write_tone_wav(paths[label], seconds=60, rate=rate, base_hz=base_hz)
+        bits = {label: fingerprint_file(path) for label, path in paths.items()}
+        for label in ("resampled", "other"):
+            print(f"  WAV original vs {label:>9}: {distance(bits['original'], bits[label]):4d} of {FP_BITS} bits differ")
+
+
+def write_sine_wav(path, dbfs, seconds=20, rate=48000, hz=997):
+    """A stereo 16-bit WAV of one sine at ``dbfs`` peak level in both channels."""
+    import wave
+
+    import numpy as np
+
+    t = np.arange(int(seconds * rate)) / rate
+    wave_ = np.round(10 ** (dbfs / 20) * np.sin(2 * np.pi * hz * t) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(np.repeat(wave_, 2).tobytes())
+
+
+def bench_loudness(count=24, seconds=30, workers=(1, None)):
+    """Loudness analysis: accuracy on reference tones, throughput serial vs. pool, cached re-runs, gain lookup."""
+    import functools
+    import shutil
+    import tempfile
+    import threading
+
+    from library_db import LibraryDB
+    from loudness import analyse_file, loudness_batch
+    from metadata import MetadataPipeline
+    from player_core import TARGET_LUFS, normalization_gain
+    from track_store import TrackStore
+
+    with tempfile.TemporaryDirectory() as folder:
+        # EBU Tech 3341: a stereo 997 Hz sine at -23 dBFS measures -23 LUFS
+        for dbfs in (-23.0, -11.0):
+            path = os.path.join(folder, f"sine{dbfs:.0f}.wav")
+            write_sine_wav(path, dbfs)
+            lufs, peak = analyse_file(path)
+            gain = normalization_gain(lufs, peak)
+            print(f"  sine at {dbfs:5.1f} dBFS: {lufs:6.2f} LUFS, peak {peak:.3f}, gain {gain:.3f} "
+                  f"(target {TARGET_LUFS} LUFS)")
+            assert abs(lufs - dbfs) < 0.2
+
+        paths = []
+        for n in range(count):
+            paths.append(os.path.join(folder, f"tone{n}.wav"))
+            if n % 4:
+                shutil.copy(paths[0], paths[-1])  # copies: the same content, measured once
+            else:
+                write_tone_wav(paths[-1], seconds=seconds, base_hz=220 + n)
+        audio_seconds = count * seconds
+        store = TrackStore()
+        store.extend(paths)
+        library = LibraryDB(os.path.join(folder, "library.db"))
+        library.add_tracks(store, 0, len(store))
+
+        elapsed = timed(lambda: [analyse_file(path) for path in paths]) / 1000
+        print(f"{'serial':>10}: {audio_seconds / elapsed:8.0f}x real time, every file decoded")
+
+        for worker_count in workers:
+            results = []
+            done = threading.Event()
+            scan = functools.partial(loudness_batch, library_path=library.path)
+            pipeline = MetadataPipeline(results.extend, done.set, workers=worker_count, batch_size=8, scan=scan)
+            start = time.perf_counter()
+            pipeline.submit(library.loudness_jobs(store))
+            done.wait()
+            elapsed = time.perf_counter() - start
+            pipeline.close()
+            label = f"{worker_count or os.cpu_count()} procs"
+            print(f"{label:>10}: {audio_seconds / elapsed:8.0f}x real time (including pool start-up)")
+        library.save_loudness(results)
+
+        # unchanged files are only stat'ed; nothing is decoded
+        rerun = timed(lambda: loudness_batch(library.loudness_jobs(store))) / 1000
+        print(f"{'cached':>10}: {count / rerun:8.0f} files/s, {len(library.loudness_jobs(store, missing_only=True))} left")
+
+        # a moved copy is looked up by content, not decoded again
+        moved = os.path.join(folder, "moved.wav")
+        shutil.copy(paths[0], moved)
+        elapsed = timed(loudness_batch, [(0, moved, None, None)], library.path)
+        print(f"{'new copy':>10}: {elapsed:8.1f} ms (content key lookup)")
+
+        # what load_track pays: one indexed query and a power of ten
+        lookups = 10_000
+        elapsed = timed(lambda: [normalization_gain(*library.loudness(n % count)) for n in range(lookups)])
+        print(f"  gain on load: {elapsed * 1000 / lookups:.1f} µs per track")
+        library.close()
+
+
+def bench_playlist_io(entries=500_000):
+    """Playlist files: write, stream-parse (time and peak memory) and import into the library, per format."""
+    import tempfile
+    import tracemalloc
+
+    from player_core import Playlist
+    from playlist_io import read_playlist, write_playlist
+
+    def parse(path):
+        return sum(len(batch) for batch in read_playlist(path))
+
+    def parse_peak_kib(path):
+        tracemalloc.start()
+        parse(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak / 1024
+
+    # a fifth of the tracks live below the playlist's folder and are written relative to it
+    paths = [p.replace("/music/artist_00", "{folder}/artist_00", 1) for p in iter_synthetic_paths(entries)]
+    with tempfile.TemporaryDirectory() as folder:
+        paths = [p.format(folder=folder) for p in paths]
+        distinct = len(set(paths))
+        for ext in (".m3u8", ".pls", ".xspf"):
+            path = os.path.join(folder, "big" + ext)
+            small = os.path.join(folder, "small" + ext)
+            tracks = ((p, p.rsplit(" - ", 1)[-1][:-4], 200_000) for p in paths)
+            written = timed(write_playlist, path, tracks, True)
+            write_playlist(small, ((p, None, None) for p in paths[:entries // 10]), True)
+            size_mib = os.path.getsize(path) / (1 << 20)
+
+            parsed = timed(parse, path)
+            small_peak, big_peak = parse_peak_kib(small), parse_peak_kib(path)
+
+            playlist = Playlist()
+
+            def import_all():
+                # as the window does: paths already in the library are not added again
+                for batch in read_playlist(path):
+                    playlist.add(batch, skip_known=True)
+
+            imported = timed(import_all)
+            # the synthetic paths repeat a few names; each distinct path is one track
+            assert len(playlist) == distinct and playlist.tracks.find(paths[-1]) is not None
+            reimported = timed(import_all)
+            assert len(playlist) == distinct, "a re-import added tracks again"
+            print(f"{ext:>6}: {size_mib:5.1f} MiB, write {written / 1000:5.2f} s, parse {parsed / 1000:5.2f} s, "
+                  f"import {imported / 1000:5.2f} s, again {reimported / 1000:5.2f} s (0 added); "
+                  f"parser peak {small_peak:6.0f} KiB at {entries // 10} entries, {big_peak:6.0f} KiB at {entries}")
+
+
+def bench_play_queue(size=1_000_000, steps=20_000):
+    """Next/prev/pick per step on a big library, plain and shuffled; lazy vs. eager shuffle."""
+    from player_core import NullBackend, Playlist, PlayerController
+
+    playlist = Playlist()
+    playlist.tracks.extend_columns(["/music"], [0] * size, [f"{i:07d}.mp3" for i in range(size)])
+    playlist.load()
+    player = PlayerController(playlist, NullBackend())
+    player.queue.seed = 1
+    rng = random.Random(2)
+    picks = [rng.randrange(size) for _ in range(steps)]
+
+    def play_next():
+        # next() is False when a load fails or the view ran out; that must not pass for track 0
+        loaded = player.next()
+        assert loaded, "next did not load a track"
+        return player.current_index
+
+    for shuffle in (False, True):
+        player.queue.set_shuffle(shuffle)
+        label = "shuffled" if shuffle else "in order"
+        ms = timed(lambda: [player.next() for _ in range(steps)])
+        played = [play_next() for _ in range(steps)]
+        assert len(set(played)) == steps, "a track came back within one round"
+        print(f"{label:>10}: next {ms * 1000 / steps:6.2f} us", end="")
+        ms = timed(lambda: [player.prev() for _ in range(steps)])
+        print(f", prev {ms * 1000 / steps:6.2f} us", end="")
+        ms = timed(lambda: [player.load(track_id) for track_id in picks])
+        print(f", pick {ms * 1000 / steps:6.2f} us")
+
+    queue = player.queue
+    ms = timed(lambda: [queue.enqueue((track_id,)) for track_id in picks])
+    assert player.next_index() == picks[0]
+    ms += timed(lambda: [player.next() for _ in range(steps)])
+    assert not queue.queue
+    print(f"{'queue':>10}: enqueue + play {ms * 1000 / steps:6.2f} us per track")
+
+    # what an eager shuffle of the whole view costs up front, every time shuffle or the filter changes
+    start = time.perf_counter()
+    random.Random(1).shuffle(list(range(size)))
+    eager = (time.perf_counter() - start) * 1000
+    queue.set_shuffle(False)
+    queue.set_shuffle(True)
+    lazy = timed(player.next)
+    print(f"{'start':>10}: lazy shuffle {lazy:6.3f} ms, eager random.shuffle {eager:6.1f} ms")
+
+    # a filter keystroke mid-round: the first step in the new view carries over what was heard
+    heard = {player.current_index, *(play_next() for _ in range(steps))}
+    playlist.show(range(0, size, 2))
+    carry = timed(player.next)
+    assert player.current_index not in heard
+    print(f"{'filter':>10}: first step after {len(heard)} heard tracks {carry:6.2f} ms")
+
+
+BENCHMARKS = {
+    "playlist_rebuild": bench_playlist_rebuild,
+    "search": bench_search,
+    "fuzzy_search": bench_fuzzy_search,
+    "track_lookup": bench_track_lookup,
+    "track_memory": bench_track_memory,
+    "cold_start": bench_cold_start,
+    "folder_scan": bench_folder_scan,
+    "metadata": bench_metadata,
+    "progress": bench_progress,
+    "seek": bench_seek,
+    "time_label": bench_time_label,
+    "track_loading": bench_track_loading,
+    "gapless": bench_gapless,
+    "headless": bench_headless,
+    "startup": bench_startup,
+    "instrumentation": bench_instrumentation,
+    "video_loop": bench_video_loop,
+    "visualizer": bench_visualizer,
+    "waveform": bench_waveform,
+    "duplicates": bench_duplicates,
+    "loudness": bench_loudness,
+    "playlist_io": bench_playlist_io,
+    "play_queue": bench_play_queue,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
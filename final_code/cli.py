@@ -0,0 +1,184 @@
+"""Command line front end over the headless player core. Never imports wx.
+
+    python cli.py list [FILTER]          tracks matching FILTER (all if omitted)
+    python cli.py list --fuzzy QUERY     best matches for QUERY over names and tags
+    python cli.py add PATH [PATH ...]    add files, or folders recursively, and read their tags
+    python cli.py dupes                  groups of tracks that are the same recording
+    python cli.py loudness [FILTER]      measure new tracks, then print loudness and gain of FILTER's
+    python cli.py import PLAYLIST        add the tracks listed in an M3U, M3U8, PLS or XSPF file
+    python cli.py export PLAYLIST [FILTER]  write the tracks matching FILTER to a playlist file
+"""
+
+import argparse
+import math
+import os
+import sys
+import threading
+
+from folder_import import FolderScanner, is_audio_file
+from library_db import LibraryDB, MetadataPager
+from metadata import MetadataPipeline
+from player_core import Playlist, format_time, normalization_gain
+from playlist_io import read_playlist, write_playlist
+
+
+def cmd_list(playlist, args):
+    view = playlist.filter(args.filter, args.fuzzy)
+    metadata = MetadataPager(playlist.library)
+    shown = view.rows if args.limit is None else view.rows[:args.limit]
+    for track_id in shown:
+        meta = metadata.get(track_id)
+        duration = format_time(meta.duration_ms) if meta and meta.duration_ms else "--:--"
+        print(f"{track_id:8d}  {duration}  {playlist.path(track_id)}")
+    print(f"{len(view)} of {len(playlist)} tracks", file=sys.stderr)
+
+
+def cmd_add(playlist, args):
+    files = [p for p in args.paths if os.path.isfile(p) and is_audio_file(p)]
+    folders = [p for p in args.paths if os.path.isdir(p)]
+    found = []
+    if folders:
+        done = threading.Event()
+        scanner = FolderScanner(
+            folders,
+            on_batch=lambda paths, progress: found.extend(paths),
+            on_done=lambda progress, cancelled: done.set(),
+        )
+        scanner.start()
+        done.wait()
+    added = playlist.add(files + found)
+    print(f"added {len(added)} tracks", file=sys.stderr)
+    read_tags(playlist, added)
+
+
+def cmd_import(playlist, args):
+    first_new = len(playlist)
+    listed = 0
+    for batch in read_playlist(args.playlist):
+        listed += len(batch)
+        playlist.add(batch, skip_known=True)
+    added = range(first_new, len(playlist))
+    print(f"added {len(added)} of the {listed} tracks in {args.playlist}; the rest were in the library",
+          file=sys.stderr)
+    read_tags(playlist, added)
+
+
+def cmd_export(playlist, args):
+    playlist.filter(args.filter, args.fuzzy)
+    count = write_playlist(args.playlist, playlist.entries(), relative=args.relative)
+    print(f"wrote {count} tracks to {args.playlist}", file=sys.stderr)
+
+
+def read_tags(playlist, added):
+    """Read the tags of newly added tracks and save them, along with the tracks."""
+    results = []
+    finished = threading.Event()
+    pipeline = MetadataPipeline(results.extend, on_done=finished.set)
+    jobs = playlist.library.tag_jobs(playlist.tracks, added.start, added.stop)
+    if jobs:
+        pipeline.submit(jobs)
+        finished.wait()
+    pipeline.close()
+    # the database is only touched from this thread
+    playlist.library.save_tags(results)
+    playlist.save()
+    print(f"read tags from {len(results)} files", file=sys.stderr)
+
+
+def cmd_dupes(playlist, args):
+    # NumPy is only needed here
+    from fingerprint import DuplicateIndex, fingerprint_batch
+
+    results = []
+    finished = threading.Event()
+    pipeline = MetadataPipeline(results.extend, on_done=finished.set, batch_size=8, scan=fingerprint_batch)
+    jobs = playlist.library.fingerprint_jobs(playlist.tracks)
+    if jobs:
+        pipeline.submit(jobs)
+        finished.wait()
+    pipeline.close()
+    playlist.library.save_fingerprints(results)
+    print(f"fingerprinted {len(results)} new or changed files", file=sys.stderr)
+
+    index = DuplicateIndex()
+    index.add(playlist.library.fingerprints())
+    groups = index.duplicates()
+    for group in groups:
+        for track_id in group:
+            print(f"{track_id:8d}  {playlist.path(track_id)}")
+        print()
+    print(f"{len(groups)} songs with duplicates, {sum(len(group) - 1 for group in groups)} extra copies", file=sys.stderr)
+
+
+def cmd_loudness(playlist, args):
+    import functools
+
+    # NumPy is only needed here
+    from loudness import loudness_batch
+
+    results = []
+    finished = threading.Event()
+    scan = functools.partial(loudness_batch, library_path=playlist.library.path)
+    pipeline = MetadataPipeline(results.extend, on_done=finished.set, batch_size=8, scan=scan)
+    jobs = playlist.library.loudness_jobs(playlist.tracks)
+    if jobs:
+        pipeline.submit(jobs)
+        finished.wait()
+    pipeline.close()
+    playlist.library.save_loudness(results)
+    print(f"analysed {len(results)} new or changed files", file=sys.stderr)
+
+    for track_id in playlist.filter(args.filter).rows:
+        lufs, peak = playlist.library.loudness(track_id)
+        if lufs is None:
+            print(f"{track_id:8d}  {'-':>6}  {'-':>6}  {playlist.tracks.name(track_id)}")
+            continue
+        gain = normalization_gain(lufs, peak)
+        print(f"{track_id:8d}  {lufs:6.1f}  {20 * math.log10(gain):+6.1f}  {playlist.tracks.name(track_id)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Music library from the command line.")
+    parser.add_argument("--library", help="library database (default: the player's own)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="print tracks matching a filter")
+    list_parser.add_argument("filter", nargs="?", default="")
+    list_parser.add_argument("--limit", type=int)
+    list_parser.add_argument("--fuzzy", action="store_true", help="ranked, typo-tolerant match over names and tags")
+    list_parser.set_defaults(run=cmd_list)
+
+    add_parser = commands.add_parser("add", help="add files or folders to the library")
+    add_parser.add_argument("paths", nargs="+")
+    add_parser.set_defaults(run=cmd_add)
+
+    dupes_parser = commands.add_parser("dupes", help="find tracks that are the same recording")
+    dupes_parser.set_defaults(run=cmd_dupes)
+
+    loudness_parser = commands.add_parser("loudness", help="measure loudness; print LUFS and normalization gain (dB)")
+    loudness_parser.add_argument("filter", nargs="?", default="")
+    loudness_parser.set_defaults(run=cmd_loudness)
+
+    import_parser = commands.add_parser("import", help="add the tracks of a playlist file")
+    import_parser.add_argument("playlist")
+    import_parser.set_defaults(run=cmd_import)
+
+    export_parser = commands.add_parser("export", help="write tracks to a playlist file")
+    export_parser.add_argument("playlist", help="file to write; .m3u, .m3u8, .pls or .xspf")
+    export_parser.add_argument("filter", nargs="?", default="")
+    export_parser.add_argument("--fuzzy", action="store_true", help="ranked, typo-tolerant match over names and tags")
+    export_parser.add_argument("--relative", action="store_true", help="paths relative to the playlist's folder")
+    export_parser.set_defaults(run=cmd_export)
+
+    args = parser.parse_args(argv)
+    library = LibraryDB(args.library)
+    try:
+        playlist = Playlist(library)
+        playlist.load()
+        args.run(playlist, args)
+    finally:
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,103 @@
 import wx
-import wx.media
+import functools
 import os
+import sys
+import threading
+
+from folder_import import FolderScanner, audio_wildcard
+from gapless import SWAP_LEAD_MS, GaplessDecks
+from instrumentation import Instrumentation, handler_names
+from library_db import LibraryDB, MetadataPager, default_library_path
+from loudness_worker import analyse_batch
+from metadata import MetadataPipeline
+from playback_clock import PlaybackClock, ProgressDisplay, ProgressUpdater, SeekCoalescer
+from play_queue import REPEAT_MODES
+from player_core import NullBackend, Playlist, PlayerController, TimeLabel, format_time, normalization_gain
+from playlist_io import PLAYLIST_EXTENSIONS, PlaylistImporter, playlist_wildcard, write_playlist
+from playlist_view import PlaylistView
+from search_worker import SearchWorker
+from track_loader import TrackLoader
+from video_loop import VideoLoop
+from waveform_slider import WaveformSlider
 
 
 class MusicPlayer(wx.Frame):
-    def __init__(self):
+    # timed along with every on_* handler when instrumentation is on
+    TIMED_METHODS = ("load_track", "open_track", "update_playlist_display", "show_search_results", "refresh_progress")
+    STATS_DUMP_MS = 10_000
+    # tracks after the current one whose heads are read ahead (plus the previous one)
+    PREFETCH_TRACKS = 3
+
+    def __init__(self, fast_start=False, instrument=False, visualizer=False):
        
         super().__init__(None, title="Music Player", size=(900, 600))
         self.SetBackgroundColour(wx.Colour(10, 10, 10))  
 
+        # opt-in handler timing; wrapped before anything is bound, and when
+        # it is off nothing is wrapped at all
+        self.instrumentation = None
+        if instrument:
+            self.instrumentation = Instrumentation()
+            self.instrumentation.install(self, handler_names(type(self), self.TIMED_METHODS))
+
         panel = wx.Panel(self)
         panel.SetBackgroundColour(wx.Colour(10, 10, 10))
 
         # --- Data ---
-        self.tracks = []
-        self.display_names = []
-        self.current_index = -1
+        self.library = LibraryDB()
+        self.tracklist = Playlist(self.library)
+        self.tracklist.load()
+        # shorthands for the playlist's columns
+        self.tracks = self.tracklist.tracks
+        self.search_index = self.tracklist.search_index
+        # ranked fuzzy matching over names and tags instead of substrings
+        self.fuzzy = False
+        self.search_worker = SearchWorker(
+            lambda query, cancelled: self.tracklist.search(query, cancelled, self.fuzzy), self.post_search_results
+        )
+        self.metadata = MetadataPager(self.library)
+        # running "load folder" scan, if any
+        self.scanner = None
+        # running playlist file import, if any
+        self.importer = None
+        # set while playback moves on by itself; unreadable tracks are then skipped
+        self.advancing = False
+        self.skipped = 0
+        self.tag_pipeline = MetadataPipeline(lambda results: wx.CallAfter(self.on_tags_read, results))
+        # running duplicate search (fingerprints on a process pool), if any
+        self.fingerprinter = None
+        # loudness analysis for normalization; the loudness module (NumPy) is imported by the workers only
+        # one worker process: decoding a whole library must not take every core from playback
+        self.loudness_pipeline = MetadataPipeline(
+            lambda results: wx.CallAfter(self.on_loudness_read, results),
+            workers=1,
+            batch_size=8,
+            scan=functools.partial(analyse_batch, library_path=self.library.path),
+        )
+        # extra copies of duplicates, left out of the playlist
+        self.hidden = set()
         self.is_dragging = False
+        # position is extrapolated between backend syncs; widgets change only when visible
+        self.clock = PlaybackClock()
+        self.progress = ProgressDisplay()
+        # time label text, with the track length formatted once per track
+        self.time_text = TimeLabel()
+        # what the progress timer does on each wakeup; perf_suite's "timer" scenario runs the same code
+        self.progress_updater = ProgressUpdater(
+            self.clock,
+            self.progress,
+            self.time_text,
+            tell=lambda: self.player.backend.tell(),
+            show_position=self.show_slider_position,
+            show_text=lambda text: self.time_label.SetLabel(text),
+        )
+        # drags seek at most once per settle time, to the latest position
+        self.seeker = SeekCoalescer(lambda pos: self.player.backend.seek(pos))
+        # file opening and read-ahead happen off the UI thread
+        self.loader = TrackLoader()
+        self.loading_index = None
+        # waveform overviews for the seek bar, started with the first track
+        self.waveforms = None
 
        
         self.updating_slider = False
@@ -25,12 +106,18 @@ class MusicPlayer(wx.Frame):
         self.search_ctrl = wx.SearchCtrl(panel, style=wx.TE_PROCESS_ENTER)
         self.search_ctrl.SetBackgroundColour(wx.Colour(20, 20, 20))  
         self.search_ctrl.SetForegroundColour(wx.Colour(0, 255, 100)) 
+        self.fuzzy_check = wx.CheckBox(panel, label="FUZZY")
+        self.fuzzy_check.SetForegroundColour(wx.Colour(0, 255, 100))
 
         # --- Playlist ---
-        self.playlist = wx.ListBox(panel)
+        self.playlist = PlaylistView(panel, self.tracks, self.metadata, self.ms_to_time)
         self.playlist.SetBackgroundColour(wx.Colour(15, 15, 15))  
         self.playlist.SetForegroundColour(wx.Colour(50, 255, 100))  
 
+        # folder scan progress
+        self.scan_label = wx.StaticText(panel, label="")
+        self.scan_label.SetForegroundColour(wx.Colour(50, 255, 150))
+
         # --- Now Playing Label ---
         now_playing_label = wx.StaticText(panel, label=">> NOW PLAYING")
         font_title = now_playing_label.GetFont()
@@ -48,68 +135,35 @@ class MusicPlayer(wx.Frame):
         display_panel.SetBackgroundColour(wx.Colour(10, 10, 10))  
         display_sizer = wx.BoxSizer(wx.VERTICAL)
 
-        
-        self.video_player = wx.media.MediaCtrl(
-            display_panel,
-            style=wx.SIMPLE_BORDER
-        )
-
-        try:
-         
-            video_path = r"e:\Python\Lib\py\animation.mp4"
-
-            if os.path.exists(video_path):
-                
-                if self.video_player.Load(video_path):
-                 
-                    self.video_player.ShowPlayerControls(0)
-
-               
-                    self.video_player.Play()
-
-                    
-                    self.video_timer = wx.Timer(self, wx.ID_ANY)
-                    self.Bind(wx.EVT_TIMER, self.on_video_timer, self.video_timer)
-                    self.video_timer.Start(100)  
-
-                else:
-                  
-                    error_text = wx.StaticText(display_panel, label="[VIDEO ERROR]")
-                    error_text.SetForegroundColour(wx.Colour(255, 0, 0))  
-                    display_sizer.Add(error_text, 1, wx.ALIGN_CENTER | wx.ALL, 20)
-
-            else:
-                
-                no_file_text = wx.StaticText(
-                    display_panel,
-                    label=f"[FILE NOT FOUND]\n{video_path}"
-                )
-                no_file_text.SetForegroundColour(wx.Colour(255, 100, 0)) 
-                display_sizer.Add(no_file_text, 1, wx.ALIGN_CENTER | wx.ALL, 20)
-
-        except Exception as e:
-          
-            print(f"Error loading video: {e}")
-            error_text = wx.StaticText(display_panel, label=f"[ERROR]\n{str(e)}")
-            error_text.SetForegroundColour(wx.Colour(255, 0, 0))  
-            display_sizer.Add(error_text, 1, wx.ALIGN_CENTER | wx.ALL, 20)
-
-        
-        display_sizer.Add(self.video_player, 1, wx.EXPAND | wx.ALL, 0)
         display_panel.SetSizer(display_sizer)
+        self.display_panel = display_panel
+        self.display_sizer = display_sizer
+        # media controls are made by create_media (right away, or after the first paint)
+        self.video_player = None
+        self.video_loop = None
+        # spectrum of the playing track, drawn instead of the video when asked for
+        self.visualizer_mode = visualizer
+        self.visualizer = None
+        self.decks = None
+        self.gapless = True
+        # play every track at the same loudness, from analysis done in the background; opt-in
+        self.normalize = False
+        self.player = PlayerController(self.tracklist, NullBackend())
+        self.player.gain_of = self.track_gain
 
-      
-        self.mc = wx.media.MediaCtrl(panel, style=wx.SIMPLE_BORDER)
-        self.mc.Hide()
 
         
         btn_load = wx.Button(panel, label="LOAD SONGS")
+        self.btn_folder = wx.Button(panel, label="LOAD FOLDER")
+        self.btn_dupes = wx.Button(panel, label="FIND DUPES")
+        self.btn_import = wx.Button(panel, label="OPEN PLAYLIST")
+        btn_export = wx.Button(panel, label="SAVE PLAYLIST")
         btn_prev = wx.Button(panel, label="<< Prev")
         btn_play = wx.Button(panel, label="PLAY/PAUSE")
         btn_next = wx.Button(panel, label="NEXT >>")
 
      
-        for btn in [btn_load, btn_prev, btn_play, btn_next]:
+        for btn in [btn_load, self.btn_folder, self.btn_dupes, self.btn_import, btn_export, btn_prev, btn_play, btn_next]:
             btn.SetBackgroundColour(wx.Colour(0, 150, 75))  
             btn.SetForegroundColour(wx.WHITE)  
             font = btn.GetFont()
@@ -124,12 +178,24 @@ class MusicPlayer(wx.Frame):
         )
         self.vol_slider.SetBackgroundColour(wx.Colour(20, 20, 20))  
 
+        self.gapless_check = wx.CheckBox(panel, label="GAPLESS")
+        self.gapless_check.SetForegroundColour(wx.Colour(0, 255, 100))
+        self.gapless_check.SetValue(self.gapless)
+
+        self.normalize_check = wx.CheckBox(panel, label="NORMALIZE")
+        self.normalize_check.SetForegroundColour(wx.Colour(0, 255, 100))
+        self.normalize_check.SetValue(self.normalize)
+
+        self.shuffle_check = wx.CheckBox(panel, label="SHUFFLE")
+        self.shuffle_check.SetForegroundColour(wx.Colour(0, 255, 100))
+        # same order as play_queue.REPEAT_MODES
+        self.repeat_choice = wx.Choice(panel, choices=["Repeat off", "Repeat all", "Repeat one"])
+        self.repeat_choice.SetSelection(REPEAT_MODES.index(self.player.queue.repeat))
+
         # --- Progress slider ---
         prog_label = wx.StaticText(panel, label="PROGRESS")
         prog_label.SetForegroundColour(wx.Colour(0, 255, 100))  
-        self.pos_slider = wx.Slider(
-            panel, value=0, minValue=0, maxValue=100, style=wx.SL_HORIZONTAL
-        )
+        self.pos_slider = WaveformSlider(panel)
         self.pos_slider.SetBackgroundColour(wx.Colour(20, 20, 20))  
 
         # time label
@@ -156,11 +222,19 @@ class MusicPlayer(wx.Frame):
         playlist_title.SetForegroundColour(wx.Colour(0, 255, 100)) 
 
         left_sizer.Add(playlist_title, 0, wx.ALL, 8)
-        left_sizer.Add(self.search_ctrl, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
+        search_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        search_sizer.Add(self.search_ctrl, 1, wx.EXPAND)
+        search_sizer.Add(self.fuzzy_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 8)
+        left_sizer.Add(search_sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
         left_sizer.Add(self.playlist, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
+        left_sizer.Add(self.scan_label, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
 
         # buttons
         btn_sizer.Add(btn_load, 0, wx.ALL, 5)
+        btn_sizer.Add(self.btn_folder, 0, wx.ALL, 5)
+        btn_sizer.Add(self.btn_dupes, 0, wx.ALL, 5)
+        btn_sizer.Add(self.btn_import, 0, wx.ALL, 5)
+        btn_sizer.Add(btn_export, 0, wx.ALL, 5)
         btn_sizer.Add(btn_prev, 0, wx.ALL, 5)
         btn_sizer.Add(btn_play, 0, wx.ALL, 5)
         btn_sizer.Add(btn_next, 0, wx.ALL, 5)
@@ -168,6 +242,10 @@ class MusicPlayer(wx.Frame):
         # volume row
         vol_sizer.Add(vol_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 10)
         vol_sizer.Add(self.vol_slider, 1, wx.EXPAND)
+        vol_sizer.Add(self.gapless_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
+        vol_sizer.Add(self.normalize_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
+        vol_sizer.Add(self.shuffle_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
+        vol_sizer.Add(self.repeat_choice, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
 
         # progress row
         prog_sizer.Add(prog_label, 0, wx.LEFT | wx.TOP, 5)
@@ -188,17 +266,31 @@ class MusicPlayer(wx.Frame):
         panel.SetSizer(main_sizer)
 
         # --- Timer for audio ---
+        # one-shot, re-armed for the next moment the label or slider changes
         self.timer = wx.Timer(self)
         self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.swap_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_swap_timer, self.swap_timer)
+        self.seek_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_seek_timer, self.seek_timer)
 
         # --- Bindings ---
         btn_load.Bind(wx.EVT_BUTTON, self.on_load)
+        self.btn_folder.Bind(wx.EVT_BUTTON, self.on_load_folder)
+        self.btn_dupes.Bind(wx.EVT_BUTTON, self.on_find_duplicates)
+        self.btn_import.Bind(wx.EVT_BUTTON, self.on_open_playlist)
+        btn_export.Bind(wx.EVT_BUTTON, self.on_save_playlist)
         btn_prev.Bind(wx.EVT_BUTTON, self.on_prev)
         btn_play.Bind(wx.EVT_BUTTON, self.on_play_pause)
         btn_next.Bind(wx.EVT_BUTTON, self.on_next)
 
-        self.playlist.Bind(wx.EVT_LISTBOX_DCLICK, self.on_playlist_dclick)
+        self.playlist.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_playlist_dclick)
+        self.playlist.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, self.on_playlist_menu)
         self.vol_slider.Bind(wx.EVT_SLIDER, self.on_volume_change)
+        self.gapless_check.Bind(wx.EVT_CHECKBOX, self.on_gapless_toggle)
+        self.normalize_check.Bind(wx.EVT_CHECKBOX, self.on_normalize_toggle)
+        self.shuffle_check.Bind(wx.EVT_CHECKBOX, self.on_shuffle_toggle)
+        self.repeat_choice.Bind(wx.EVT_CHOICE, self.on_repeat_choice)
 
         # For progress slider:
         
@@ -208,73 +300,384 @@ class MusicPlayer(wx.Frame):
 
         self.search_ctrl.Bind(wx.EVT_TEXT, self.on_search)
         self.search_ctrl.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self.on_search_cancel)
-
-        self.update_playlist_display()
-        self.mc.SetVolume(self.vol_slider.GetValue() / 100)
-
-        self.Show()
+        self.fuzzy_check.Bind(wx.EVT_CHECKBOX, self.on_fuzzy_toggle)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        # the background video pauses while the window is minimized or hidden
+        self.Bind(wx.EVT_ICONIZE, self.on_iconize)
+        self.Bind(wx.EVT_SHOW, self.on_iconize)
+
+        self.restore_session()
+        self.player.set_volume(self.vol_slider.GetValue() / 100)
+        if self.instrumentation is not None:
+            self.setup_stats()
+
+        if fast_start:
+            self.Show()
+            # paint now, then bring up the players once the window is on screen
+            self.Update()
+            wx.CallAfter(self.create_media)
+        else:
+            self.create_media()
+            self.Show()
+        # search postings and missing tags are read after the window is up
+        self.search_index.index_in_background()
+        if self.fuzzy:
+            self.tracklist.fuzzy_index.index_in_background()
+        wx.CallAfter(self.read_missing_tags)
+        wx.CallAfter(self.analyse_loudness)
 
     # -------------- helpers -----------------
 
     def update_playlist_display(self, filter_text=""):
-        """Rebuild the playlist listbox based on the filter text."""
-        self.playlist.Clear()
-        self.display_names = []
+        """Point the virtual playlist at the tracks matching the filter text."""
+        # anything the search worker is still computing is now out of date
+        self.search_worker.cancel()
+        self.playlist.set_rows(self.tracklist.filter(filter_text, self.fuzzy))
+
+    def add_tracks(self, paths, skip_known=False):
+        """Append paths to the library, save them and refresh the playlist."""
+        added = self.tracklist.add(paths, skip_known)
+        self.search_index.index_in_background()
+        self.tag_pipeline.submit(self.library.tag_jobs(self.tracks, added.start, added.stop))
+        self.analyse_loudness(added.start, added.stop)
+        self.refresh_playlist()
+        if self.player.current_index == -1 and self.tracks:
+            self.load_track(0)
+
+    def read_missing_tags(self):
+        if self.tag_pipeline is not None:
+            self.tag_pipeline.submit(self.library.tag_jobs(self.tracks, missing_only=True))
+
+    def on_tags_read(self, results):
+        """A batch of tags came back from the metadata pipeline."""
+        # the pipeline is dropped when the window closes; ignore stragglers
+        if not self or self.tag_pipeline is None or not results:
+            return
+        self.library.save_tags(results)
+        self.metadata.invalidate(track_id for track_id, _, _, _ in results)
+        self.tracklist.fuzzy_index.add_tags(
+            (track_id, meta.title, meta.artist, meta.album) for track_id, _, _, meta in results if meta is not None
+        )
+        self.playlist.Refresh()
 
-        filter_text = filter_text.lower()
-        for full_path in self.tracks:
-            name = os.path.basename(full_path)
-            if not filter_text or filter_text in name.lower():
-                self.display_names.append(name)
-                self.playlist.Append(name)
+    def analyse_loudness(self, start=0, stop=None):
+        """Measure tracks not analysed yet, so their gain is known before they play."""
+        if self.loudness_pipeline is not None and self.normalize:
+            self.loudness_pipeline.submit(self.library.loudness_jobs(self.tracks, start, stop, missing_only=True))
 
-    def load_track(self, index):
-        if index < 0 or index >= len(self.tracks):
+    def on_loudness_read(self, results):
+        if not self or self.loudness_pipeline is None or not results:
             return
+        self.library.save_loudness(results)
+        current = self.player.current_index
+        if any(track_id == current for track_id, _, _, _, _, _ in results):
+            # measured while it plays: level it now rather than from the next track on
+            self.player.set_track_gain(self.track_gain(current))
+
+    def track_gain(self, index):
+        """Normalization factor of track ``index``, from the cache only; 1.0 if not analysed."""
+        if not self.normalize:
+            return 1.0
+        return normalization_gain(*self.library.loudness(index))
+
+    def on_normalize_toggle(self, event):
+        self.normalize = self.normalize_check.GetValue()
+        if self.normalize:
+            self.analyse_loudness()
+        if self.player.current_index >= 0:
+            self.player.set_track_gain(self.track_gain(self.player.current_index))
+
+    def refresh_playlist(self):
+        """Re-apply the current filter after the library changed."""
+        term = self.search_ctrl.GetValue()
+        if term:
+            self.search_worker.submit(term)
+        else:
+            self.update_playlist_display("")
+
+    def restore_session(self):
+        """Bring back the volume, filter and selected track from the last run."""
+        state = self.library.load_state()
+        self.player.restore(state)
+        self.shuffle_check.SetValue(self.player.queue.shuffle)
+        self.repeat_choice.SetSelection(REPEAT_MODES.index(self.player.queue.repeat))
+        self.vol_slider.SetValue(round(self.player.volume * 100))
+        self.gapless = state.get("gapless", self.gapless)
+        self.gapless_check.SetValue(self.gapless)
+        self.normalize = state.get("normalize", self.normalize)
+        self.normalize_check.SetValue(self.normalize)
+        self.fuzzy = state.get("fuzzy", self.fuzzy)
+        self.fuzzy_check.SetValue(self.fuzzy)
+        self.hidden = {track_id for track_id in state.get("hidden", ()) if track_id < len(self.tracks)}
+        for track_id in self.hidden:
+            self.search_index.remove(track_id)
+
+        # drawn after ``hidden`` is applied, so hidden copies never show, filter or not
+        term = state.get("filter", "")
+        if term and self.fuzzy:
+            self.update_playlist_display("")
+            # ChangeValue does not fire EVT_TEXT
+            self.search_ctrl.ChangeValue(term)
+            # the first fuzzy search builds its index: not on the UI thread
+            self.search_worker.submit(term)
+        else:
+            self.search_ctrl.ChangeValue(term)
+            self.update_playlist_display(term)
+
+        index = self.player.resume_index
+        if index is not None:
+            self.now_playing.SetLabel(self.tracks.name(index))
+            self.playlist.set_selection(self.playlist.row_of_track(index))
+
+    def save_session(self):
+        self.library.save_state(
+            filter=self.search_ctrl.GetValue(),
+            gapless=self.gapless,
+            normalize=self.normalize,
+            fuzzy=self.fuzzy,
+            hidden=sorted(self.hidden),
+            **self.player.session_state(),
+        )
 
-        try:
-            self.mc.Stop()
-        except Exception:
-            pass
-        self.timer.Stop()
+    def post_search_results(self, generation, rows):
+        """Called on the search thread; hand the rows to the GUI thread."""
+        wx.CallAfter(self.show_search_results, generation, rows)
 
-        path = self.tracks[index]
-        if self.mc.Load(path):
-            self.current_index = index
-            self.now_playing.SetLabel(os.path.basename(path))
+    def show_search_results(self, generation, rows):
+        if not self or not self.search_worker.is_current(generation):
+            return
+        self.playlist.set_rows(self.tracklist.show(rows))
 
-            def setup_slider():
-                length = self.mc.Length()
-                if length and length > 0:
-              
-                    self.updating_slider = True
-                    try:
-                        self.pos_slider.SetRange(0, length)
-                        self.pos_slider.SetValue(0)
-                    finally:
-                        self.updating_slider = False
-
-                    self.time_label.SetLabel(f"{self.ms_to_time(0)} / {self.ms_to_time(length)}")
-                    self.mc.Play()
-                    self.timer.Start(250)
-                else:
-                    wx.CallLater(100, setup_slider)
+    def create_media(self):
+        """Create the players and the background video; safe to call again.
 
-            setup_slider()
+        Importing wx.media and creating MediaCtrls is the slow part of
+        startup, so in fast-start mode this runs after the first paint.
+        """
+        if self.decks is not None:
+            return
+        import wx.media
+        from wx_backend import MediaCtrlBackend
+
+        panel = self.display_panel.GetParent()
+        mc = wx.media.MediaCtrl(panel, style=wx.SIMPLE_BORDER)
+        mc.Hide()
+
+        # standby player: preloads the next track, then becomes the active deck at the swap
+        standby = wx.media.MediaCtrl(panel, style=wx.SIMPLE_BORDER)
+        standby.Hide()
+        self.decks = GaplessDecks(mc, standby)
+        self.player.backend = MediaCtrlBackend(self.decks)
+        self.player.set_volume(self.player.volume)
+
+        # both decks report here; the handlers tell them apart
+        for deck in (mc, standby):
+            deck.Bind(wx.media.EVT_MEDIA_LOADED, self.on_media_loaded)
+            deck.Bind(wx.media.EVT_MEDIA_FINISHED, self.on_media_finished)
+            deck.Bind(wx.media.EVT_MEDIA_STATECHANGED, self.on_media_state)
+
+        if self.visualizer_mode:
+            self.create_visualizer()
         else:
-            wx.MessageBox(f"Unable to load {path}", "Error", wx.OK | wx.ICON_ERROR)
+            self.create_video()
+
+    def create_visualizer(self):
+        from visualizer import VisualizerPanel
+
+        self.visualizer = VisualizerPanel(self.display_panel, self.clock.position)
+        self.visualizer.SetBackgroundColour(wx.Colour(10, 10, 10))
+        self.display_sizer.Add(self.visualizer, 1, wx.EXPAND | wx.ALL, 0)
+        self.display_panel.Layout()
+        if self.instrumentation is not None:
+            self.instrumentation.extras["visualizer"] = self.visualizer.stats
+
+    def create_video(self):
+        """The looping animation in the now-playing panel."""
+        self.video_player = wx.media.MediaCtrl(
+            self.display_panel,
+            style=wx.SIMPLE_BORDER
+        )
 
-    def on_video_timer(self, event):
-        """Loop video when it finishes - checks every 100ms"""
         try:
-          
-            if self.video_player.GetState() == wx.media.MEDIASTATE_STOPPED:
+     
+            video_path = r"e:\Python\Lib\py\animation.mp4"
+
+            if os.path.exists(video_path):
+            
+                if self.video_player.Load(video_path):
+             
+                    self.video_player.ShowPlayerControls(0)
+
+                    # loops from its own end-of-media event, no polling
+                    self.video_player.Bind(wx.media.EVT_MEDIA_FINISHED, self.on_video_finished)
+                    self.video_loop = VideoLoop(self.video_player, wx.media.MEDIASTATE_PLAYING, self.video_wanted)
+                    self.update_video()
+
+                else:
               
-                self.video_player.Seek(0)
-                
-                self.video_player.Play()
-        except Exception:
-            pass
+                    error_text = wx.StaticText(self.display_panel, label="[VIDEO ERROR]")
+                    error_text.SetForegroundColour(wx.Colour(255, 0, 0))  
+                    self.display_sizer.Add(error_text, 1, wx.ALIGN_CENTER | wx.ALL, 20)
+
+            else:
+            
+                no_file_text = wx.StaticText(
+                    self.display_panel,
+                    label=f"[FILE NOT FOUND]\n{video_path}"
+                )
+                no_file_text.SetForegroundColour(wx.Colour(255, 100, 0)) 
+                self.display_sizer.Add(no_file_text, 1, wx.ALIGN_CENTER | wx.ALL, 20)
+
+        except Exception as e:
+      
+            print(f"Error loading video: {e}")
+            error_text = wx.StaticText(self.display_panel, label=f"[ERROR]\n{str(e)}")
+            error_text.SetForegroundColour(wx.Colour(255, 0, 0))  
+            self.display_sizer.Add(error_text, 1, wx.ALIGN_CENTER | wx.ALL, 20)
+
+    
+        self.display_sizer.Add(self.video_player, 1, wx.EXPAND | wx.ALL, 0)
+        self.display_panel.Layout()
+
+    def setup_stats(self):
+        """Ctrl+Shift+S toggles the stats panel; a JSON snapshot is written every few seconds."""
+        from stats_panel import StatsPanel
+
+        self.instrumentation.extras["progress"] = self.progress.stats
+        self.instrumentation.extras["seeks"] = self.seeker.stats
+        self.instrumentation.extras["loader"] = self.loader.stats
+        self.instrumentation.extras["gapless"] = lambda: self.decks.stats() if self.decks else {}
+        self.stats_panel = StatsPanel(self, self.instrumentation)
+        toggle_id = wx.NewIdRef()
+        self.Bind(wx.EVT_MENU, lambda event: self.stats_panel.toggle(), id=toggle_id)
+        self.SetAcceleratorTable(wx.AcceleratorTable([(wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord("S"), toggle_id)]))
+
+        self.stats_path = os.environ.get("MUSIC_PLAYER_STATS_FILE") or os.path.join(
+            os.path.dirname(default_library_path()), "handler_stats.json"
+        )
+        self.stats_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.dump_stats, self.stats_timer)
+        self.stats_timer.Start(self.STATS_DUMP_MS)
+
+    def dump_stats(self, event=None):
+        try:
+            self.instrumentation.dump(self.stats_path)
+        except OSError as e:
+            print(f"Error writing stats: {e}")
+
+    def load_track(self, index):
+        """Switch to track ``index``: at once if it was read lately, else once the loader has opened it."""
+        if index < 0 or index >= len(self.tracks):
+            return
+        self.create_media()
+        self.playlist.set_selection(self.playlist.row_of_track(index))
+        self.loading_index = index
+        path = self.tracks.path(index)
+        if self.loader.is_ready(path):
+            self.open_track(index)
+            return
+        # the current track keeps playing until this one has opened
+        self.now_playing.SetLabel(f"Loading {self.tracks.name(index)}...")
+        self.loader.open(path, lambda path, error: wx.CallAfter(self.on_track_opened, index, error))
+
+    def on_track_opened(self, index, error):
+        if not self or index != self.loading_index:
+            return  # a later load_track took over
+        if error is None:
+            self.open_track(index)
+        else:
+            self.show_load_error(index, error)
+
+    def open_track(self, index):
+        self.loading_index = None
+        self.stop_progress()
+        if self.player.load(index):
+            self.advancing = False
+            self.skipped = 0
+            self.now_playing.SetLabel(self.tracks.name(index))
+            self.show_track_visuals(index)
+            # playback starts in on_media_loaded, once the length is known
+            self.prefetch_upcoming()
+        else:
+            self.show_load_error(index, "the player cannot open it")
+
+    def prefetch_upcoming(self):
+        """Read ahead the tracks next/prev would switch to, so they start without waiting."""
+        upcoming = self.player.read_ahead(self.PREFETCH_TRACKS)
+        self.loader.prefetch(self.tracks.path(index) for index in upcoming)
+
+    def show_load_error(self, index, reason):
+        """Report a track that would not open in the now-playing label, without a modal dialog."""
+        self.loading_index = None
+        if self.player.current_index != index:
+            # as after a failed load: stopped, and next/prev move on from here
+            self.stop_progress()
+            self.player.select(index)
+        self.now_playing.SetLabel(f"Unable to load {self.tracks.name(index)}: {reason}")
+        self.update_video()
+        if self.advancing and self.skipped < len(self.tracks):
+            # imported playlists can list files that are gone: play on past them
+            self.skipped += 1
+            next_index = self.player.next_index()
+            if next_index is not None:
+                self.load_track(next_index)
+
+    def stop_progress(self):
+        self.timer.Stop()
+        self.swap_timer.Stop()
+        self.seek_timer.Stop()
+        self.seeker.begin()
+        self.clock.length = 0
+        self.clock.sync(0, False)
+
+    def show_track_visuals(self, index):
+        self.request_waveform(index)
+        if self.visualizer is not None:
+            self.visualizer.set_track(self.tracks.path(index))
+
+    def request_waveform(self, index):
+        """Show the track's overview on the seek bar once it is read (or computed)."""
+        self.pos_slider.set_envelope(None)
+        if self.waveforms is None:
+            # NumPy is imported with the first track, not at startup
+            from waveform import EnvelopeCache, EnvelopeLoader
+
+            folder = os.path.join(os.path.dirname(default_library_path()), "waveforms")
+            self.waveforms = EnvelopeLoader(
+                EnvelopeCache(folder), lambda path, levels: wx.CallAfter(self.show_waveform, path, levels)
+            )
+        self.waveforms.request(self.tracks.path(index))
+
+    def show_waveform(self, path, levels):
+        if not self or levels is None:
+            return
+        index = self.player.current_index
+        if 0 <= index < len(self.tracks) and self.tracks.path(index) == path:
+            self.pos_slider.set_envelope(levels)
+
+    def video_wanted(self):
+        return self.clock.playing and self.IsShown() and not self.IsIconized()
+
+    def update_video(self):
+        """Run the background video only while it can be seen and music is playing."""
+        if self.visualizer is not None:
+            self.visualizer.set_running(self.video_wanted())
+        if self.video_loop is not None:
+            self.video_loop.update()
+
+    def on_video_finished(self, event):
+        """Loop the video: rewind it when it reaches the end."""
+        # some backends ignore Play() from inside their own finished event
+        wx.CallAfter(self.restart_video)
+
+    def restart_video(self):
+        if not self or self.video_loop is None:
+            return
+        self.video_loop.restart()
+
+    def on_iconize(self, event):
+        wx.CallAfter(self.update_video)
+        event.Skip()
 
     # -------------- events -------------------
 
@@ -282,74 +685,276 @@ class MusicPlayer(wx.Frame):
         dlg = wx.FileDialog(
             self,
             message="Choose audio files",
-            wildcard="Audio files (*.mp3;*.wav;*.ogg;*.flac)|*.mp3;*.wav;*.ogg;*.flac|All files (*.*)|*.*",
+            wildcard=audio_wildcard(),
             style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST | wx.FD_MULTIPLE,
         )
         if dlg.ShowModal() == wx.ID_OK:
-            paths = dlg.GetPaths()
-            for p in paths:
-                self.tracks.append(p)
-            self.update_playlist_display(self.search_ctrl.GetValue())
-            if self.current_index == -1 and self.tracks:
-                self.playlist.SetSelection(0)
-                self.load_track(0)
+            self.add_tracks(dlg.GetPaths())
         dlg.Destroy()
 
-    def on_prev(self, event):
-        if not self.tracks:
+    def on_load_folder(self, event):
+        # the button doubles as "cancel" while a scan is running
+        if self.scanner is not None:
+            self.scanner.cancel()
             return
-        new_index = (self.current_index - 1) % len(self.tracks)
-        self.current_index = new_index
-        name = os.path.basename(self.tracks[new_index])
-        idx = self.playlist.FindString(name)
-        if idx != wx.NOT_FOUND:
-            self.playlist.SetSelection(idx)
-        self.load_track(new_index)
 
-    def on_next(self, event):
-        if not self.tracks:
+        dlg = wx.DirDialog(self, "Choose a music folder", style=wx.DD_DEFAULT_STYLE | wx.DD_DIR_MUST_EXIST)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.scanner = FolderScanner(
+                [dlg.GetPath()],
+                on_batch=lambda paths, progress: wx.CallAfter(self.on_scan_batch, paths, progress),
+                on_done=lambda progress, cancelled: wx.CallAfter(self.on_scan_done, progress, cancelled),
+            )
+            self.btn_folder.SetLabel("CANCEL SCAN")
+            self.scan_label.SetLabel("Scanning...")
+            self.scanner.start()
+        dlg.Destroy()
+
+    def on_scan_batch(self, paths, progress):
+        # scanner is cleared when the window closes; late batches are dropped
+        if not self or self.scanner is None:
+            return
+        if paths:
+            self.add_tracks(paths)
+        self.scan_label.SetLabel(f"Scanning... {progress.files} tracks in {progress.folders} folders")
+
+    def on_scan_done(self, progress, cancelled):
+        if not self:
+            return
+        self.scanner = None
+        self.btn_folder.SetLabel("LOAD FOLDER")
+        status = "cancelled" if cancelled else "done"
+        text = f"Scan {status}: {progress.files} tracks in {progress.folders} folders"
+        if progress.errors:
+            text += f", {progress.errors} unreadable"
+        self.scan_label.SetLabel(text)
+
+    def on_open_playlist(self, event):
+        # the button doubles as "cancel" while a playlist is read
+        if self.importer is not None:
+            self.importer.cancel()
+            return
+
+        dlg = wx.FileDialog(
+            self,
+            message="Open a playlist",
+            wildcard=playlist_wildcard(),
+            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST,
+        )
+        if dlg.ShowModal() == wx.ID_OK:
+            self.importer = PlaylistImporter(
+                dlg.GetPath(),
+                on_batch=lambda paths, count: wx.CallAfter(self.on_import_batch, paths, count),
+                on_done=lambda count, cancelled, error: wx.CallAfter(self.on_import_done, count, cancelled, error),
+            )
+            self.btn_import.SetLabel("CANCEL IMPORT")
+            self.scan_label.SetLabel("Reading playlist...")
+            self.importer.start()
+        dlg.Destroy()
+
+    def on_import_batch(self, paths, count):
+        # importer is cleared when the window closes; late batches are dropped
+        if not self or self.importer is None:
+            return
+        # tracks already in the library are not added again
+        self.add_tracks(paths, skip_known=True)
+        self.scan_label.SetLabel(f"Reading playlist... {count} tracks")
+
+    def on_import_done(self, count, cancelled, error):
+        if not self:
+            return
+        self.importer = None
+        self.btn_import.SetLabel("OPEN PLAYLIST")
+        if error is not None:
+            self.scan_label.SetLabel(f"Playlist import stopped after {count} tracks: {error}")
+        else:
+            status = "cancelled" if cancelled else "done"
+            self.scan_label.SetLabel(f"Playlist import {status}: {count} tracks")
+
+    def on_save_playlist(self, event):
+        """Write the tracks shown (the current filter and order) to a playlist file."""
+        dlg = wx.FileDialog(
+            self,
+            message="Save the playlist",
+            wildcard=playlist_wildcard(),
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
+        )
+        if dlg.ShowModal() == wx.ID_OK:
+            path = dlg.GetPath()
+            if not os.path.splitext(path)[1]:
+                # the first filter takes every format; default to UTF-8 M3U there
+                path += PLAYLIST_EXTENSIONS[dlg.GetFilterIndex() - 1] if dlg.GetFilterIndex() else ".m3u8"
+            try:
+                with wx.BusyCursor():
+                    count = write_playlist(path, self.tracklist.entries(), relative=True)
+            except (OSError, ValueError) as e:
+                self.scan_label.SetLabel(f"Could not save the playlist: {e}")
+            else:
+                self.scan_label.SetLabel(f"Saved {count} tracks to {os.path.basename(path)}")
+        dlg.Destroy()
+
+    def on_find_duplicates(self, event):
+        # the button doubles as "cancel" while fingerprints are computed
+        if self.fingerprinter is not None:
+            self.fingerprinter.close()
+            self.fingerprinter = None
+            self.btn_dupes.SetLabel("FIND DUPES")
+            self.scan_label.SetLabel("Duplicate search cancelled")
+            return
+        # NumPy and the worker processes only start when asked for
+        from fingerprint import fingerprint_batch
+
+        self.fingerprinted = 0
+        self.fingerprinter = MetadataPipeline(
+            lambda results: wx.CallAfter(self.on_fingerprints_read, results),
+            on_done=lambda: wx.CallAfter(self.on_fingerprints_done),
+            batch_size=8,
+            scan=fingerprint_batch,
+        )
+        self.btn_dupes.SetLabel("CANCEL DUPES")
+        self.scan_label.SetLabel("Fingerprinting...")
+        # unchanged files keep their cached fingerprint and are not decoded again
+        self.fingerprinter.submit(self.library.fingerprint_jobs(self.tracks))
+        if not self.fingerprinter.busy:
+            self.on_fingerprints_done()
+
+    def on_fingerprints_read(self, results):
+        if not self or self.fingerprinter is None:
             return
-        new_index = (self.current_index + 1) % len(self.tracks)
-        self.current_index = new_index
-        name = os.path.basename(self.tracks[new_index])
-        idx = self.playlist.FindString(name)
-        if idx != wx.NOT_FOUND:
-            self.playlist.SetSelection(idx)
-        self.load_track(new_index)
+        self.library.save_fingerprints(results)
+        self.fingerprinted += len(results)
+        self.scan_label.SetLabel(f"Fingerprinting... {self.fingerprinted} new or changed files")
+
+    def on_fingerprints_done(self):
+        if not self or self.fingerprinter is None:
+            return
+        self.fingerprinter.close()
+        self.fingerprinter = None
+        self.btn_dupes.SetLabel("FIND DUPES")
+        self.scan_label.SetLabel("Comparing fingerprints...")
+        prints = [(track_id, bits) for track_id, bits in self.library.fingerprints() if track_id not in self.hidden]
+
+        def compare():
+            from fingerprint import DuplicateIndex
+
+            index = DuplicateIndex()
+            index.add(prints)
+            groups = index.duplicates()
+            wx.CallAfter(self.show_duplicates, groups)
+
+        threading.Thread(target=compare, name="duplicates", daemon=True).start()
+
+    def show_duplicates(self, groups):
+        if not self:
+            return
+        extra = [track_id for group in groups for track_id in group[1:]]
+        if not extra:
+            self.scan_label.SetLabel("No duplicates found")
+            return
+        self.scan_label.SetLabel(f"{len(extra)} extra copies of {len(groups)} songs")
+        # the first copy added is the one kept
+        lines = [f"{self.tracks.name(group[0])} (x{len(group)})" for group in groups[:10]]
+        if len(groups) > 10:
+            lines.append(f"... and {len(groups) - 10} more")
+        dlg = wx.MessageDialog(
+            self,
+            f"{len(groups)} songs are in the library more than once:\n\n" + "\n".join(lines)
+            + f"\n\nHide the {len(extra)} extra copies from the playlist?",
+            "Duplicates",
+            wx.YES_NO | wx.ICON_QUESTION,
+        )
+        if dlg.ShowModal() == wx.ID_YES:
+            self.hide_tracks(extra)
+        dlg.Destroy()
+
+    def hide_tracks(self, track_ids):
+        for track_id in track_ids:
+            self.search_index.remove(track_id)
+        self.hidden.update(track_ids)
+        self.refresh_playlist()
+
+    def on_prev(self, event):
+        index = self.player.prev_index()
+        if index is not None:
+            self.load_track(index)
+
+    def on_next(self, event):
+        # no event: the track ended by itself, and repeat-one plays it again
+        index = self.player.next_index(auto=event is None)
+        # None: the end of the list with repeat off, or nothing shown
+        if index is not None:
+            self.load_track(index)
 
     def on_play_pause(self, event):
-        if self.mc.GetState() != wx.media.MEDIASTATE_PLAYING:
-            self.mc.Play()
-            self.timer.Start(250)
+        self.create_media()
+        if self.player.resume_index is not None:
+            self.load_track(self.player.resume_index)
+            return
+        playing = self.player.toggle()
+        self.clock.sync(self.player.backend.tell(), playing)
+        self.update_video()
+        if playing:
+            self.schedule_progress()
         else:
-            self.mc.Pause()
             self.timer.Stop()
+            self.swap_timer.Stop()
 
     def on_playlist_dclick(self, event):
-        sel = self.playlist.GetSelection()
+        sel = event.GetIndex()
         if sel == wx.NOT_FOUND:
             return
-        name = self.playlist.GetString(sel)
-        for i, p in enumerate(self.tracks):
-            if os.path.basename(p) == name:
-                self.load_track(i)
-                self.current_index = i
-                break
+        self.load_track(self.playlist.track_at(sel))
+
+    def on_playlist_menu(self, event):
+        row = event.GetIndex()
+        if row == wx.NOT_FOUND:
+            return
+        track_id = self.playlist.track_at(row)
+        queue = self.player.queue
+        menu = wx.Menu()
+        play_next = menu.Append(wx.ID_ANY, "Play next")
+        enqueue = menu.Append(wx.ID_ANY, "Add to queue")
+        clear = menu.Append(wx.ID_ANY, f"Clear queue ({len(queue.queue)})")
+        clear.Enable(bool(queue.queue))
+        self.Bind(wx.EVT_MENU, lambda event: self.queue_tracks(queue.play_next, track_id), play_next)
+        self.Bind(wx.EVT_MENU, lambda event: self.queue_tracks(queue.enqueue, track_id), enqueue)
+        self.Bind(wx.EVT_MENU, lambda event: self.queue_tracks(lambda ids: queue.clear_queue()), clear)
+        self.playlist.PopupMenu(menu)
+        menu.Destroy()
+
+    def queue_tracks(self, action, *track_ids):
+        action(track_ids)
+        self.scan_label.SetLabel(f"{len(self.player.queue.queue)} tracks queued")
+        self.after_order_change()
+
+    def on_shuffle_toggle(self, event):
+        self.player.queue.set_shuffle(self.shuffle_check.GetValue())
+        self.after_order_change()
+
+    def on_repeat_choice(self, event):
+        self.player.queue.set_repeat(REPEAT_MODES[self.repeat_choice.GetSelection()])
+        self.after_order_change()
+
+    def after_order_change(self):
+        """What plays next changed: read ahead the new tracks, and preload the next one for gapless."""
+        if self.player.current_index < 0:
+            return
+        self.prefetch_upcoming()
+        if self.decks is not None and self.decks.preloaded is not None:
+            self.preload_next()
 
     def on_volume_change(self, event):
-        volume = self.vol_slider.GetValue() / 100
-        try:
-            self.mc.SetVolume(volume)
-        except Exception:
-            pass
+        self.player.set_volume(self.vol_slider.GetValue() / 100)
         # allow default processing as well
         event.Skip()
 
     def on_slider_down(self, event):
 
         self.is_dragging = True
+        self.seeker.begin()
         try:
             self.timer.Stop()
+            self.swap_timer.Stop()
         except Exception:
             pass
         
@@ -358,22 +963,21 @@ class MusicPlayer(wx.Frame):
     def on_slider_up(self, event):
      
         self.is_dragging = False
+        self.seek_timer.Stop()
         try:
             pos = self.pos_slider.GetValue()
-            if self.mc.Length() > 0:
-                try:
-                    self.mc.Seek(pos)
-                except Exception:
-                    pass
-                self.time_label.SetLabel(f"{self.ms_to_time(pos)} / {self.ms_to_time(self.mc.Length())}")
+            if self.clock.length > 0:
+                # the one seek that has to land: where the drag ended
+                self.seeker.release(pos)
+                self.clock.sync(pos)
         except Exception:
             pass
 
-        if self.mc.GetState() == wx.media.MEDIASTATE_PLAYING:
-            try:
-                self.timer.Start(250)
-            except Exception:
-                pass
+        # the slider was moved by hand, so redraw from scratch
+        self.progress.reset()
+        self.refresh_progress()
+        if self.clock.playing:
+            self.schedule_progress()
 
      
         event.Skip()
@@ -388,71 +992,233 @@ class MusicPlayer(wx.Frame):
         except Exception:
             pos = self.pos_slider.GetValue()
 
-        length = self.mc.Length()
+        length = self.clock.length
         if length > 0:
             pos = max(0, min(pos, length))
-            try:
-                
-                self.mc.Seek(pos)
-            except Exception:
-                pass
-            self.time_label.SetLabel(f"{self.ms_to_time(pos)} / {self.ms_to_time(length)}")
+            label = self.time_text.text(pos)
+            if label is not None:
+                self.time_label.SetLabel(label)
+            if self.is_dragging:
+                # the label previews the drag; the backend gets the latest position when it is free
+                delay = self.seeker.drag(pos)
+                if delay:
+                    self.seek_timer.StartOnce(delay)
+            else:
+                self.seeker.release(pos)
+                self.clock.sync(pos)
+                self.progress.reset()
 
        
         event.Skip()
 
-    def on_timer(self, event):
-        if self.mc.GetState() == wx.media.MEDIASTATE_PLAYING:
-            length = self.mc.Length()
-            if length > 0:
-                pos = self.mc.Tell()
-                if pos < 0:
-                    pos = 0
-                elif pos > length:
-                    pos = length
-                if not self.is_dragging:
-                   
-                    self.updating_slider = True
-                    try:
-                        self.pos_slider.SetRange(0, length)
-                        self.pos_slider.SetValue(pos)
-                    finally:
-                        self.updating_slider = False
-                self.time_label.SetLabel(f"{self.ms_to_time(pos)} / {self.ms_to_time(length)}")
+    def on_seek_timer(self, event):
+        if not self.is_dragging:
+            return
+        delay = self.seeker.flush()
+        if delay:
+            self.seek_timer.StartOnce(delay)
 
-              
-                if pos >= length - 500 and self.current_index is not None:
-                    self.on_next(None)
+    def on_media_loaded(self, event):
+        if event.GetEventObject() is not self.decks.active:
+            self.decks.standby_loaded()
+            return
+        self.player.start()
+        self.start_progress(self.player.backend.length())
+        self.preload_next()
+
+    def start_progress(self, length):
+        """Reset the slider, label and clock for a track that just started playing."""
+        length = max(length, 0)
+        self.clock.length = length
+        self.updating_slider = True
+        try:
+            self.pos_slider.SetRange(0, max(length, 1))
+            self.pos_slider.SetValue(0)
+        finally:
+            self.updating_slider = False
+        self.progress.reset()
+        self.time_text.set_length(length)
+        self.time_label.SetLabel(self.time_text.text(0))
+        self.clock.sync(0, True)
+        self.schedule_progress()
+        self.update_video()
+
+    def on_media_finished(self, event):
+        if event.GetEventObject() is not self.decks.active:
+            return
+        self.decks.mark_end()
+        self.timer.Stop()
+        self.swap_timer.Stop()
+        self.clock.sync(self.clock.length, False)
+        self.advancing = True
+        self.on_next(None)
+
+    def on_media_state(self, event):
+        if event.GetEventObject() is not self.decks.active:
+            return
+        playing = self.player.backend.is_playing()
+        if playing and self.decks.mark_started():
+            self.show_gap_stats()
+        if playing == self.clock.playing:
+            return
+        self.clock.sync(self.player.backend.tell(), playing)
+        self.update_video()
+        if playing:
+            self.schedule_progress()
         else:
-            try:
-                self.timer.Stop()
-            except Exception:
-                pass
+            self.timer.Stop()
+            self.swap_timer.Stop()
+            self.refresh_progress()
 
-    def ms_to_time(self, ms):
-        """Convert milliseconds to MM:SS"""
+    def on_timer(self, event):
+        if self.progress_updater.tick(self.pos_slider.GetSize().width, self.is_dragging):
+            self.schedule_progress()
+
+    def refresh_progress(self):
+        """Bring the time label and slider up to date, touching only what changed."""
+        self.progress_updater.refresh(self.pos_slider.GetSize().width, self.is_dragging)
+
+    def show_slider_position(self, pos):
+        self.updating_slider = True
         try:
-            ms = int(ms)
-            if ms <= 0:
-                return "00:00"
-            s = ms // 1000
-            m = s // 60
-            s = s % 60
-            return f"{m:02d}:{s:02d}"
-        except Exception:
-            return "00:00"
+            self.pos_slider.SetValue(pos)
+        finally:
+            self.updating_slider = False
+
+    def schedule_progress(self):
+        delay = self.progress_updater.next_in(self.pos_slider.GetSize().width, self.is_dragging)
+        if delay is None:
+            return
+        self.timer.StartOnce(delay)
+        remaining = self.clock.length - self.clock.position()
+        if self.gapless and remaining <= delay + SWAP_LEAD_MS:
+            self.swap_timer.StartOnce(max(remaining - SWAP_LEAD_MS, 1))
+
+    # -------------- gapless -----------------
+
+    def preload_next(self):
+        if self.gapless and self.tracks:
+            index = self.player.next_index(auto=True)
+            if index is None:
+                return
+            path = self.tracks.path(index)
+            if self.loader.is_ready(path):
+                self.decks.preload(index, path)
+            else:
+                # the standby's Load would block on storage too; open it in the background first
+                self.loader.open(path, lambda path, error: wx.CallAfter(self.on_next_opened, index, error))
+
+    def on_next_opened(self, index, error):
+        if not self or error is not None or not self.gapless or self.decks is None:
+            return
+        if index == self.player.next_index(auto=True) and self.loading_index is None:
+            self.decks.preload(index, self.tracks.path(index))
+
+    def on_swap_timer(self, event):
+        if not self.gapless or not self.clock.playing:
+            return
+        self.clock.sync(self.player.backend.tell())
+        remaining = self.clock.length - self.clock.position()
+        if remaining > 2 * SWAP_LEAD_MS:
+            # seeked (or the clock drifted) since the timer was armed
+            self.schedule_progress()
+            return
+        index = self.player.next_index(auto=True)
+        if index is None:
+            return  # the end of the list with repeat off: let it finish
+        self.decks.mark_end(remaining)
+        gain = self.track_gain(index)
+        if not self.decks.swap(index, self.player.volume * gain):
+            # not preloaded in time: EVT_MEDIA_FINISHED falls back to a normal load
+            return
+        self.player.current_index = index
+        self.player.track_gain = gain
+        self.playlist.set_selection(self.playlist.row_of_track(index))
+        self.now_playing.SetLabel(self.tracks.name(index))
+        self.show_track_visuals(index)
+        self.start_progress(self.player.backend.length())
+        self.preload_next()
+        self.prefetch_upcoming()
+
+    def on_gapless_toggle(self, event):
+        self.gapless = self.gapless_check.GetValue()
+        if self.decks is None:
+            return
+        if not self.gapless:
+            self.swap_timer.Stop()
+            self.decks.discard()
+        elif self.clock.playing:
+            self.preload_next()
+
+    def show_gap_stats(self):
+        stats = self.decks.stats()
+        self.gapless_check.SetToolTip(
+            f"Last transition: {stats['last_gap_ms']:.0f} ms, "
+            f"worst: {stats['max_gap_ms']:.0f} ms over {stats['transitions']} tracks"
+        )
+
+    def ms_to_time(self, ms):
+        return format_time(ms)
 
     def on_search(self, event):
         term = self.search_ctrl.GetValue()
-        self.update_playlist_display(term)
+        if term:
+            self.search_worker.submit(term)
+        else:
+            # clearing the filter is instant, no need to go through the worker
+            self.update_playlist_display("")
+
+    def on_fuzzy_toggle(self, event):
+        self.fuzzy = self.fuzzy_check.GetValue()
+        if self.fuzzy:
+            self.tracklist.fuzzy_index.index_in_background()
+        self.refresh_playlist()
 
     def on_search_cancel(self, event):
         self.search_ctrl.SetValue("")
         self.update_playlist_display("")
 
+    def on_close(self, event):
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner = None
+        if self.importer is not None:
+            self.importer.cancel()
+            self.importer = None
+        self.search_worker.close()
+        self.loader.close()
+        if self.waveforms is not None:
+            self.waveforms.close()
+        self.tag_pipeline.close()
+        self.tag_pipeline = None
+        if self.fingerprinter is not None:
+            self.fingerprinter.close()
+            self.fingerprinter = None
+        self.loudness_pipeline.close()
+        self.loudness_pipeline = None
+        self.save_session()
+        self.tracklist.save()
+        self.library.close()
+        if self.instrumentation is not None:
+            self.stats_timer.Stop()
+            self.dump_stats()
+        event.Skip()
+
 
 if __name__ == "__main__":
     app = wx.App(False)
-    MusicPlayer()
+    # --fast-start shows the window before the media players exist
+    frame = MusicPlayer(
+        fast_start="--fast-start" in sys.argv,
+        # handler timing, stats panel (Ctrl+Shift+S) and JSON dumps
+        instrument="--stats" in sys.argv or bool(os.environ.get("MUSIC_PLAYER_STATS")),
+        # spectrum bars from the audio instead of the animation video
+        visualizer="--visualizer" in sys.argv,
+    )
+    if "--startup-probe" in sys.argv:
+        # used by benchmarks.py startup: report the first paint, then quit
+        frame.Update()
+        print("first-frame", file=sys.stderr, flush=True)
+        wx.CallAfter(frame.Close)
     app.MainLoop()
 
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".flac")
+
+ScanProgress = namedtuple("ScanProgress", "folders files errors")
+
+
+def audio_wildcard():
+    """wx.FileDialog wildcard for the same extensions the folder scan accepts."""
+    patterns = ";".join("*" + ext for ext in AUDIO_EXTENSIONS)
+    return f"Audio files ({patterns})|{patterns}|All files (*.*)|*.*"
+
+
+def is_audio_file(name):
+    return name.lower().endswith(AUDIO_EXTENSIONS)
+
+
+class FolderScanner:
+    """Recursive folder import that streams audio files back while it runs.
+
+    Every directory is one ``os.scandir`` task on a thread pool, and each
+    subdirectory found becomes a new task, so slow network shares are read
+    in parallel. Matching files are handed to ``on_batch(paths, progress)``
+    every ``batch_size`` files or ``batch_interval`` seconds, whichever
+    comes first; ``on_done(progress, cancelled)`` follows the last batch.
+
+    Both callbacks run on worker threads. Folders that cannot be read are
+    counted in ``progress.errors`` and skipped.
+    """
+
+    def __init__(self, roots, on_batch, on_done, workers=8, batch_size=500, batch_interval=0.1):
+        self.roots = list(roots)
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="folder-scan")
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        # keeps callbacks in order: a batch is never overtaken by a later one or by on_done
+        self._deliver_lock = threading.Lock()
+        self._outstanding = 0
+        self._found = []
+        self._last_flush = time.monotonic()
+        self._folders = 0
+        self._files = 0
+        self._errors = 0
+
+    @property
+    def progress(self):
+        return ScanProgress(self._folders, self._files, self._errors)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        if not self.roots:
+            self.on_done(self.progress, False)
+            return
+        with self._lock:
+            self._outstanding = len(self.roots)
+        for root in self.roots:
+            self._pool.submit(self._scan, root)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _submit(self, folder):
+        with self._lock:
+            self._outstanding += 1
+        self._pool.submit(self._scan, folder)
+
+    def _scan(self, folder):
+        found = []
+        try:
+            if not self._cancelled.is_set():
+                subfolders = []
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subfolders.append(entry.path)
+                            elif is_audio_file(entry.name) and entry.is_file():
+                                found.append(entry.path)
+                        except OSError:
+                            continue
+                found.sort()
+                for subfolder in sorted(subfolders):
+                    self._submit(subfolder)
+        except OSError:
+            with self._lock:
+                self._errors += 1
+        finally:
+            self._finish_folder(found)
+
+    def _finish_folder(self, found):
+        with self._lock:
+            self._outstanding -= 1
+            self._folders += 1
+            self._files += len(found)
+            self._found.extend(found)
+            finished = self._outstanding == 0
+            now = time.monotonic()
+            if not (finished or len(self._found) >= self.batch_size
+                    or now - self._last_flush >= self.batch_interval):
+                return
+            batch, self._found = self._found, []
+            self._last_flush = now
+            progress = self.progress
+            self._deliver_lock.acquire()
+
+        try:
+            # an empty batch still reports progress through folders without audio
+            if (batch or not finished) and not self._cancelled.is_set():
+                self.on_batch(batch, progress)
+            if finished:
+                self._pool.shutdown(wait=False)
+                self.on_done(progress, self._cancelled.is_set())
+        finally:
+            self._deliver_lock.release()
@@ -0,0 +1,253 @@
+"""Ranked, typo-tolerant search over track names, titles, artists and albums.
+
+Every field is split into words, and each distinct word has a posting
+list (track ids) per field, so a query only ever looks at tracks sharing
+a word with it. A query word scores against a library word:
+
+    exact match                     3.0
+    prefix of it                    1.5 to 2.5, more the more of it is typed
+    one edit away (4+ letters)      1.0
+
+times the field weight. A track has to match every query word; its score
+is the sum of each word's best match, and only the ``limit`` best tracks
+are pulled out of the candidates with a heap, never sorting them all.
+
+Typos are looked up in a deletion index: every library word is filed
+under each of its one-letter deletions, so two words within one edit
+(insertion, deletion, substitution or swap) share an entry.
+"""
+
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+from search_index import BUILD_BATCH, Indexer
+
+WORD = re.compile(r"\w+")
+# the basename and the title tag both count as the name
+FIELD_WEIGHTS = (("name", 1.0), ("artist", 0.8), ("album", 0.6))
+FIELDS = tuple(field for field, _ in FIELD_WEIGHTS)
+EXACT, PREFIX, TYPO = 3.0, 1.5, 1.0
+# shorter query words are not typo-matched: too many one-edit neighbours
+TYPO_MIN_LENGTH = 4
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class FuzzyIndex:
+    """Word postings over the names in ``names`` (a ``SearchIndex``) and tags.
+
+    Names are picked up from the SearchIndex as tracks are added. Tags come
+    from ``tags()`` (rows of track id, title, artist, album), read once when
+    the index is first built, and from ``add_tags`` after that. Rows added
+    while that first read runs are queued too, and win over what it read
+    for the same tracks, so nothing is lost or posted twice. A newer row
+    of a track (its file was edited) takes back the words of the old one.
+
+    Building and searching happen on background threads (the search
+    worker, or the indexer thread of ``index_in_background``) and hold the build lock;
+    ``add_tags`` only queues rows, under the lock that guards the queue
+    and the start of the first read.
+    """
+
+    def __init__(self, names, tags=None):
+        self._names = names
+        self._tags = tags
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending_tags = []
+        self._tags_started = False  # the first build began reading tags(); guarded by _pending_lock
+        self._tags_loaded = False
+        self._indexed = 0  # names[:_indexed] are in the name postings
+        self._postings = {field: {} for field, _ in FIELD_WEIGHTS}
+        self._deletes = {}
+        self._vocabulary = set()
+        self._sorted = []  # the vocabulary in order, for prefix ranges
+        self._new_words = set()
+        # words each track's tags were posted under, so a newer row can take them back:
+        # _tag_words[_tag_start[id]:_tag_stop[id]] holds word id * 3 + index in FIELDS
+        self._word_ids = {}
+        self._words_by_id = []
+        self._tag_start = array("I")
+        self._tag_stop = array("I")
+        self._tag_words = array("I")
+        self._indexer = Indexer(self.index_pending, "fuzzy-index")
+
+    def add_tags(self, rows):
+        """Queue (track id, title, artist, album) rows, e.g. freshly read tags."""
+        with self._pending_lock:
+            if self._tags_started or self._tags is None:
+                self._pending_tags.extend(rows)
+            # otherwise they are saved already, and the first build reads them from ``tags()``
+
+    def index_pending(self):
+        with self._lock:
+            self._index_pending()
+
+    def index_in_background(self):
+        self._indexer.wake()
+
+    def search(self, query, limit=500, cancelled=None):
+        """Ids of the ``limit`` best matches for ``query``, best first.
+
+        Returns None if ``cancelled()`` became true before the search finished.
+        """
+        query_words = words(query)
+        if not query_words:
+            return []
+        with self._lock:
+            self._index_pending()
+            matched = []
+            for word in query_words:
+                if cancelled is not None and cancelled():
+                    return None
+                scores = self._word_scores(word)
+                if not scores:
+                    return []
+                matched.append(scores)
+
+        # start from the rarest word, so each step only shrinks the candidates
+        matched.sort(key=len)
+        total = matched[0]
+        for scores in matched[1:]:
+            if cancelled is not None and cancelled():
+                return None
+            # the key intersection runs in C; only the survivors are summed here
+            total = {track_id: total[track_id] + scores[track_id] for track_id in total.keys() & scores.keys()}
+        for track_id in self._names.removed():
+            total.pop(track_id, None)
+        return heapq.nlargest(limit, total, key=total.__getitem__)
+
+    # -------------- helpers -----------------
+
+    def _word_scores(self, word):
+        """Best score of every track for one query word."""
+        sources = []
+        for match, score in self._matches(word):
+            for field, weight in FIELD_WEIGHTS:
+                ids = self._postings[field].get(match)
+                if ids:
+                    sources.append((score * weight, ids))
+        # lowest first: a better match of the same track overwrites a worse one
+        sources.sort(key=lambda source: source[0])
+        scores = {}
+        for score, ids in sources:
+            scores.update(dict.fromkeys(ids, score))
+        return scores
+
+    def _matches(self, word):
+        """(library word, score) for every word ``word`` matches."""
+        vocabulary = self._sorted
+        matches = {}
+        start = bisect_left(vocabulary, word)
+        # islice, not a slice: that would copy the rest of the vocabulary for every query word
+        for candidate in islice(vocabulary, start, None):
+            if not candidate.startswith(word):
+                break
+            matches[candidate] = EXACT if candidate == word else PREFIX + len(word) / len(candidate)
+        if len(word) >= TYPO_MIN_LENGTH:
+            deletes = self._deletes
+            neighbours = set(deletes.get(word, ()))
+            for deleted in deletions(word):
+                neighbours.update(deletes.get(deleted, ()))
+                if deleted in self._vocabulary:
+                    neighbours.add(deleted)
+            for candidate in neighbours:
+                matches.setdefault(candidate, TYPO)
+        return matches.items()
+
+    def _index_pending(self):
+        if not self._tags_loaded:
+            self._load_tags()
+
+        names = self._postings["name"]
+        while True:
+            batch = self._names.names(self._indexed, self._indexed + BUILD_BATCH)
+            if not batch:
+                break
+            for track_id, name in enumerate(batch, self._indexed):
+                self._post(names, words(name), track_id)
+            self._indexed += len(batch)
+
+        with self._pending_lock:
+            rows, self._pending_tags = self._pending_tags, []
+        for row in rows:
+            self._post_tags(*row)
+
+        if self._new_words:
+            for word in self._new_words:
+                if len(word) >= TYPO_MIN_LENGTH:
+                    for deleted in deletions(word):
+                        self._deletes.setdefault(deleted, []).append(word)
+            self._vocabulary.update(self._new_words)
+            self._sorted = sorted(self._vocabulary)
+            self._new_words = set()
+
+    def _load_tags(self):
+        """First build: queue every row of ``tags()`` ahead of the rows added meanwhile."""
+        if self._tags is not None:
+            with self._pending_lock:
+                self._tags_started = True
+            rows = list(self._tags())
+            with self._pending_lock:
+                # rows queued during the read are newer than whatever it saw of those tracks
+                queued = {row[0] for row in self._pending_tags}
+                self._pending_tags[:0] = [row for row in rows if row[0] not in queued]
+        self._tags_loaded = True
+
+    def _post_tags(self, track_id, title, artist, album):
+        """Post one row of tags, in place of any row of the same track posted before."""
+        if track_id < len(self._tag_stop) and self._tag_stop[track_id] > self._tag_start[track_id]:
+            self._unpost_tags(track_id)
+        codes = []
+        for field_index, (field, text) in enumerate(zip(FIELDS, (title, artist, album))):
+            if text:
+                for word in self._post(self._postings[field], words(text), track_id):
+                    codes.append(self._word_id(word) * 3 + field_index)
+        if not codes:
+            return
+        missing = track_id + 1 - len(self._tag_stop)
+        if missing > 0:
+            self._tag_start.frombytes(bytes(missing * self._tag_start.itemsize))
+            self._tag_stop.frombytes(bytes(missing * self._tag_stop.itemsize))
+        self._tag_start[track_id] = len(self._tag_words)
+        self._tag_words.extend(codes)
+        self._tag_stop[track_id] = len(self._tag_words)
+
+    def _unpost_tags(self, track_id):
+        # the old span stays in _tag_words unused; tags are read again rarely
+        for code in self._tag_words[self._tag_start[track_id]:self._tag_stop[track_id]]:
+            self._postings[FIELDS[code % 3]][self._words_by_id[code // 3]].remove(track_id)
+        self._tag_stop[track_id] = self._tag_start[track_id]
+
+    def _word_id(self, word):
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._words_by_id)
+            self._words_by_id.append(word)
+        return word_id
+
+    def _post(self, postings, field_words, track_id):
+        """File ``track_id`` under each word; returns the words it was added to."""
+        posted = []
+        for word in set(field_words):
+            ids = postings.get(word)
+            if ids is None:
+                postings[word] = array("I", (track_id,))
+                if word not in self._vocabulary:
+                    self._new_words.add(word)
+            elif ids and ids[-1] == track_id:
+                continue  # e.g. a title word that is in the file name too
+            else:
+                ids.append(track_id)
+            posted.append(word)
+        return posted
@@ -0,0 +1,97 @@
+import time
+
+# the standby starts this long before the current track's predicted end,
+# covering the time the backend needs to get sound out of a primed player
+SWAP_LEAD_MS = 40
+
+
+class GaplessDecks:
+    """Two media players: the one playing and a standby holding the next track.
+
+    The standby loads the next track while the current one plays, so at
+    the end of the track switching over is just ``Play`` on a player that
+    is already primed, instead of stop, load and wait for ``Length()``.
+
+    Decks are duck-typed (``Load``, ``Play``, ``Stop``, and ``SetVolume``
+    when ``swap`` is given a volume) so this works on anything shaped like
+    a ``wx.media.MediaCtrl``.
+
+    Every transition is timed: ``mark_end`` records when the old track
+    ends and ``mark_started`` when the new one reports that it plays. The
+    difference, in milliseconds, goes to ``gaps``; negative means overlap.
+    """
+
+    def __init__(self, active, standby, clock=time.monotonic):
+        self.active = active
+        self.standby = standby
+        self._clock = clock
+        self.preloaded = None
+        self.ready = False
+        self.gaps = []
+        self._ended_at = None
+
+    # -------------- preloading -----------------
+
+    def preload(self, track_id, path):
+        """Start loading ``track_id`` on the standby; False if the player refused it."""
+        if track_id == self.preloaded:
+            return True
+        self.ready = False
+        self.preloaded = track_id if self.standby.Load(path) else None
+        return self.preloaded is not None
+
+    def standby_loaded(self):
+        """The standby finished loading (EVT_MEDIA_LOADED) and can start at once."""
+        if self.preloaded is not None:
+            self.ready = True
+
+    def discard(self):
+        if self.preloaded is not None:
+            self.standby.Stop()
+        self.preloaded = None
+        self.ready = False
+
+    def swap(self, track_id, volume=None):
+        """Start the preloaded ``track_id`` (at ``volume``, if given) and make it the active deck.
+
+        Returns False, changing nothing, if a different track was preloaded
+        or loading has not finished yet.
+        """
+        if not self.ready or self.preloaded != track_id:
+            return False
+        if volume is not None:
+            # before Play, so the first samples already come out at the new track's level
+            self.standby.SetVolume(volume)
+        self.standby.Play()
+        old = self.active
+        self.active, self.standby = self.standby, old
+        old.Stop()
+        self.preloaded = None
+        self.ready = False
+        return True
+
+    # -------------- transition timing -----------------
+
+    def mark_end(self, remaining_ms=0):
+        """The current track ends ``remaining_ms`` from now (unless already marked)."""
+        if self._ended_at is None:
+            self._ended_at = self._clock() + remaining_ms / 1000
+
+    def mark_started(self):
+        """The new track plays; returns True if that completed a timed transition."""
+        if self._ended_at is None:
+            return False
+        self.gaps.append((self._clock() - self._ended_at) * 1000)
+        self._ended_at = None
+        return True
+
+    def stats(self):
+        gaps = self.gaps
+        if not gaps:
+            return {"transitions": 0}
+        return {
+            "transitions": len(gaps),
+            "mean_gap_ms": round(sum(gaps) / len(gaps), 1),
+            "max_gap_ms": round(max(gaps), 1),
+            "last_gap_ms": round(gaps[-1], 1),
+        }
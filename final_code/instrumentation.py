@@ -0,0 +1,106 @@
+import functools
+import json
+import os
+import time
+from collections import deque
+
+
+def handler_names(cls, extra=()):
+    """Every ``on_*`` method of ``cls``, plus the ``extra`` method names."""
+    return sorted({name for name in dir(cls) if name.startswith("on_")} | set(extra))
+
+
+class HandlerStats:
+    """Call count, total and max time of one handler, plus a rolling window for p99."""
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def p99(self):
+        recent = sorted(self.recent)
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(len(recent) * 0.99))]
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "p99_ms": round(self.p99() * 1000, 3),
+        }
+
+
+class Instrumentation:
+    """Opt-in timing of an object's handlers.
+
+    ``install`` replaces the named methods on one instance with timed
+    wrappers. It has to run before the handlers are bound to events, since
+    ``Bind`` keeps whatever bound method it was given. When instrumentation
+    is off, ``install`` is simply never called, so the handlers are the
+    plain methods and cost nothing extra.
+
+    ``extras`` maps a name to a callable returning a dict; those dicts are
+    included in every snapshot (e.g. widget-update counters).
+    """
+
+    def __init__(self, window=1000, clock=time.perf_counter):
+        self.window = window
+        self._clock = clock
+        self.started = time.time()
+        self.stats = {}
+        self.extras = {}
+
+    def timed(self, name, func):
+        stats = self.stats.setdefault(name, HandlerStats(self.window))
+        clock = self._clock
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add(clock() - start)
+
+        return wrapper
+
+    def install(self, obj, names):
+        for name in names:
+            setattr(obj, name, self.timed(name, getattr(obj, name)))
+
+    def snapshot(self):
+        """Stats of every handler that ran, slowest total first."""
+        ran = sorted(
+            ((name, stats) for name, stats in self.stats.items() if stats.count),
+            key=lambda item: item[1].total,
+            reverse=True,
+        )
+        snapshot = {
+            "time": round(time.time(), 3),
+            "uptime_s": round(time.time() - self.started, 1),
+            "handlers": {name: stats.as_dict() for name, stats in ran},
+        }
+        for name, extra in self.extras.items():
+            snapshot[name] = extra()
+        return snapshot
+
+    def dump(self, path):
+        """Write a snapshot as JSON, replacing ``path`` atomically."""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
@@ -0,0 +1,359 @@
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+from metadata import TrackMeta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,             -- track id in the TrackStore
+    folder_id INTEGER NOT NULL REFERENCES folders(id),
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_by_file ON tracks(folder_id, name);
+-- tags read from each file, valid while mtime and size still match
+CREATE TABLE IF NOT EXISTS tag_cache (
+    folder_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    duration_ms INTEGER,
+    bitrate INTEGER,
+    PRIMARY KEY (folder_id, name)
+);
+-- acoustic fingerprints (fingerprint.py), valid while mtime and size still match
+CREATE TABLE IF NOT EXISTS fingerprints (
+    folder_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    bits BLOB,
+    PRIMARY KEY (folder_id, name)
+);
+-- loudness per distinct file content (waveform.content_key), shared by copies and moved files
+CREATE TABLE IF NOT EXISTS loudness (
+    key TEXT PRIMARY KEY,
+    lufs REAL,                          -- integrated loudness; NULL for silence or undecodable files
+    peak REAL                           -- sample peak, 1.0 = full scale
+);
+-- the content each file had when last checked, valid while mtime and size still match
+CREATE TABLE IF NOT EXISTS loudness_files (
+    folder_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    key TEXT NOT NULL,                  -- '' when the file could not be analysed
+    PRIMARY KEY (folder_id, name)
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    format TEXT NOT NULL,
+    track_count INTEGER NOT NULL,
+    folders TEXT NOT NULL,
+    track_dirs BLOB NOT NULL,
+    offsets BLOB NOT NULL,
+    names BLOB NOT NULL
+);
+"""
+
+
+def read_loudness(path, keys):
+    """{key: (lufs, peak)} for the ``keys`` already analysed in the library at ``path``.
+
+    For worker processes: a read-only connection of their own, which never
+    waits on the window's writes (the database is in WAL mode).
+    """
+    from pathlib import Path
+
+    keys = list(keys)
+    found = {}
+    try:
+        conn = sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True)
+    except sqlite3.Error:
+        return found
+    try:
+        # stay under SQLite's limit on bound parameters
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            found.update(
+                (key, (lufs, peak)) for key, lufs, peak in conn.execute(
+                    f"SELECT key, lufs, peak FROM loudness WHERE key IN ({','.join('?' * len(batch))})", batch
+                )
+            )
+    except sqlite3.Error:
+        pass  # no loudness table yet
+    finally:
+        conn.close()
+    return found
+
+
+def default_library_path():
+    """Library location; MUSIC_PLAYER_HOME overrides the ~/.music_player default."""
+    home = os.environ.get("MUSIC_PLAYER_HOME") or os.path.join(os.path.expanduser("~"), ".music_player")
+    return os.path.join(home, "library.db")
+
+
+class LibraryDB:
+    """SQLite (WAL mode) copy of the library, its metadata and the last session.
+
+    Rows in ``tracks`` use the TrackStore track id as their primary key, so
+    reading them back ``ORDER BY id`` rebuilds the store with the same ids.
+    Folders get their own table, mirroring how the store interns them.
+
+    On shutdown the store's raw columns are also written to ``snapshot``.
+    Startup uses that single row when it still covers every track, which is
+    far cheaper than reading the tracks table back row by row.
+    """
+
+    def __init__(self, path=None):
+        path = path or default_library_path()
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._folder_ids = None
+
+    def close(self):
+        self.conn.close()
+
+    # -------------- tracks -----------------
+
+    def load_tracks(self, store):
+        """Fill an empty ``store`` with the saved library; returns the basenames."""
+        count = self.conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM tracks").fetchone()[0]
+        snapshot = self.conn.execute(
+            "SELECT folders, track_dirs, offsets, names FROM snapshot "
+            "WHERE format = ? AND track_count = ?",
+            (store.snapshot_format(), count),
+        ).fetchone()
+        if snapshot is not None:
+            folders, track_dirs, offsets, names = snapshot
+            store.load_snapshot(json.loads(folders), track_dirs, offsets, names)
+            return store.names()
+
+        folder_rows = self.conn.execute("SELECT id, path FROM folders ORDER BY id").fetchall()
+        self._folder_ids = {path: folder_id for folder_id, path in folder_rows}
+        position = {folder_id: i for i, (folder_id, _) in enumerate(folder_rows)}
+
+        rows = self.conn.execute("SELECT folder_id, name FROM tracks ORDER BY id").fetchall()
+        if not rows:
+            return []
+        folder_ids, names = zip(*rows)
+        store.extend_columns(
+            [path for _, path in folder_rows],
+            map(position.__getitem__, folder_ids),
+            names,
+        )
+        return names
+
+    def add_tracks(self, store, start, stop):
+        """Save tracks ``start``..``stop - 1`` of ``store``."""
+        rows = [
+            (track_id, self._folder_id(store.folder(track_id)), store.name(track_id))
+            for track_id in range(start, stop)
+        ]
+        with self.conn:
+            self.conn.executemany("INSERT INTO tracks (id, folder_id, name) VALUES (?, ?, ?)", rows)
+
+    def save_snapshot(self, store):
+        folders, track_dirs, offsets, names = store.snapshot()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshot "
+                "(id, format, track_count, folders, track_dirs, offsets, names) "
+                "VALUES (0, ?, ?, ?, ?, ?, ?)",
+                (store.snapshot_format(), len(store), json.dumps(folders), track_dirs, offsets, names),
+            )
+
+    def _folder_id(self, folder):
+        if self._folder_ids is None:
+            self._folder_ids = {path: i for i, path in self.conn.execute("SELECT id, path FROM folders")}
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            with self.conn:
+                folder_id = self.conn.execute("INSERT INTO folders (path) VALUES (?)", (folder,)).lastrowid
+            self._folder_ids[folder] = folder_id
+        return folder_id
+
+    # -------------- tag cache -----------------
+
+    def metadata(self, start, stop):
+        """TrackMeta for every track id in ``start``..``stop - 1`` that has any."""
+        rows = self.conn.execute(
+            "SELECT t.id, c.title, c.artist, c.album, c.duration_ms, c.bitrate "
+            "FROM tracks t JOIN tag_cache c USING (folder_id, name) "
+            "WHERE t.id >= ? AND t.id < ?",
+            (start, stop),
+        )
+        return {row[0]: TrackMeta(*row[1:]) for row in rows if any(field is not None for field in row[1:])}
+
+    def search_fields(self):
+        """(track id, title, artist, album) of every tagged track, read on a connection of its own.
+
+        SQLite connections stay on the thread that opened them, so this can
+        run on a search thread while the window keeps using ``conn``.
+        """
+        library = LibraryDB(self.path)
+        try:
+            yield from library.conn.execute(
+                "SELECT t.id, c.title, c.artist, c.album "
+                "FROM tracks t JOIN tag_cache c USING (folder_id, name) "
+                "WHERE c.title IS NOT NULL OR c.artist IS NOT NULL OR c.album IS NOT NULL"
+            )
+        finally:
+            library.close()
+
+    def tag_jobs(self, store, start=0, stop=None, missing_only=False):
+        """(track_id, path, cached mtime, cached size) for tracks in the range.
+
+        The cached values are None for files never read. ``missing_only``
+        leaves out tracks that already have a cache entry.
+        """
+        return self._jobs("tag_cache", store, start, stop, missing_only)
+
+    def _jobs(self, cache, store, start, stop, missing_only):
+        stop = len(store) if stop is None else stop
+        query = (
+            "SELECT t.id, c.mtime, c.size FROM tracks t "
+            f"LEFT JOIN {cache} c USING (folder_id, name) WHERE t.id >= ? AND t.id < ?"
+        )
+        if missing_only:
+            query += " AND c.name IS NULL"
+        return [
+            (track_id, store.path(track_id), mtime, size)
+            for track_id, mtime, size in self.conn.execute(query, (start, stop))
+        ]
+
+    def save_tags(self, results):
+        """Store ``(track_id, mtime, size, meta)`` results from the metadata pipeline.
+
+        Files that could not be parsed are cached too (with empty tags), so
+        they are not read again until they change.
+        """
+        rows = [
+            (mtime, size) + tuple(meta or TrackMeta(None, None, None, None, None)) + (track_id,)
+            for track_id, mtime, size, meta in results
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tag_cache "
+                "(folder_id, name, mtime, size, title, artist, album, duration_ms, bitrate) "
+                "SELECT folder_id, name, ?, ?, ?, ?, ?, ?, ? FROM tracks WHERE id = ?",
+                rows,
+            )
+
+    # -------------- fingerprints -----------------
+
+    def fingerprint_jobs(self, store, start=0, stop=None, missing_only=False):
+        """Jobs for ``fingerprint.fingerprint_batch``, as ``tag_jobs`` makes them for tags."""
+        return self._jobs("fingerprints", store, start, stop, missing_only)
+
+    def save_fingerprints(self, results):
+        """Store ``(track_id, mtime, size, bits)`` results; undecodable files are kept with no bits."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (folder_id, name, mtime, size, bits) "
+                "SELECT folder_id, name, ?, ?, ? FROM tracks WHERE id = ?",
+                [(mtime, size, bits, track_id) for track_id, mtime, size, bits in results],
+            )
+
+    def fingerprints(self):
+        """(track_id, bits) of every track with a fingerprint, copies included."""
+        return self.conn.execute(
+            "SELECT t.id, f.bits FROM tracks t JOIN fingerprints f USING (folder_id, name) "
+            "WHERE f.bits IS NOT NULL ORDER BY t.id"
+        ).fetchall()
+
+    # -------------- loudness -----------------
+
+    def loudness_jobs(self, store, start=0, stop=None, missing_only=False):
+        """Jobs for ``loudness.loudness_batch``, as ``tag_jobs`` makes them for tags."""
+        return self._jobs("loudness_files", store, start, stop, missing_only)
+
+    def save_loudness(self, results):
+        """Store ``(track_id, mtime, size, key, lufs, peak)`` results from ``loudness.loudness_batch``.
+
+        Files that could not be analysed come with an empty key; they are
+        cached too, so they are not sent to the workers again until they change.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO loudness (key, lufs, peak) VALUES (?, ?, ?)",
+                [(key, lufs, peak) for _, _, _, key, lufs, peak in results if key],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO loudness_files (folder_id, name, mtime, size, key) "
+                "SELECT folder_id, name, ?, ?, ? FROM tracks WHERE id = ?",
+                [(mtime, size, key, track_id) for track_id, mtime, size, key, _, _ in results],
+            )
+
+    def loudness(self, track_id):
+        """(lufs, peak) of a track, or (None, None) if it has not been analysed."""
+        row = self.conn.execute(
+            "SELECT l.lufs, l.peak FROM tracks t JOIN loudness_files f USING (folder_id, name) "
+            "JOIN loudness l USING (key) WHERE t.id = ?",
+            (track_id,),
+        ).fetchone()
+        return row if row is not None else (None, None)
+
+    # -------------- session state -----------------
+
+    def save_state(self, **values):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in values.items()],
+            )
+
+    def load_state(self):
+        return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM state")}
+
+
+class MetadataPager:
+    """Reads metadata a page at a time as playlist rows come into view.
+
+    Pages are kept in a small LRU, so scrolling back and forth does not hit
+    the database again, and a library of any size costs nothing at startup.
+    """
+
+    def __init__(self, library, page_size=256, max_pages=64):
+        self.library = library
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+
+    def get(self, track_id):
+        """TrackMeta for a track, or None if nothing is known about it yet."""
+        number = track_id // self.page_size
+        page = self._pages.get(number)
+        if page is None:
+            start = number * self.page_size
+            page = self._pages[number] = self.library.metadata(start, start + self.page_size)
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page.get(track_id)
+
+    def invalidate(self, track_ids=None):
+        """Forget cached pages (all of them, or those holding ``track_ids``)."""
+        if track_ids is None:
+            self._pages.clear()
+            return
+        for track_id in track_ids:
+            self._pages.pop(track_id // self.page_size, None)
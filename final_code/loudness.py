@@ -0,0 +1,167 @@
+"""Integrated loudness and peak of tracks (ITU-R BS.1770 / EBU R 128), with NumPy.
+
+The file is streamed once in chunks of whole 100 ms segments, channels
+kept apart. Each segment is K-weighted in the frequency domain: its
+spectrum is multiplied by the squared response of the two BS.1770
+filters (a +4 dB shelf above ~1.7 kHz and a ~38 Hz high-pass), so by
+Parseval's theorem the weighted bin powers sum to the mean square of the
+filtered segment. That is one ``rfft`` per chunk instead of a recursive
+filter in Python; it differs from filtering in the time domain only
+around the segment edges, well under 0.1 LU on music.
+
+Gating blocks (400 ms, overlapping by 75%) are averages of four
+segments. Blocks below -70 LUFS, then those more than 10 LU below the
+loudness of the rest, are left out, as the standard says.
+
+``loudness_batch`` is the worker entry point for ``MetadataPipeline``:
+results are keyed by ``waveform.content_key``, so a copy or a moved file
+is never analysed twice.
+"""
+
+import os
+
+import numpy as np
+
+from audio_analysis import open_pcm
+from library_db import read_loudness
+from waveform import content_key
+
+SEGMENT_SECONDS = 0.1
+# 400 ms gating blocks, a new one every 100 ms
+BLOCK_SEGMENTS = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+# segments per chunk read from the file: 5 s
+CHUNK_SEGMENTS = 50
+# BS.1770 filter parameters (the 48 kHz coefficients of the standard, as analog prototypes)
+SHELF_HZ, SHELF_DB, SHELF_Q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+HIGHPASS_HZ, HIGHPASS_Q = 38.13547087602444, 0.5003270373238773
+
+
+def k_weighting(rate, size):
+    """Squared magnitude response of the K-weighting filters at the ``rfft`` bins of ``size`` samples."""
+    w = 2 * np.pi * np.fft.rfftfreq(size, 1 / rate) / rate
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+
+    a = 10 ** (SHELF_DB / 40)
+    w0 = 2 * np.pi * SHELF_HZ / rate
+    alpha = np.sin(w0) / (2 * SHELF_Q)
+    cos, root = np.cos(w0), 2 * np.sqrt(a) * alpha
+    shelf = (
+        a * ((a + 1) + (a - 1) * cos + root)
+        - 2 * a * ((a - 1) + (a + 1) * cos) * z1
+        + a * ((a + 1) + (a - 1) * cos - root) * z2
+    ) / (
+        ((a + 1) - (a - 1) * cos + root)
+        + 2 * ((a - 1) - (a + 1) * cos) * z1
+        + ((a + 1) - (a - 1) * cos - root) * z2
+    )
+
+    w0 = 2 * np.pi * HIGHPASS_HZ / rate
+    alpha = np.sin(w0) / (2 * HIGHPASS_Q)
+    cos = np.cos(w0)
+    highpass = (1 - 2 * z1 + z2) / ((1 + alpha) - 2 * cos * z1 + (1 - alpha) * z2)
+    return np.square(np.abs(shelf * highpass))
+
+
+def channel_weights(channels):
+    """BS.1770 weights of each channel; in 5.1 the LFE does not count and the surrounds count 1.41 times."""
+    weights = np.ones(channels)
+    if channels == 6:
+        weights[3] = 0.0
+        weights[4:] = 1.41
+    return weights
+
+
+def loudness(reader):
+    """(integrated loudness in LUFS, sample peak) of a PCM reader (see ``open_pcm``).
+
+    Loudness is None for audio shorter than one gating block or quieter
+    than the absolute gate all through.
+    """
+    segment = max(1, int(round(reader.rate * SEGMENT_SECONDS)))
+    weights = k_weighting(reader.rate, segment) / (segment * segment)
+    # rfft holds one side of the spectrum: every bin but DC (and Nyquist) stands for two
+    weights[1:(segment + 1) // 2] *= 2
+    channels = channel_weights(reader.channels)
+
+    powers = []
+    peak = 0.0
+    for chunk in reader.chunks(segment * CHUNK_SEGMENTS, mono=False):
+        if len(chunk):
+            peak = max(peak, float(np.abs(chunk).max()))
+        count = len(chunk) // segment
+        if not count:
+            continue  # a partial segment at the end is not part of any block
+        spectra = np.fft.rfft(chunk[: count * segment].reshape(count, segment, -1), axis=1)
+        power = np.einsum("sbc,b->sc", np.square(np.abs(spectra)), weights)
+        powers.append(power @ channels)
+    if not powers:
+        return None, peak
+
+    powers = np.concatenate(powers)
+    if len(powers) < BLOCK_SEGMENTS:
+        return None, peak
+    blocks = np.convolve(powers, np.full(BLOCK_SEGMENTS, 1 / BLOCK_SEGMENTS), mode="valid")
+    blocks = blocks[blocks > _power(ABSOLUTE_GATE)]
+    if not len(blocks):
+        return None, peak
+    blocks = blocks[blocks > blocks.mean() * 10 ** (RELATIVE_GATE / 10)]
+    return _lufs(blocks.mean()), peak
+
+
+def analyse_file(path):
+    """(lufs, peak) of a file, or (None, None) if it cannot be decoded here."""
+    reader = open_pcm(path)
+    if reader is None:
+        return None, None
+    try:
+        return loudness(reader)
+    finally:
+        reader.close()
+
+
+def loudness_batch(jobs, library_path=None):
+    """Worker entry point, like ``metadata.scan_batch``: (track_id, mtime, size, key, lufs, peak).
+
+    Unchanged files are skipped, as for fingerprints. With ``library_path``,
+    contents already analysed there (a copy, a moved file) are looked up
+    instead of decoded again.
+    """
+    changed = []
+    for track_id, path, cached_mtime, cached_size in jobs:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # gone; nothing to record
+        if stat.st_mtime == cached_mtime and stat.st_size == cached_size:
+            continue
+        try:
+            key = content_key(path)
+        except OSError:
+            key = ""  # unreadable; recorded as such until the file changes
+        changed.append((track_id, path, stat.st_mtime, stat.st_size, key))
+
+    known = read_loudness(library_path, {job[4] for job in changed}) if library_path and changed else {}
+    known[""] = (None, None)
+    results = []
+    for track_id, path, mtime, size, key in changed:
+        if key not in known:
+            try:
+                known[key] = analyse_file(path)
+            except Exception:
+                known[key] = (None, None)  # undecodable; cached as such until the file changes
+        lufs, peak = known[key]
+        results.append((track_id, mtime, size, key, lufs, peak))
+    return results
+
+
+# -------------- helpers -----------------
+
+def _power(lufs):
+    return 10 ** ((lufs + 0.691) / 10)
+
+
+def _lufs(power):
+    return float(-0.691 + 10 * np.log10(power))
@@ -0,0 +1,34 @@
+"""Process-pool entry point of the loudness analysis, like ``metadata.scan_batch``.
+
+It sits apart from ``loudness`` so that importing it needs neither NumPy
+nor wx: on spawn platforms every worker process imports the module the
+entry point lives in, and the window's own module would bring wx along.
+NumPy and the decoders are loaded in the workers only, on the first batch.
+"""
+
+import os
+
+
+def analyse_batch(jobs, library_path=None):
+    """``loudness.loudness_batch``, or without NumPy every changed file recorded as not analysable.
+
+    Recorded with an empty key, so those files are not sent again every
+    launch; a file that changes later is tried again.
+    """
+    try:
+        from loudness import loudness_batch
+    except ImportError:
+        return [(track_id, mtime, size, "", None, None) for track_id, mtime, size in _changed(jobs)]
+    return loudness_batch(jobs, library_path)
+
+
+# -------------- helpers -----------------
+
+def _changed(jobs):
+    for track_id, path, cached_mtime, cached_size in jobs:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_mtime != cached_mtime or stat.st_size != cached_size:
+            yield track_id, stat.st_mtime, stat.st_size
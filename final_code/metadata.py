@@ -0,0 +1,426 @@
+"""Tag and stream-header readers for MP3 (ID3v1/v2), FLAC, Ogg Vorbis/Opus and WAV.
+
+Only the standard library is used, so the readers can run in worker
+processes that never import wx.
+"""
+import os
+import struct
+import threading
+from collections import namedtuple
+
+TrackMeta = namedtuple("TrackMeta", "title artist album duration_ms bitrate")
+
+# how far into a file we look for the first MPEG frame or the Ogg headers
+HEADER_SCAN_BYTES = 1 << 20
+
+ID3_TEXT_FRAMES = {
+    b"TIT2": "title", b"TPE1": "artist", b"TALB": "album", b"TLEN": "length",
+    b"TT2": "title", b"TP1": "artist", b"TAL": "album", b"TLE": "length",
+}
+VORBIS_FIELDS = {"TITLE": "title", "ARTIST": "artist", "ALBUM": "album"}
+RIFF_INFO_FIELDS = {b"INAM": "title", b"IART": "artist", b"IPRD": "album"}
+
+# kbps, indexed by [version is MPEG-1][layer][bitrate index]
+MPEG_BITRATES = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+# sample rates by the two version bits: 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def read_metadata(path):
+    """TrackMeta for one file, or None if the format is unknown or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            magic = f.read(12)
+            f.seek(0)
+            if magic.startswith(b"fLaC"):
+                return _read_flac(f, size)
+            if magic.startswith(b"OggS"):
+                return _read_ogg(f, size)
+            if magic.startswith(b"RIFF") and magic[8:12] == b"WAVE":
+                return _read_wav(f, size)
+            if magic.startswith(b"ID3") or path.lower().endswith(".mp3") or _is_frame_sync(magic):
+                return _read_mp3(f, size)
+    except (OSError, ValueError, struct.error, IndexError):
+        pass
+    return None
+
+
+def _meta(fields, duration_ms=None, bitrate=None):
+    return TrackMeta(
+        fields.get("title") or None,
+        fields.get("artist") or None,
+        fields.get("album") or None,
+        int(duration_ms) if duration_ms else None,
+        int(bitrate) if bitrate else None,
+    )
+
+
+def _bitrate(size, duration_ms):
+    """Average kbps over the whole file."""
+    return size * 8 / duration_ms if duration_ms else None
+
+
+# -------------- MP3 -----------------
+
+def _read_mp3(f, size):
+    fields = {}
+    audio_start = 0
+    header = f.read(10)
+    if header.startswith(b"ID3") and len(header) == 10:
+        fields, audio_start = _read_id3v2(f, header)
+
+    audio_end = size
+    if size >= 128:
+        f.seek(size - 128)
+        tail = f.read(128)
+        if tail.startswith(b"TAG"):
+            audio_end -= 128
+            for key, start in (("title", 3), ("artist", 33), ("album", 63)):
+                if not fields.get(key):
+                    fields[key] = tail[start:start + 30].split(b"\0")[0].decode("latin-1").strip()
+
+    duration_ms, bitrate = _mpeg_stream_info(f, audio_start, audio_end - audio_start)
+    if "length" in fields:
+        try:
+            duration_ms = int(fields["length"])
+        except ValueError:
+            pass
+    if duration_ms and not bitrate:
+        bitrate = _bitrate(audio_end - audio_start, duration_ms)
+    return _meta(fields, duration_ms, bitrate)
+
+
+def _synchsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _read_id3v2(f, header):
+    major, flags = header[3], header[5]
+    tag_size = _synchsafe(header[6:10])
+    audio_start = 10 + tag_size + (10 if flags & 0x10 else 0)
+    data = f.read(tag_size)
+    if flags & 0x80 and major < 4:
+        data = data.replace(b"\xff\x00", b"\xff")
+
+    pos = 0
+    if flags & 0x40:
+        if major == 3:
+            pos = 4 + struct.unpack(">I", data[:4])[0]
+        elif major == 4:
+            pos = _synchsafe(data[:4])
+
+    fields = {}
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    while pos + header_len <= len(data):
+        frame_id = data[pos:pos + id_len]
+        if not frame_id.strip(b"\0"):
+            break  # padding
+        if major == 2:
+            frame_size = int.from_bytes(data[pos + 3:pos + 6], "big")
+        elif major == 4:
+            frame_size = _synchsafe(data[pos + 4:pos + 8])
+        else:
+            frame_size = struct.unpack(">I", data[pos + 4:pos + 8])[0]
+        body = data[pos + header_len:pos + header_len + frame_size]
+        pos += header_len + frame_size
+        key = ID3_TEXT_FRAMES.get(frame_id)
+        if key and body and key not in fields:
+            fields[key] = _id3_text(body)
+    return fields, audio_start
+
+
+def _id3_text(body):
+    encoding, raw = body[0], body[1:]
+    if encoding == 1:
+        text = raw.decode("utf-16", "replace")
+    elif encoding == 2:
+        text = raw.decode("utf-16-be", "replace")
+    elif encoding == 3:
+        text = raw.decode("utf-8", "replace")
+    else:
+        text = raw.decode("latin-1")
+    # several values are separated by NULs; the first one is enough
+    return text.split("\0")[0].strip()
+
+
+def _is_frame_sync(data):
+    return len(data) >= 2 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0
+
+
+def _parse_frame_header(data, i):
+    """(bitrate kbps, sample rate, samples per frame, frame length, is MPEG-1, mono) or None."""
+    b1, b2, b3 = data[i + 1], data[i + 2], data[i + 3]
+    version = (b1 >> 3) & 3
+    layer = 4 - ((b1 >> 1) & 3)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = MPEG_BITRATES[mpeg1][layer][bitrate_index]
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate * 1000 // sample_rate + padding) * 4
+    elif layer == 3 and not mpeg1:
+        samples, length = 576, 72 * bitrate * 1000 // sample_rate + padding
+    else:
+        samples, length = 1152, 144 * bitrate * 1000 // sample_rate + padding
+    mono = (b3 >> 6) == 3
+    return bitrate, sample_rate, samples, length, mpeg1, mono
+
+
+def _mpeg_stream_info(f, audio_start, audio_size):
+    """(duration ms, kbps) from the first frame: Xing/Info or VBRI if present, else CBR."""
+    f.seek(audio_start)
+    data = f.read(min(HEADER_SCAN_BYTES, max(audio_size, 0)))
+    i = data.find(b"\xff")
+    while 0 <= i < len(data) - 4:
+        frame = _parse_frame_header(data, i) if data[i + 1] & 0xE0 == 0xE0 else None
+        if frame is not None:
+            break
+        i = data.find(b"\xff", i + 1)
+    else:
+        return None, None
+
+    bitrate, sample_rate, samples, _, mpeg1, mono = frame
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = i + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            duration_ms = frames * samples * 1000 / sample_rate
+            return duration_ms, _bitrate(audio_size - i, duration_ms)
+    vbri = i + 36
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        duration_ms = frames * samples * 1000 / sample_rate
+        return duration_ms, _bitrate(audio_size - i, duration_ms)
+    # constant bitrate: size / rate
+    return (audio_size - i) * 8 / bitrate, bitrate
+
+
+# -------------- FLAC / Ogg (Vorbis comments) -----------------
+
+def _vorbis_comments(data):
+    vendor_len = struct.unpack("<I", data[:4])[0]
+    pos = 4 + vendor_len
+    count = struct.unpack("<I", data[pos:pos + 4])[0]
+    pos += 4
+    fields = {}
+    for _ in range(count):
+        length = struct.unpack("<I", data[pos:pos + 4])[0]
+        entry = data[pos + 4:pos + 4 + length].decode("utf-8", "replace")
+        pos += 4 + length
+        key, _, value = entry.partition("=")
+        field = VORBIS_FIELDS.get(key.upper())
+        if field and field not in fields:
+            fields[field] = value.strip()
+    return fields
+
+
+def _read_flac(f, size):
+    f.seek(4)
+    fields = {}
+    duration_ms = None
+    last = False
+    while not last:
+        header = f.read(4)
+        if len(header) < 4:
+            break
+        last = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7F
+        length = int.from_bytes(header[1:4], "big")
+        if block_type == 0:
+            info = f.read(length)
+            packed = int.from_bytes(info[10:18], "big")
+            sample_rate = packed >> 44
+            total_samples = packed & 0xFFFFFFFFF
+            if sample_rate and total_samples:
+                duration_ms = total_samples * 1000 / sample_rate
+        elif block_type == 4:
+            fields = _vorbis_comments(f.read(length))
+        else:
+            f.seek(length, os.SEEK_CUR)
+    return _meta(fields, duration_ms, _bitrate(size, duration_ms))
+
+
+def _ogg_packets(f, limit):
+    """The first packets of an Ogg stream, reassembled from their pages."""
+    data = f.read(limit)
+    pos = 0
+    packet = b""
+    while data.startswith(b"OggS", pos):
+        segments = data[pos + 26]
+        table = data[pos + 27:pos + 27 + segments]
+        pos += 27 + segments
+        for lacing in table:
+            packet += data[pos:pos + lacing]
+            pos += lacing
+            if lacing < 255:
+                yield packet
+                packet = b""
+
+
+def _read_ogg(f, size):
+    fields = {}
+    sample_rate = None
+    pre_skip = 0
+    for number, packet in enumerate(_ogg_packets(f, HEADER_SCAN_BYTES)):
+        if packet.startswith(b"\x01vorbis"):
+            sample_rate = struct.unpack("<I", packet[12:16])[0]
+        elif packet.startswith(b"OpusHead"):
+            sample_rate = 48000  # Opus granule positions are always 48 kHz
+            pre_skip = struct.unpack("<H", packet[10:12])[0]
+        elif packet.startswith(b"\x03vorbis"):
+            fields = _vorbis_comments(packet[7:])
+        elif packet.startswith(b"OpusTags"):
+            fields = _vorbis_comments(packet[8:])
+        if fields or number >= 2:
+            break
+
+    duration_ms = None
+    if sample_rate:
+        # granule position of the last page is the total sample count
+        f.seek(max(size - 65536, 0))
+        tail = f.read()
+        last = tail.rfind(b"OggS")
+        if last >= 0 and last + 14 <= len(tail):
+            granule = struct.unpack("<q", tail[last + 6:last + 14])[0]
+            if granule > pre_skip:
+                duration_ms = (granule - pre_skip) * 1000 / sample_rate
+    return _meta(fields, duration_ms, _bitrate(size, duration_ms))
+
+
+# -------------- WAV -----------------
+
+def _read_wav(f, size):
+    f.seek(12)
+    fields = {}
+    byte_rate = None
+    data_size = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, length = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = f.read(length)
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+        elif chunk_id == b"data":
+            # streaming writers leave 0xFFFFFFFF here; trust the file size instead
+            data_size = min(length, size - f.tell())
+            f.seek(length, os.SEEK_CUR)
+        elif chunk_id == b"LIST":
+            body = f.read(length)
+            if body.startswith(b"INFO"):
+                fields.update(_riff_info(body[4:]))
+        else:
+            f.seek(length, os.SEEK_CUR)
+        if length & 1:
+            f.seek(1, os.SEEK_CUR)
+
+    duration_ms = data_size * 1000 / byte_rate if byte_rate and data_size else None
+    return _meta(fields, duration_ms, byte_rate * 8 / 1000 if byte_rate else None)
+
+
+def _riff_info(body):
+    fields = {}
+    pos = 0
+    while pos + 8 <= len(body):
+        sub_id, length = body[pos:pos + 4], struct.unpack("<I", body[pos + 4:pos + 8])[0]
+        value = body[pos + 8:pos + 8 + length]
+        pos += 8 + length + (length & 1)
+        key = RIFF_INFO_FIELDS.get(sub_id)
+        if key:
+            fields[key] = value.split(b"\0")[0].decode("utf-8", "replace").strip()
+    return fields
+
+
+# -------------- process pool -----------------
+
+def scan_batch(jobs):
+    """Worker entry point: ``jobs`` are (track_id, path, cached mtime, cached size).
+
+    Files whose mtime and size match the cache are not opened. Returns
+    (track_id, mtime, size, meta) for every file that had to be read;
+    missing files are left out.
+    """
+    results = []
+    for track_id, path, cached_mtime, cached_size in jobs:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_mtime == cached_mtime and stat.st_size == cached_size:
+            continue
+        results.append((track_id, stat.st_mtime, stat.st_size, read_metadata(path)))
+    return results
+
+
+class MetadataPipeline:
+    """Reads tags for many files on a process pool.
+
+    ``submit(jobs)`` splits the jobs into batches, one ``scan`` call each:
+    ``scan_batch``, or another worker function taking and returning the
+    same tuples (e.g. ``fingerprint.fingerprint_batch``).
+    ``on_results(results)`` is called once per finished batch (from a pool
+    thread) and ``on_done()`` once nothing is left in flight.
+    """
+
+    def __init__(self, on_results, on_done=None, workers=None, batch_size=64, scan=scan_batch):
+        self.on_results = on_results
+        self.on_done = on_done
+        self.workers = workers
+        self.batch_size = batch_size
+        self.scan = scan
+        self._pool = None
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._closed = False
+
+    @property
+    def busy(self):
+        return self._outstanding > 0
+
+    def submit(self, jobs):
+        if self._closed or not jobs:
+            return
+        if self._pool is None:
+            # started (and imported, it pulls in multiprocessing) lazily,
+            # so an idle player never pays for worker processes
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        for start in range(0, len(jobs), self.batch_size):
+            with self._lock:
+                self._outstanding += 1
+            future = self._pool.submit(self.scan, jobs[start:start + self.batch_size])
+            future.add_done_callback(self._batch_done)
+
+    def _batch_done(self, future):
+        if not future.cancelled() and future.exception() is None and not self._closed:
+            self.on_results(future.result())
+        with self._lock:
+            self._outstanding -= 1
+            idle = self._outstanding == 0
+        if idle and self.on_done is not None and not self._closed:
+            self.on_done()
+
+    def close(self):
+        self._closed = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
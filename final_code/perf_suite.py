@@ -0,0 +1,272 @@
+"""Playback-free benchmark and profiling suite.
+
+Drives the player core the way the frame's handlers do, over a synthetic
+library, with ``NullBackend`` standing in for wx.media.MediaCtrl:
+
+    load      on_load: append a batch of files and save them
+    filter    update_playlist_display: filter the view for each keystroke
+    search    on_search: keystrokes through the SearchWorker, until results arrive
+    next      on_next / prev: on_prev
+    dclick    on_playlist_dclick: activate a row of the filtered view
+    timer     on_timer: one ProgressUpdater tick (resync, label/slider redraw) and its next delay
+
+Each scenario runs twice: once for latency percentiles, once under
+tracemalloc for allocations and peak memory. Results can be saved as JSON
+and compared against an earlier run:
+
+    python perf_suite.py --size 100000 --json results.json
+    python perf_suite.py --baseline results.json     # exit code 1 on regression
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from benchmarks import WORDS, iter_synthetic_paths
+from library_db import LibraryDB
+from playback_clock import PlaybackClock, ProgressDisplay, ProgressUpdater
+from player_core import NullBackend, Playlist, PlayerController, TimeLabel
+from search_worker import SearchWorker
+
+LOAD_BATCH = 500
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Scenario:
+    """One measured operation: ``setup()`` returns the state ``step(state, i)`` uses."""
+
+    def __init__(self, name, setup, step, calls):
+        self.name = name
+        self.setup = setup
+        self.step = step
+        self.calls = calls
+
+    def latencies(self):
+        state = self.setup()
+        step = self.step
+        times = []
+        clock = time.perf_counter
+        for i in range(self.calls):
+            start = clock()
+            step(state, i)
+            times.append(clock() - start)
+        return times
+
+    def memory(self):
+        state = self.setup()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            for i in range(self.calls):
+                self.step(state, i)
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        grown = [stat for stat in after.compare_to(before, "filename") if stat.size_diff > 0]
+        return {
+            "alloc_blocks": sum(stat.count_diff for stat in grown if stat.count_diff > 0),
+            "alloc_kib": round(sum(stat.size_diff for stat in grown) / 1024, 1),
+            "peak_kib": round((peak - base) / 1024, 1),
+        }
+
+    def run(self):
+        times = sorted(self.latencies())
+        result = {
+            "calls": len(times),
+            "mean_us": round(sum(times) / len(times) * 1e6, 2),
+            "p50_us": round(percentile(times, 0.50) * 1e6, 2),
+            "p90_us": round(percentile(times, 0.90) * 1e6, 2),
+            "p99_us": round(percentile(times, 0.99) * 1e6, 2),
+            "max_us": round(times[-1] * 1e6, 2),
+        }
+        result.update(self.memory())
+        return result
+
+
+# -------------- scenarios -----------------
+
+def library_playlist(size):
+    """A Playlist of ``size`` synthetic tracks with its search index built."""
+    playlist = Playlist()
+    playlist.add(iter_synthetic_paths(size))
+    playlist.search_index.index_pending()
+    playlist.filter("")
+    return playlist
+
+
+def keystrokes(count, seed=1):
+    """Prefixes of random words, as typed one key at a time."""
+    rng = random.Random(seed)
+    typed = []
+    while len(typed) < count:
+        word = rng.choice(WORDS)
+        typed.extend(word[:end] for end in range(1, len(word) + 1))
+    return typed[:count]
+
+
+def build_scenarios(size, calls):
+    shared = {}
+
+    def playlist():
+        if "playlist" not in shared:
+            shared["playlist"] = library_playlist(size)
+        return shared["playlist"]
+
+    def load_setup():
+        paths = list(iter_synthetic_paths(LOAD_BATCH * calls, seed=2))
+        return Playlist(LibraryDB(":memory:")), paths
+
+    def load_step(state, i):
+        target, paths = state
+        target.add(paths[i * LOAD_BATCH:(i + 1) * LOAD_BATCH])
+
+    def filter_setup():
+        return playlist(), keystrokes(calls)
+
+    def filter_step(state, i):
+        target, typed = state
+        target.filter(typed[i])
+
+    def search_setup():
+        target = playlist()
+        delivered = threading.Event()
+        worker = SearchWorker(target.search_index.search, lambda generation, rows: delivered.set(), delay=0)
+        return worker, delivered, keystrokes(calls, seed=3)
+
+    def search_step(state, i):
+        worker, delivered, typed = state
+        delivered.clear()
+        worker.submit(typed[i])
+        delivered.wait()
+
+    def player_setup():
+        return PlayerController(playlist(), NullBackend())
+
+    def next_step(player, i):
+        player.next()
+
+    def prev_step(player, i):
+        player.prev()
+
+    def dclick_setup():
+        target = playlist()
+        target.filter("fire")
+        rng = random.Random(4)
+        rows = [rng.randrange(len(target.view)) for _ in range(calls)]
+        return PlayerController(target, NullBackend()), rows
+
+    def dclick_step(state, i):
+        player, rows = state
+        player.load(player.playlist.view.track_at(rows[i]))
+
+    def timer_setup():
+        now = [0.0]
+        clock = PlaybackClock(clock=lambda: now[0])
+        clock.length = 240_000
+        clock.sync(0, True)
+        time_label = TimeLabel()
+        time_label.set_length(clock.length)
+        backend = NullBackend()
+        # the widgets are plain callables here; the frame passes the slider and label setters
+        updater = ProgressUpdater(clock, ProgressDisplay(), time_label, backend.tell, lambda pos: None, lambda text: None)
+        return now, updater
+
+    def timer_step(state, i):
+        now, updater = state
+        updater.tick(500)
+        now[0] += updater.next_in(500) / 1000
+
+    return [
+        Scenario("load", load_setup, load_step, max(1, min(calls, size // LOAD_BATCH))),
+        Scenario("filter", filter_setup, filter_step, calls),
+        Scenario("search", search_setup, search_step, calls),
+        Scenario("next", player_setup, next_step, calls),
+        Scenario("prev", player_setup, prev_step, calls),
+        Scenario("dclick", dclick_setup, dclick_step, calls),
+        Scenario("timer", timer_setup, timer_step, calls),
+    ]
+
+
+# -------------- reporting -----------------
+
+def run_suite(size, calls, only=None):
+    results = {
+        "meta": {
+            "size": size,
+            "calls": calls,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    for scenario in build_scenarios(size, calls):
+        if only and scenario.name not in only:
+            continue
+        result = results["scenarios"][scenario.name] = scenario.run()
+        print(f"{scenario.name:>8}: p50 {result['p50_us']:9.1f} us  p90 {result['p90_us']:9.1f} us  "
+              f"p99 {result['p99_us']:9.1f} us  max {result['max_us']:9.1f} us  "
+              f"alloc {result['alloc_blocks']:7d} blocks / {result['alloc_kib']:8.1f} KiB  "
+              f"peak {result['peak_kib']:8.1f} KiB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against ``baseline``; returns the regressed "scenario.metric" names."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        for metric in ("p50_us", "p90_us", "peak_kib"):
+            before, after = old.get(metric), result[metric]
+            if not before:
+                continue
+            change = after / before - 1
+            flag = ""
+            # sub-microsecond (or sub-KiB) wobble is noise, whatever the ratio
+            if change > tolerance and after - before > 1:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:>8} {metric:>8}: {before:10.1f} -> {after:10.1f} ({change:+.0%}){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Playback-free benchmarks for the player core.")
+    parser.add_argument("--size", type=int, default=100_000, help="tracks in the synthetic library")
+    parser.add_argument("--calls", type=int, default=1_000, help="measured calls per scenario")
+    parser.add_argument("--only", nargs="*", help="scenarios to run (default: all)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.size, args.calls, args.only)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("regressed: " + ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
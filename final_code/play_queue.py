@@ -0,0 +1,340 @@
+"""What plays next: the play queue, shuffle and repeat.
+
+``PlayQueue`` steps through the rows of the playlist's current view (the
+search filter), so next and previous stay inside what is shown. Tracks
+queued with ``enqueue`` or ``play_next`` come first and leave the position
+in the view alone.
+
+Shuffle walks a ``ShuffleOrder``: a Fisher-Yates permutation of the view's
+rows that is only generated as far as it has been played, so turning
+shuffle on costs the same for ten tracks as for a million. The same seed
+gives the same order for the same view. A new view (a filter keystroke)
+does not start a new round: the tracks already heard in it that are still
+shown come first in the new order, so they are not played again.
+
+Every step is O(1). A new view costs one ``RowMap.row_of`` lookup for
+the current track and, while shuffling, one per track heard this round;
+the first lookup in a filtered view builds its reverse map, which is O(n).
+"""
+
+import random
+from collections import deque
+from itertools import islice
+
+REPEAT_OFF, REPEAT_ALL, REPEAT_ONE = "off", "all", "one"
+REPEAT_MODES = (REPEAT_OFF, REPEAT_ALL, REPEAT_ONE)
+
+
+class ShuffleOrder:
+    """A random permutation of ``range(size)``, generated lazily.
+
+    ``order[k]`` runs the Fisher-Yates shuffle just far enough to fix
+    position ``k``. Only positions touched so far are stored (a sparse
+    array and its inverse), so ``index(value)`` is O(1) too.
+    """
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.generated = 0  # positions [0, generated) are final
+        self._rng = random.Random(seed)
+        self._slots = {}  # position -> value, where not the identity
+        self._where = {}  # value -> position, the inverse
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.size:
+            raise IndexError("shuffle position out of range")
+        while self.generated <= position:
+            self._swap(self.generated, self._rng.randrange(self.generated, self.size))
+            self.generated += 1
+        return self._slots.get(position, position)
+
+    def index(self, value):
+        """Position of ``value``, whether generated yet or not."""
+        return self._where.get(value, value)
+
+    def place(self, value, position):
+        """Move ``value`` to ``position`` (at most ``generated``), which then counts as generated.
+
+        Whatever was there goes to where ``value`` was; callers only move
+        values that have not been played this round, so nothing is skipped.
+        """
+        if position > self.generated:
+            self[position - 1]
+        current = self.index(value)
+        if current != position:
+            self._swap(position, current)
+        if position == self.generated:
+            self.generated += 1
+
+    # -------------- helpers -----------------
+
+    def _swap(self, i, j):
+        slots = self._slots
+        a, b = slots.get(i, i), slots.get(j, j)
+        slots[i], slots[j] = b, a
+        self._where[b], self._where[a] = i, j
+
+
+class PlayQueue:
+    """Play queue, shuffle and repeat over a ``Playlist``'s view.
+
+    ``next_track`` and ``prev_track`` only look ahead; the track becomes
+    current when the player loads it and calls ``set_current``, so a track
+    that fails to open still moves the position on. A track picked by hand
+    while shuffling is played next in the round if it has not been played
+    in it yet, and otherwise starts a new round.
+    """
+
+    def __init__(self, playlist, seed=None):
+        self.playlist = playlist
+        self.queue = deque()
+        self.shuffle = False
+        self.repeat = REPEAT_ALL
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.current = -1
+        self._view = None
+        self._row = -1  # row of the last track played from the view; -1 before the first
+        self._order = None
+        self._round = 0
+        self._cursor = -1  # position of that row in the shuffle order
+        self._reached = -1  # furthest position played this round
+        self._heard = ()  # track ids heard this round that the current order does not hold (other views)
+        self._finished = None  # (round, order) of the round before, when it was played to the end
+        self._planned = None  # (track id, round, position) last offered by next_track/prev_track
+        self._queued = False  # the current track came from the queue
+
+    # -------------- queue -----------------
+
+    def enqueue(self, track_ids):
+        """Play these after everything already queued."""
+        self.queue.extend(track_ids)
+
+    def play_next(self, track_ids):
+        """Play these before anything else queued, in the given order."""
+        self.queue.extendleft(reversed(list(track_ids)))
+
+    def clear_queue(self):
+        self.queue.clear()
+
+    # -------------- modes -----------------
+
+    def set_shuffle(self, shuffle):
+        if shuffle != self.shuffle:
+            self.shuffle = shuffle
+            self._order = None
+            self._heard = ()
+            self._finished = None
+            self._planned = None
+
+    def set_repeat(self, mode):
+        if mode not in REPEAT_MODES:
+            raise ValueError(f"unknown repeat mode: {mode!r}")
+        self.repeat = mode
+
+    # -------------- stepping -----------------
+
+    def set_current(self, track_id):
+        """``track_id`` is now playing (or failed to): later steps go on from it."""
+        self.current = track_id
+        view = self._sync_view()
+        planned, self._planned = self._planned, None
+        if self.queue and self.queue[0] == track_id:
+            self.queue.popleft()
+            self._queued = True
+            return
+        self._queued = False
+        row = view.row_of(track_id)
+        if row < 0:
+            return  # not shown; the view position stays where it was
+        self._row = row
+        if not self.shuffle:
+            return
+        if planned is not None and planned[0] == track_id:
+            _, round_number, position = planned
+            if round_number > self._round:
+                finished = (self._round, self._order)
+                self._start_round(round_number)
+                self._finished = finished
+            elif round_number < self._round:
+                # back into the round before; played to the end, so fully drawn
+                self._round, self._order = self._finished
+                self._finished = None
+                self._reached = len(self._order) - 1
+                self._heard = ()
+            self._cursor = position
+            self._reached = max(self._reached, position)
+            return
+        order = self._shuffle_order()
+        position = order.index(row)
+        if position > self._cursor:
+            order.place(row, self._cursor + 1)
+            self._cursor += 1
+            self._reached = max(self._reached, self._cursor)
+        elif position < self._cursor:
+            self._start_round(self._round + 1, first=row)
+
+    def next_track(self, auto=False):
+        """Track id that next would play, or None at the end (repeat off) or in an empty view.
+
+        ``auto`` is playback moving on by itself, where repeat-one plays
+        the same track again; a press of next always moves on.
+        """
+        if auto and self.repeat == REPEAT_ONE and self.current >= 0:
+            return self.current
+        if self.queue:
+            return self.queue[0]
+        return self._plan(1)
+
+    def prev_track(self):
+        """Track id that previous would play, or None when there is nothing before it."""
+        # after a queued track, "previous" is the view track that was playing before it
+        return self._plan(0 if self._queued else -1)
+
+    def upcoming(self, count, previous=False):
+        """Up to ``count`` track ids that next would play, in order, without moving.
+
+        With ``previous``, the track previous would play is added at the end.
+        """
+        tracks = list(islice(self.queue, count))
+        for step in range(1, count - len(tracks) + 1):
+            found = self._view_track(step)
+            if found is None:
+                break
+            tracks.append(found[0])
+        if previous:
+            found = self._view_track(0 if self._queued else -1)
+            if found is not None:
+                tracks.append(found[0])
+        return tracks
+
+    # -------------- sessions -----------------
+
+    def resume(self, track_id):
+        """Make ``track_id`` current as it was when the last session ended, without stepping."""
+        self.current = track_id
+        self._view = None
+
+    def restore(self, state):
+        self.seed = state.get("shuffle_seed", self.seed)
+        self.shuffle = state.get("shuffle", self.shuffle)
+        if state.get("repeat") in REPEAT_MODES:
+            self.repeat = state["repeat"]
+        size = len(self.playlist)
+        self.queue = deque(track_id for track_id in state.get("queue", ()) if 0 <= track_id < size)
+
+    def session_state(self):
+        return {"shuffle": self.shuffle, "shuffle_seed": self.seed, "repeat": self.repeat, "queue": list(self.queue)}
+
+    # -------------- helpers -----------------
+
+    def _sync_view(self):
+        """Pick up a new filter: find the current track's row in it, and keep what this round played."""
+        view = self.playlist.view
+        if view is not self._view:
+            self._heard = self._heard_tracks()
+            self._view = view
+            self._row = view.row_of(self.current) if self.current >= 0 else -1
+            self._order = None
+            self._finished = None
+            self._planned = None
+        return view
+
+    def _heard_tracks(self):
+        """Track ids played so far this round: those of other views, then the current view's in order."""
+        if self._order is None or self._view is None:
+            return self._heard
+        view, order = self._view, self._order
+        return [*self._heard, *(view.track_at(order[position]) for position in range(self._reached + 1))]
+
+    def _round_seed(self, round_number):
+        # str seeds hash the same in every run, unlike tuples
+        return f"{self.seed}:{len(self._view)}:{round_number}"
+
+    def _start_round(self, round_number, first=None):
+        self._round = round_number
+        self._finished = None
+        self._order = ShuffleOrder(len(self._view), self._round_seed(round_number))
+        self._cursor = -1
+        if first is not None:
+            self._order.place(first, 0)
+            self._cursor = 0
+        self._reached = self._cursor
+        self._heard = ()
+
+    def _resume_round(self, heard):
+        """Go on with the round in a new view: the tracks heard in it that are shown come first.
+
+        The ones not shown stay in ``_heard`` for the next view.
+        """
+        view = self._view
+        order = self._order = ShuffleOrder(len(view), self._round_seed(self._round))
+        position = self._cursor = -1
+        self._heard = []
+        for track_id in heard:
+            row = view.row_of(track_id)
+            if row < 0:
+                self._heard.append(track_id)
+                continue
+            position += 1
+            order.place(row, position)
+            if row == self._row:
+                self._cursor = position
+        if self._cursor < 0 and self._row >= 0:
+            # playing, but not from this round (queued, or picked without shuffle)
+            position += 1
+            order.place(self._row, position)
+            self._cursor = position
+        elif self._cursor < 0:
+            self._cursor = position
+        self._reached = position
+
+    def _shuffle_order(self):
+        if self._order is None:
+            if self._heard:
+                self._resume_round(self._heard)
+            else:
+                # the playing track opens the shuffle, so the rest of the view follows it
+                self._start_round(self._round, self._row if self._row >= 0 else None)
+        return self._order
+
+    def _plan(self, step):
+        found = self._view_track(step)
+        if found is None:
+            self._planned = None
+            return None
+        self._planned = found
+        return found[0]
+
+    def _view_track(self, step):
+        """(track id, round, position) ``step`` places from the current track in play order, or None."""
+        view = self._sync_view()
+        size = len(view)
+        if not size:
+            return None
+        if self.shuffle:
+            return self._shuffled_track(step)
+        row = self._row + step
+        if not 0 <= row < size:
+            if self.repeat == REPEAT_OFF:
+                return None
+            row %= size
+        return view.track_at(row), 0, row
+
+    def _shuffled_track(self, step):
+        order = self._shuffle_order()
+        position = self._cursor + step
+        if 0 <= position < len(order):
+            return self._view.track_at(order[position]), self._round, position
+        if position < 0:
+            if self._finished is None or position < -len(order):
+                return None
+            round_number, finished = self._finished
+            return self._view.track_at(finished[len(order) + position]), round_number, len(order) + position
+        if position == len(order) and self.repeat != REPEAT_OFF:
+            # the first track of the next round, drawn without starting it
+            first = ShuffleOrder(len(order), self._round_seed(self._round + 1))[0]
+            return self._view.track_at(first), self._round + 1, 0
+        return None
@@ -0,0 +1,197 @@
+import time
+
+
+class PlaybackClock:
+    """Playback position extrapolated from a monotonic clock.
+
+    The media backend is only asked for its position when something
+    happens (load, play, pause, seek) and every ``resync_interval``
+    seconds to correct drift. In between, the position is the last synced
+    value plus the time elapsed since, which costs no backend calls.
+    """
+
+    def __init__(self, resync_interval=5.0, clock=time.monotonic):
+        self.resync_interval = resync_interval
+        self._clock = clock
+        self.length = 0
+        self.playing = False
+        self._anchor_pos = 0
+        self._anchor_time = clock()
+
+    def sync(self, position, playing=None):
+        """Anchor the clock at ``position`` ms (and optionally a new play state)."""
+        self._anchor_pos = max(0, position)
+        self._anchor_time = self._clock()
+        if playing is not None:
+            self.playing = playing
+
+    def needs_resync(self):
+        return self.playing and self._clock() - self._anchor_time >= self.resync_interval
+
+    def position(self):
+        pos = self._anchor_pos
+        if self.playing:
+            pos += int((self._clock() - self._anchor_time) * 1000)
+        return min(pos, self.length) if self.length > 0 else pos
+
+
+class ProgressDisplay:
+    """Remembers what the time label and position slider currently show.
+
+    ``changes`` tells the caller which of the two widgets would look
+    different at a new position, so everything else can be skipped, and
+    ``next_change_in`` says how long until that next happens, so the
+    timer only wakes up when there is something to draw.
+
+    The counters record how often each widget was really updated.
+    """
+
+    # never wake more often than the old 250 ms poll did
+    MIN_INTERVAL_MS = 250
+
+    def __init__(self):
+        self.wakeups = 0
+        self.label_updates = 0
+        self.slider_updates = 0
+        self.reset()
+
+    def reset(self):
+        """Forget what is shown, so the next ``changes`` call redraws both."""
+        self.shown_second = None
+        self.shown_pixel = None
+
+    def changes(self, position, length, pixels):
+        """(label changed, slider changed) for ``position``; counts them as done."""
+        self.wakeups += 1
+        second = position // 1000
+        pixel = position * pixels // length if length > 0 else 0
+        label = second != self.shown_second
+        slider = pixel != self.shown_pixel
+        if label:
+            self.shown_second = second
+            self.label_updates += 1
+        if slider:
+            self.shown_pixel = pixel
+            self.slider_updates += 1
+        return label, slider
+
+    def next_change_in(self, position, length, pixels):
+        """Milliseconds until the displayed second or slider pixel changes."""
+        delay = 1000 - position % 1000
+        if length > 0 and pixels > 0:
+            ms_per_pixel = length / pixels
+            delay = min(delay, ms_per_pixel - position % ms_per_pixel)
+        return max(int(delay) + 1, self.MIN_INTERVAL_MS)
+
+    def stats(self):
+        return {
+            "wakeups": self.wakeups,
+            "label_updates": self.label_updates,
+            "slider_updates": self.slider_updates,
+        }
+
+
+class ProgressUpdater:
+    """The progress timer's work, without wx: resync, redraw what changed, say when to wake.
+
+    ``tell()`` is the backend position in ms; ``show_position(pos)`` and
+    ``show_text(text)`` update the slider and the time label; ``time_label``
+    is a ``player_core.TimeLabel``. The frame's timer handler and the perf
+    suite both run ``tick``, so the suite measures the handler's own code.
+    """
+
+    def __init__(self, clock, progress, time_label, tell, show_position, show_text):
+        self.clock = clock
+        self.progress = progress
+        self.time_label = time_label
+        self.tell = tell
+        self.show_position = show_position
+        self.show_text = show_text
+
+    def tick(self, pixels, dragging=False):
+        """One timer wakeup; False when nothing is playing (the timer should stay off)."""
+        if not self.clock.playing:
+            return False
+        if self.clock.needs_resync():
+            self.clock.sync(self.tell())
+        self.refresh(pixels, dragging)
+        return True
+
+    def refresh(self, pixels, dragging=False):
+        """Bring the label and slider (unless it is being dragged) up to date, touching only what changed."""
+        length = self.clock.length
+        if length <= 0:
+            return
+        pos = self.clock.position()
+        label_changed, slider_changed = self.progress.changes(pos, length, pixels)
+        if slider_changed and not dragging:
+            self.show_position(pos)
+        if label_changed:
+            text = self.time_label.text(pos)
+            if text is not None:
+                self.show_text(text)
+
+    def next_in(self, pixels, dragging=False):
+        """Milliseconds until the display next changes, or None when no wakeup is needed."""
+        if dragging or self.clock.length <= 0:
+            return None
+        return self.progress.next_change_in(self.clock.position(), self.clock.length, pixels)
+
+
+class SeekCoalescer:
+    """Turns the stream of positions from a slider drag into a few seeks.
+
+    A seek counts as in flight for ``settle`` seconds, since MediaCtrl has
+    no "seek done" event. ``drag(pos)`` seeks at once when nothing is in
+    flight; otherwise it keeps ``pos`` as the pending position (replacing
+    any older one) and returns the ms until the caller should ``flush()``.
+    ``release(pos)`` is the final seek, issued right away unless the last
+    seek of this drag already went to ``pos`` (a plain click).
+    """
+
+    def __init__(self, seek, settle=0.15, clock=time.monotonic):
+        self._seek = seek
+        self.settle = settle
+        self._clock = clock
+        self.pending = None
+        self.last_target = None
+        self._last_seek = None
+        self.drag_events = 0
+        self.seeks = 0
+
+    def begin(self):
+        """A new drag starts: nothing it asks for has been sought yet."""
+        self.pending = None
+        self.last_target = None
+
+    def drag(self, position):
+        self.drag_events += 1
+        self.pending = position
+        return self.flush()
+
+    def flush(self):
+        """Seek to the pending position once the last seek has settled; ms still to wait, or 0."""
+        if self.pending is None:
+            return 0
+        if self._last_seek is not None:
+            wait = self._last_seek + self.settle - self._clock()
+            if wait > 0:
+                return int(wait * 1000) + 1
+        position, self.pending = self.pending, None
+        self._issue(position)
+        return 0
+
+    def release(self, position):
+        self.pending = None
+        if position != self.last_target:
+            self._issue(position)
+        self.last_target = None
+
+    def _issue(self, position):
+        self.last_target = position
+        self._last_seek = self._clock()
+        self.seeks += 1
+        self._seek(position)
+
+    def stats(self):
+        return {"drag_events": self.drag_events, "seeks": self.seeks}
@@ -0,0 +1,369 @@
+"""Playlist and playback logic with no GUI in it.
+
+The wx frame is a view over these classes. Benchmarks and the command
+line drive them directly with ``NullBackend``, without importing wx.
+"""
+
+import os
+import time
+
+from play_queue import PlayQueue
+from row_map import RowMap
+from fuzzy_search import FuzzyIndex
+from search_index import SearchIndex
+from track_store import TrackStore
+
+# ReplayGain's reference level, in BS.1770 terms
+TARGET_LUFS = -18.0
+# times up to this many seconds are formatted once and then looked up
+CACHED_SECONDS = 2 * 3600
+
+_formatted = {0: "00:00"}
+
+
+def format_time(ms):
+    """Convert milliseconds to MM:SS, or H:MM:SS from an hour up"""
+    seconds = int(ms) // 1000 if ms and ms > 0 else 0
+    text = _formatted.get(seconds)
+    if text is None:
+        minutes, s = divmod(seconds, 60)
+        if minutes < 60:
+            text = f"{minutes:02d}:{s:02d}"
+        else:
+            hours, minutes = divmod(minutes, 60)
+            text = f"{hours}:{minutes:02d}:{s:02d}"
+        if seconds < CACHED_SECONDS:
+            _formatted[seconds] = text
+    return text
+
+
+class TimeLabel:
+    """Text of the "position / length" time label, rebuilt only when it changes.
+
+    ``set_length`` formats a track's length once, when it starts.
+    ``text(position)`` returns None while the position is in the second
+    already shown, so the caller skips SetLabel (and has no need to
+    GetLabel to compare); otherwise it joins the position's string (from
+    ``format_time``'s table) to the cached length.
+    """
+
+    def __init__(self, format_time=format_time):
+        self._format = format_time
+        self._suffix = " / " + format_time(0)
+        self._second = None
+        self.calls = 0
+        self.updates = 0
+
+    def set_length(self, length):
+        self._suffix = " / " + self._format(length)
+        self._second = None
+
+    def text(self, position):
+        self.calls += 1
+        # None (no position from the backend yet) and negative positions show as 0, like format_time
+        second = int(position) // 1000 if position and position > 0 else 0
+        if second == self._second:
+            return None
+        self._second = second
+        self.updates += 1
+        return self._format(position) + self._suffix
+
+
+def normalization_gain(lufs, peak):
+    """Linear volume factor that brings a track of ``lufs`` loudness to ``TARGET_LUFS``.
+
+    Never above 1.0: backends scale volume down, never up, so tracks
+    quieter than the target play as they are. Never so high that ``peak``
+    would clip either. 1.0 for tracks not analysed (``lufs`` None).
+    """
+    if lufs is None:
+        return 1.0
+    gain = 10 ** ((TARGET_LUFS - lufs) / 20)
+    if peak:
+        gain = min(gain, 1 / peak)
+    return min(gain, 1.0)
+
+
+class PlaybackBackend:
+    """What the controller needs from a media player. Times are in ms.
+
+    ``load`` may finish asynchronously (wx.media does); callers start
+    playback with ``PlayerController.start`` once the track is ready.
+    """
+
+    def load(self, path):
+        """Open ``path``; returns False if the player refused it."""
+        raise NotImplementedError
+
+    def play(self):
+        raise NotImplementedError
+
+    def pause(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def seek(self, position):
+        raise NotImplementedError
+
+    def tell(self):
+        raise NotImplementedError
+
+    def length(self):
+        raise NotImplementedError
+
+    def is_playing(self):
+        raise NotImplementedError
+
+    def set_volume(self, volume):
+        raise NotImplementedError
+
+
+class NullBackend(PlaybackBackend):
+    """Silent backend: "plays" by following a clock, for headless use.
+
+    Loads succeed at once and every track is ``track_length`` ms long.
+    """
+
+    def __init__(self, track_length=180_000, clock=time.monotonic):
+        self.track_length = track_length
+        self._clock = clock
+        self.path = None
+        self.volume = 1.0
+        self.loads = 0
+        self.seeks = 0
+        self._position = 0
+        self._started = None
+
+    def load(self, path):
+        self.path = path
+        self.loads += 1
+        self._position = 0
+        self._started = None
+        return True
+
+    def play(self):
+        if self.path is not None and self._started is None:
+            self._started = self._clock() - self._position / 1000
+
+    def pause(self):
+        self._position = self.tell()
+        self._started = None
+
+    def stop(self):
+        self._started = None
+        self._position = 0
+
+    def seek(self, position):
+        self.seeks += 1
+        self._position = max(0, min(position, self.length()))
+        if self._started is not None:
+            self._started = self._clock() - self._position / 1000
+
+    def tell(self):
+        if self._started is None:
+            return self._position
+        return min(int((self._clock() - self._started) * 1000), self.length())
+
+    def length(self):
+        return self.track_length if self.path is not None else 0
+
+    def is_playing(self):
+        return self._started is not None and self.tell() < self.length()
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+
+class Playlist:
+    """The track library, its search index and the rows currently shown.
+
+    ``library`` is an optional ``LibraryDB``; with it, added tracks are
+    saved and ``load`` brings back the saved library.
+    """
+
+    def __init__(self, library=None):
+        self.library = library
+        self.tracks = TrackStore()
+        self.search_index = SearchIndex()
+        # built on first use: ranked search over names and tags
+        self.fuzzy_index = FuzzyIndex(self.search_index, library.search_fields if library is not None else None)
+        self.view = RowMap()
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def load(self):
+        if self.library is not None:
+            self.search_index.extend(self.library.load_tracks(self.tracks))
+        self.view = RowMap(range(len(self.tracks)))
+
+    def save(self):
+        if self.library is not None:
+            self.library.save_snapshot(self.tracks)
+
+    def add(self, paths, skip_known=False):
+        """Append paths to the library; returns the range of new track ids.
+
+        With ``skip_known``, paths already in the library (or earlier in
+        ``paths``) are left out, e.g. when a playlist is imported again.
+        """
+        entries = map(os.path.split, paths)
+        if skip_known:
+            find = self.tracks.find_entry
+            entries = [entry for entry in dict.fromkeys(entries) if find(*entry) is None]
+        first_new = len(self.tracks)
+        names = []
+        for folder, name in entries:
+            self.tracks.add_entry(folder, name)
+            names.append(name)
+        # one lock round trip per batch, not per track
+        self.search_index.extend(names)
+        added = range(first_new, len(self.tracks))
+        if self.library is not None and added:
+            self.library.add_tracks(self.tracks, added.start, added.stop)
+        return added
+
+    def filter(self, text="", fuzzy=False):
+        """Show the tracks matching ``text``; returns the new view."""
+        return self.show(self.search(text, fuzzy=fuzzy))
+
+    def search(self, text, cancelled=None, fuzzy=False):
+        """Track ids for ``text``.
+
+        Every track whose name contains it, in playlist order; with
+        ``fuzzy``, the best ranked matches over names and tags instead.
+        """
+        if fuzzy and text.strip():
+            return self.fuzzy_index.search(text, cancelled=cancelled)
+        return self.search_index.search(text, cancelled)
+
+    def show(self, rows):
+        """Show ``rows`` (track ids), e.g. results from a SearchWorker."""
+        self.view = RowMap(rows)
+        return self.view
+
+    def entries(self, rows=None):
+        """(path, title, duration_ms) of ``rows`` (default: the view), for ``playlist_io.write_playlist``."""
+        from library_db import MetadataPager
+
+        metadata = MetadataPager(self.library, page_size=4096, max_pages=4) if self.library is not None else None
+        for track_id in self.view.rows if rows is None else rows:
+            meta = metadata.get(track_id) if metadata is not None else None
+            if meta is None:
+                yield self.tracks.path(track_id), None, None
+                continue
+            title = f"{meta.artist} - {meta.title}" if meta.artist and meta.title else meta.title
+            yield self.tracks.path(track_id), title, meta.duration_ms
+
+    def name(self, track_id):
+        return self.tracks.name(track_id)
+
+    def path(self, track_id):
+        return self.tracks.path(track_id)
+
+
+class PlayerController:
+    """Which track is current, and what load, prev, next and play/pause do.
+
+    The order tracks play in (the view, the play queue, shuffle and
+    repeat) is kept by ``queue``, a ``PlayQueue``.
+    """
+
+    def __init__(self, playlist, backend):
+        self.playlist = playlist
+        self.backend = backend
+        self.queue = PlayQueue(playlist)
+        # track restored from the last session, loaded on the first play
+        self.resume_index = None
+        self.volume = 0.7
+        # loudness normalization: track index -> factor on ``volume`` (see ``normalization_gain``)
+        self.gain_of = None
+        self.track_gain = 1.0
+
+    @property
+    def current_index(self):
+        return self.queue.current
+
+    @current_index.setter
+    def current_index(self, index):
+        self.queue.set_current(index)
+
+    def load(self, index):
+        """Stop and load track ``index``; returns False if it could not be loaded.
+
+        The track becomes current either way, so a following next/prev
+        moves on past a file that would not load.
+        """
+        if index < 0 or index >= len(self.playlist):
+            return False
+        self.select(index)
+        # looked up now, from analysis done beforehand, and applied in ``start``
+        self.track_gain = self.gain_of(index) if self.gain_of is not None else 1.0
+        return self.backend.load(self.playlist.path(index))
+
+    def select(self, index):
+        """Stop, and make track ``index`` current without loading it (e.g. it failed to open)."""
+        self.resume_index = None
+        self.current_index = index
+        self.backend.stop()
+
+    def start(self):
+        """Begin playing a freshly loaded track."""
+        self.backend.set_volume(self.volume * self.track_gain)
+        self.backend.play()
+
+    def next_index(self, auto=False):
+        """Track ``next`` would load (``auto``: playback moving on by itself), or None."""
+        return self.queue.next_track(auto)
+
+    def prev_index(self):
+        return self.queue.prev_track()
+
+    def upcoming(self, count):
+        """Indices of up to ``count`` tracks that ``next`` would load, in order."""
+        return self.queue.upcoming(count)
+
+    def read_ahead(self, count):
+        """The next ``count`` tracks and the previous one: those worth having ready."""
+        return self.queue.upcoming(count, previous=True)
+
+    def next(self, auto=False):
+        index = self.next_index(auto)
+        return index is not None and self.load(index)
+
+    def prev(self):
+        index = self.prev_index()
+        return index is not None and self.load(index)
+
+    def toggle(self):
+        """Play or pause the loaded track; returns True if it now plays."""
+        if self.backend.is_playing():
+            self.backend.pause()
+            return False
+        self.backend.play()
+        return True
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self.backend.set_volume(volume * self.track_gain)
+
+    def set_track_gain(self, gain):
+        """Change the current track's normalization factor while it plays."""
+        self.track_gain = gain
+        self.backend.set_volume(self.volume * gain)
+
+    def restore(self, state):
+        """Pick up ``current_index`` and ``volume`` from a saved session."""
+        self.volume = state.get("volume", self.volume * 100) / 100
+        self.queue.restore(state)
+        index = state.get("current_index", -1)
+        if 0 <= index < len(self.playlist):
+            self.queue.resume(index)
+            self.resume_index = index
+
+    def session_state(self):
+        state = {"current_index": self.current_index, "volume": round(self.volume * 100)}
+        state.update(self.queue.session_state())
+        return state
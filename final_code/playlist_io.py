@@ -0,0 +1,308 @@
+"""Reading and writing M3U, M3U8, PLS and XSPF playlist files, streamed.
+
+Readers go through a file a line at a time (XSPF: 64 KiB at a time,
+through a parser target that builds no tree) and yield absolute paths in
+batches, so a playlist of any length is imported in flat memory and its first tracks show up before
+the rest is read. Relative entries are resolved against the playlist's
+folder. Entries are not checked on disk here: stat'ing half a million
+files on a network share would take longer than the import itself, so a
+missing file is only noticed (and skipped) when it is played.
+
+Writers take an iterable of ``(path, title, duration_ms)`` and write as
+they go; ``title`` and ``duration_ms`` may be None.
+"""
+
+import os
+import re
+import threading
+from urllib.parse import quote, unquote, urlsplit
+
+PLAYLIST_EXTENSIONS = (".m3u", ".m3u8", ".pls", ".xspf")
+# two letters at least: "C:\music" is a Windows path, not a URL
+URL_SCHEME = re.compile(r"[A-Za-z][A-Za-z0-9+.-]+:")
+
+
+def playlist_wildcard():
+    """wx.FileDialog wildcard for the playlist formats, one filter per format."""
+    filters = [f"{ext[1:].upper()} playlist (*{ext})|*{ext}" for ext in PLAYLIST_EXTENSIONS]
+    patterns = ";".join("*" + ext for ext in PLAYLIST_EXTENSIONS)
+    return "|".join([f"Playlists ({patterns})|{patterns}"] + filters)
+
+
+def is_playlist_file(name):
+    return name.lower().endswith(PLAYLIST_EXTENSIONS)
+
+
+def read_playlist(path, batch_size=5000):
+    """Yield lists of absolute track paths from a playlist file, in order."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xspf":
+        entries = _xspf_locations(path)
+    elif ext == ".pls":
+        entries = _pls_entries(path)
+    elif ext in (".m3u", ".m3u8"):
+        entries = _m3u_entries(path)
+    else:
+        raise ValueError(f"not a playlist file: {path}")
+
+    base = os.path.dirname(os.path.abspath(path))
+    batch = []
+    for entry in entries:
+        resolved = resolve_entry(entry, base)
+        if resolved is not None:
+            batch.append(resolved)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def resolve_entry(entry, base):
+    """Absolute path for a playlist entry, or None for streams and other URLs."""
+    entry = entry.strip()
+    if not entry:
+        return None
+    if URL_SCHEME.match(entry):
+        if not entry[:5].lower() == "file:":
+            return None
+        entry = _file_url_path(entry)
+    elif os.sep != "\\" and "\\" in entry:
+        # written on Windows, read here
+        entry = entry.replace("\\", "/")
+    path = os.path.join(base, entry)
+    if os.sep == "/" and "/." not in path and "//" not in path:
+        return path  # already normal; normpath is a good part of the cost of a big import
+    return os.path.normpath(path)
+
+
+def write_playlist(path, tracks, relative=False):
+    """Write ``tracks`` ((path, title, duration_ms) tuples) in the format of ``path``'s extension.
+
+    With ``relative``, tracks below the playlist's folder are written
+    relative to it, so the playlist moves along with the music.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    writers = {".m3u": _write_m3u, ".m3u8": _write_m3u, ".pls": _write_pls, ".xspf": _write_xspf}
+    if ext not in writers:
+        raise ValueError(f"not a playlist file: {path}")
+    base = os.path.dirname(os.path.abspath(path)).rstrip(os.sep) if relative else None
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        # .m3u is traditionally Latin-1; writing UTF-8 everywhere is what players expect today
+        with open(tmp, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+            count = writers[ext](f, tracks, base)
+        os.replace(tmp, path)
+    except BaseException:
+        # a full disk, or a track list that raised: no half-written file left behind
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+class PlaylistImporter:
+    """Reads a playlist file on a background thread.
+
+    ``on_batch(paths, count)`` gets the paths in batches with the running
+    total; ``on_done(count, cancelled, error)`` follows the last batch,
+    with ``error`` a message when the file could not be read. Both run on
+    the importer thread, like ``FolderScanner``'s callbacks.
+    """
+
+    def __init__(self, path, on_batch, on_done, batch_size=5000):
+        self.path = path
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        threading.Thread(target=self._run, name="playlist-import", daemon=True).start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _run(self):
+        count = 0
+        error = None
+        try:
+            for batch in read_playlist(self.path, self.batch_size):
+                if self._cancelled.is_set():
+                    break
+                count += len(batch)
+                self.on_batch(batch, count)
+        except (OSError, ValueError, SyntaxError) as e:
+            # ParseError (bad XML) is a SyntaxError
+            error = str(e)
+        self.on_done(count, self._cancelled.is_set(), error)
+
+
+# -------------- helpers -----------------
+
+def _file_url_path(url):
+    # file:///path is by far the common form; urlsplit is slow enough to show on big playlists
+    path = url[7:] if url.startswith("file:///") else urlsplit(url).path
+    if os.name == "nt":
+        # urllib.request drags in http.client and email; only Windows needs it
+        from urllib.request import url2pathname
+
+        return url2pathname(path)
+    # spaces are most of the escapes in practice, and far cheaper to undo than a full unquote
+    path = path.replace("%20", " ")
+    if "%" not in path:
+        return path
+    # surrogateescape, so names that are not UTF-8 survive the round trip
+    return unquote(path, errors="surrogateescape")
+
+
+def _m3u_entries(path):
+    # utf-8-sig drops a BOM; surrogateescape keeps Latin-1 names from old .m3u files intact
+    with open(path, encoding="utf-8-sig", errors="surrogateescape") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            yield line
+
+
+def _pls_entries(path):
+    with open(path, encoding="utf-8-sig", errors="surrogateescape") as f:
+        for line in f:
+            key, sep, value = line.partition("=")
+            if sep and key.strip().lower().startswith("file"):
+                yield value
+
+
+class _XspfTarget:
+    """XML parser target that keeps the first location of every track and builds no tree."""
+
+    def __init__(self):
+        self.locations = []
+        self._in_track = False
+        self._text = None
+        self._location = None
+
+    def start(self, tag, attrib):
+        name = tag.rpartition("}")[2]
+        if name == "track":
+            self._in_track = True
+        elif name == "location" and self._in_track and self._location is None:
+            self._text = []
+
+    def data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def end(self, tag):
+        name = tag.rpartition("}")[2]
+        if name == "location" and self._text is not None:
+            self._location = "".join(self._text).strip()
+            self._text = None
+        elif name == "track":
+            if self._location:
+                self.locations.append(self._location)
+            self._in_track = False
+            self._location = None
+
+    def close(self):
+        pass
+
+    def take(self):
+        locations, self.locations = self.locations, []
+        return locations
+
+
+def _xspf_locations(path):
+    from xml.etree.ElementTree import XMLParser
+
+    target = _XspfTarget()
+    parser = XMLParser(target=target)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            parser.feed(chunk)
+            yield from _xspf_paths(target.take())
+    parser.close()
+    yield from _xspf_paths(target.take())
+
+
+def _xspf_paths(locations):
+    for location in locations:
+        if URL_SCHEME.match(location):
+            yield location
+        else:
+            # a relative URI reference: percent-encoded like any other
+            yield unquote(location, errors="surrogateescape")
+
+
+def _written_path(path, base):
+    # library paths are already normalised, so a prefix test does what relpath would, far quicker
+    if base is not None and path.startswith(base) and path[len(base):len(base) + 1] == os.sep:
+        return path[len(base) + 1:]
+    return path
+
+
+def _quote(path):
+    return quote(path, errors="surrogateescape")
+
+
+def _file_url(path):
+    if os.name == "nt":
+        drive, rest = os.path.splitdrive(path)
+        return "file:///" + drive + _quote(rest.replace("\\", "/"))
+    return "file://" + _quote(path)
+
+
+def _write_m3u(f, tracks, base):
+    f.write("#EXTM3U\n")
+    count = 0
+    for path, title, duration_ms in tracks:
+        if title or duration_ms:
+            seconds = round(duration_ms / 1000) if duration_ms else -1
+            f.write(f"#EXTINF:{seconds},{title or os.path.basename(path)}\n")
+        f.write(_written_path(path, base) + "\n")
+        count += 1
+    return count
+
+
+def _write_pls(f, tracks, base):
+    f.write("[playlist]\n")
+    count = 0
+    for count, (path, title, duration_ms) in enumerate(tracks, 1):
+        f.write(f"File{count}={_written_path(path, base)}\n")
+        if title:
+            f.write(f"Title{count}={title}\n")
+        if duration_ms:
+            f.write(f"Length{count}={round(duration_ms / 1000)}\n")
+    # the count is only known at the end; PLS readers take it from anywhere in the section
+    f.write(f"NumberOfEntries={count}\nVersion=2\n")
+    return count
+
+
+def _write_xspf(f, tracks, base):
+    # saxutils imports urllib.request (http.client, email): only pay for it when writing XSPF
+    from xml.sax.saxutils import escape
+
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<playlist version="1" xmlns="http://xspf.org/ns/0/">\n  <trackList>\n')
+    count = 0
+    for path, title, duration_ms in tracks:
+        written = _written_path(path, base)
+        if os.path.isabs(written):
+            location = _file_url(written)
+        else:
+            location = _quote(written.replace(os.sep, "/"))
+        f.write(f"    <track><location>{escape(location)}</location>")
+        if title:
+            f.write(f"<title>{escape(title)}</title>")
+        if duration_ms:
+            f.write(f"<duration>{int(duration_ms)}</duration>")
+        f.write("</track>\n")
+        count += 1
+    f.write("  </trackList>\n</playlist>\n")
+    return count
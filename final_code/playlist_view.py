@@ -0,0 +1,76 @@
+import wx
+
+from row_map import RowMap
+
+
+class PlaylistView(wx.ListCtrl):
+    """Virtual playlist: only the rows on screen are ever turned into text.
+
+    The control never owns the track names. It is given the player's
+    ``TrackStore`` plus a ``RowMap`` of the tracks passing the current
+    filter, and asks for a row's text only when wx needs to draw it.
+
+    Tags and durations come from ``metadata`` (a ``MetadataPager``), which
+    reads them from the library a page at a time as rows scroll into view.
+    Tracks without a title tag show their file name.
+    """
+
+    DURATION_WIDTH = 60
+
+    def __init__(self, parent, tracks, metadata=None, format_time=None):
+        super().__init__(
+            parent,
+            style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL,
+        )
+        self.InsertColumn(0, "")
+        self.InsertColumn(1, "", wx.LIST_FORMAT_RIGHT, self.DURATION_WIDTH)
+        self.tracks = tracks
+        self.metadata = metadata
+        self.format_time = format_time
+        self.row_map = RowMap()
+
+        self.Bind(wx.EVT_SIZE, self.on_size)
+
+    def set_rows(self, rows):
+        """Show ``rows`` (track ids or a RowMap). Cost does not depend on len(rows)."""
+        self.row_map = rows if isinstance(rows, RowMap) else RowMap(rows)
+        self.SetItemCount(len(rows))
+        self.Refresh()
+
+    def track_at(self, row):
+        return self.row_map.track_at(row)
+
+    def row_of_track(self, track_id):
+        """Visible row of a track, or wx.NOT_FOUND if it is filtered out."""
+        return self.row_map.row_of(track_id, wx.NOT_FOUND)
+
+    def get_selection(self):
+        return self.GetFirstSelected()
+
+    def set_selection(self, row):
+        if row == wx.NOT_FOUND or row >= len(self.row_map):
+            return
+        selected = self.GetFirstSelected()
+        if selected != wx.NOT_FOUND and selected != row:
+            self.Select(selected, on=0)
+        self.Select(row)
+        self.Focus(row)
+        self.EnsureVisible(row)
+
+    # -------------- virtual callbacks ---------------
+
+    def OnGetItemText(self, item, column):
+        track_id = self.row_map.rows[item]
+        meta = self.metadata.get(track_id) if self.metadata is not None else None
+        if column == 0:
+            if meta is not None and meta.title:
+                return f"{meta.artist} - {meta.title}" if meta.artist else meta.title
+            return self.tracks.name(track_id)
+        if meta is None or not meta.duration_ms:
+            return ""
+        return self.format_time(meta.duration_ms)
+
+    def on_size(self, event):
+        # name column takes whatever the duration column leaves
+        self.SetColumnWidth(0, max(self.GetClientSize().width - self.DURATION_WIDTH, 0))
+        event.Skip()
@@ -0,0 +1,86 @@
+from bisect import bisect_left, bisect_right
+
+
+class RangeWithout:
+    """``range(count)`` without the ids in ``removed``, as a read-only sequence.
+
+    What an unfiltered view becomes once tracks were removed: it stores the
+    removed ids (sorted) rather than every id left, so indexing, ``in`` and
+    ``index`` are O(log removed).
+    """
+
+    def __init__(self, count, removed):
+        self.count = count
+        self.removed = sorted(i for i in removed if 0 <= i < count)
+
+    def __len__(self):
+        return self.count - len(self.removed)
+
+    def __iter__(self):
+        start = 0
+        for track_id in self.removed:
+            yield from range(start, track_id)
+            start = track_id + 1
+        yield from range(start, self.count)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        size = len(self)
+        if row < 0:
+            row += size
+        if not 0 <= row < size:
+            raise IndexError("row out of range")
+        # removed[k] - k ids are kept below removed[k]: count the removed ids before this row
+        removed = self.removed
+        lo, hi = 0, len(removed)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if removed[mid] - mid <= row:
+                lo = mid + 1
+            else:
+                hi = mid
+        return row + lo
+
+    def __contains__(self, track_id):
+        if not 0 <= track_id < self.count:
+            return False
+        at = bisect_left(self.removed, track_id)
+        return at == len(self.removed) or self.removed[at] != track_id
+
+    def index(self, track_id):
+        if track_id not in self:
+            raise ValueError(f"{track_id} is not shown")
+        return track_id - bisect_right(self.removed, track_id)
+
+
+class RowMap:
+    """Two-way mapping between visible playlist rows and track ids.
+
+    A track id is the track's index in the player's track list. Ids are
+    handed out once and never reused, so two files with the same basename
+    are still two different tracks.
+
+    ``rows`` is the filtered view: ``rows[row]`` is the track shown on that
+    row. The reverse map is only built the first time it is needed, and an
+    unfiltered view (a ``range`` or ``RangeWithout``) never needs one at all.
+    """
+
+    def __init__(self, rows=range(0)):
+        self.rows = rows
+        self._row_of = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def track_at(self, row):
+        return self.rows[row]
+
+    def row_of(self, track_id, default=-1):
+        """Row showing ``track_id``, or ``default`` if it is filtered out."""
+        rows = self.rows
+        if isinstance(rows, (range, RangeWithout)):
+            return rows.index(track_id) if track_id in rows else default
+        if self._row_of is None:
+            self._row_of = {track: row for row, track in enumerate(rows)}
+        return self._row_of.get(track_id, default)
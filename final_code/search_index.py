@@ -0,0 +1,244 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+from row_map import RangeWithout
+
+# how many candidates are verified between cancellation checks
+CHUNK = 32768
+# how many names get their grams built per lock acquisition
+BUILD_BATCH = 4096
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def grams(text):
+    """Every distinct substring of one to three characters."""
+    return {text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1)}
+
+
+class Indexer:
+    """One long-lived daemon thread that runs ``build()`` after each ``wake()``.
+
+    The thread is started by the first ``wake``. Wakes that come while a
+    build runs are folded into one more pass, so adding a batch costs an
+    event, not a thread, and nothing added during a build waits for the
+    next add.
+    """
+
+    def __init__(self, build, name):
+        self._build = build
+        self._name = name
+        self._event = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def wake(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+        self._event.set()
+
+    def _run(self):
+        while True:
+            self._event.wait()
+            # cleared before building: a wake during the build means one more pass
+            self._event.clear()
+            self._build()
+
+
+class SearchIndex:
+    """Inverted index of 1-, 2- and 3-grams over track names for case-insensitive substring search.
+
+    Track ids are the positions names were added in, so they line up with the
+    player's track indices. Every posting list is an ``array`` of ids in
+    ascending order, which keeps results in playlist order without sorting.
+
+    A query of up to three characters is answered by its own posting list,
+    copied without checking a single name; the one- and two-character
+    postings are what keeps the first keystrokes as fast as the rest.
+    Longer queries only verify the tracks listed under their rarest
+    trigram. When a query extends the previous one (the old query is a
+    substring of the new one), only the previous matches are checked again.
+
+    Adding a name is cheap: it is only lower-cased and stored. Gram
+    postings are built later by ``index_pending`` (usually on the indexer
+    thread, see ``index_in_background``), and until then searches simply
+    scan the names that are not indexed yet, so results are always complete.
+
+    Writers take the lock; ``search`` only holds it long enough to snapshot
+    the counts, so it can run on a worker thread while tracks are added.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._names = []      # lower-cased name per track id
+        self._indexed = 0     # names[:_indexed] are in _postings
+        self._postings = {}   # 1- to 3-gram -> array of track ids
+        self._removed = set()
+        # (query, result, track count) of the most recent search
+        self._last = None
+        self._indexer = Indexer(self.index_pending, "search-index")
+
+    def __len__(self):
+        return len(self._names) - len(self._removed)
+
+    def add(self, name):
+        """Add one name and return its track id."""
+        with self._lock:
+            self._names.append(name.lower())
+            return len(self._names) - 1
+
+    def extend(self, names):
+        with self._lock:
+            self._names.extend(name.lower() for name in names)
+
+    def names(self, start, stop):
+        """Lower-cased names of track ids ``start``..``stop - 1`` (removed ones included)."""
+        with self._lock:
+            return self._names[start:stop]
+
+    def removed(self):
+        with self._lock:
+            return set(self._removed)
+
+    def remove(self, track_id):
+        """Drop a track from results. Its id is never reused."""
+        with self._lock:
+            self._removed.add(track_id)
+            self._last = None
+
+    def index_pending(self):
+        """Build postings for every name added since the last call.
+
+        Works in batches so adds and searches never wait long. Only one
+        thread builds at a time; a second caller returns straight away, and
+        the builder checks again after letting go of the build lock, so
+        names that caller added are never left behind.
+        """
+        while self._build_lock.acquire(blocking=False):
+            try:
+                self._build_pending()
+            finally:
+                self._build_lock.release()
+            with self._lock:
+                if self._indexed == len(self._names):
+                    return
+
+    def index_in_background(self):
+        """Have the indexer thread index whatever is pending."""
+        self._indexer.wake()
+
+    def search(self, query, cancelled=None):
+        """Ids of all tracks whose name contains ``query``, in ascending order.
+
+        The result is a sequence (a list, an ``array``, or for the empty
+        query a ``range`` or ``RangeWithout``), never a live posting list.
+        Returns None if ``cancelled()`` became true before the search finished.
+        """
+        query = query.lower()
+        with self._lock:
+            count = len(self._names)
+            indexed = self._indexed
+            removed = set(self._removed) if self._removed else None
+            last = self._last
+
+        if not query:
+            result = RangeWithout(count, removed) if removed else range(count)
+        else:
+            result = self._match(query, count, indexed, last, cancelled)
+            if result is None:
+                return None
+            if removed:
+                result = _without(result, removed)
+        self._last = (query, result, count)
+        return result
+
+    def _match(self, query, count, indexed, last, cancelled):
+        candidates = self._rarest_posting(query, indexed)
+        unindexed = count - indexed
+
+        # up to three characters the posting list is the answer; checking the previous matches is slower
+        if len(query) > 3 and last is not None and last[0] and last[0] in query:
+            previous, previous_count = last[1], last[2]
+            if len(previous) <= len(candidates) + unindexed:
+                result = self._verify(previous, query, cancelled)
+                if result is not None:
+                    # tracks added since the previous search were never checked
+                    result.extend(self._verify(range(previous_count, count), query, None))
+                return result
+
+        if len(query) <= 3:
+            result = candidates  # already a copy
+        else:
+            result = self._verify(candidates, query, cancelled)
+        if result is not None and unindexed:
+            tail = self._verify(range(indexed, count), query, cancelled)
+            if tail is None:
+                return None
+            result.extend(tail)
+        return result
+
+    def _build_pending(self):
+        postings = self._postings
+        while True:
+            with self._lock:
+                start = self._indexed
+                batch = self._names[start:start + BUILD_BATCH]
+            if not batch:
+                return
+            for track_id, name in enumerate(batch, start):
+                for gram in grams(name):
+                    ids = postings.get(gram)
+                    if ids is None:
+                        postings[gram] = array("I", (track_id,))
+                    else:
+                        ids.append(track_id)
+            with self._lock:
+                self._indexed = start + len(batch)
+
+    def _verify(self, ids, query, cancelled):
+        names = self._names
+        if cancelled is None:
+            return [i for i in ids if query in names[i]]
+        result = []
+        for start in range(0, len(ids), CHUNK):
+            if cancelled():
+                return None
+            result += [i for i in ids[start:start + CHUNK] if query in names[i]]
+        return result
+
+    def _rarest_posting(self, query, indexed):
+        """Copy of the smallest posting list among the query's grams, cut at ``indexed``.
+
+        Up to three characters, that is the query's own posting list.
+        """
+        postings = self._postings
+        rarest = None
+        for gram in trigrams(query) if len(query) > 3 else (query,):
+            ids = postings.get(gram)
+            if ids is None:
+                return array("I")
+            if rarest is None or len(ids) < len(rarest):
+                rarest = ids
+        # the builder may have moved on since the caller took its snapshot, and
+        # keeps appending to the list: slicing copies it
+        return rarest[:bisect_left(rarest, indexed)]
+
+
+# -------------- helpers -----------------
+
+def _without(ids, removed):
+    """``ids`` (ascending, owned by the caller) minus the ``removed`` ones."""
+    if len(removed) > 64:
+        return [i for i in ids if i not in removed]
+    # a few removed tracks: find each one instead of testing every id
+    for track_id in sorted(removed, reverse=True):
+        at = bisect_left(ids, track_id)
+        if at < len(ids) and ids[at] == track_id:
+            del ids[at]
+    return ids
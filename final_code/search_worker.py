@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class SearchWorker:
+    """Debounced playlist search on a background thread.
+
+    ``submit`` is called for every keystroke. The worker waits until typing
+    has paused for ``delay`` seconds, runs ``search(query, cancelled)`` and
+    hands the rows to ``deliver(generation, rows)``. A newer ``submit`` (or
+    ``cancel``) makes the running search stale: it stops at its next
+    cancellation check and its result is thrown away.
+
+    ``deliver`` runs on the worker thread, so the GUI passes a function that
+    forwards to the main loop (``wx.CallAfter``).
+    """
+
+    def __init__(self, search, deliver, delay=0.12):
+        self._search = search
+        self._deliver = deliver
+        self._delay = delay
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending = None  # (generation, query, due time)
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="playlist-search", daemon=True)
+        self._thread.start()
+
+    def submit(self, query):
+        """Queue a search, replacing any query that has not run yet."""
+        with self._cond:
+            self._generation += 1
+            self._pending = (self._generation, query, time.monotonic() + self._delay)
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self):
+        """Drop the pending query and make any running search stale."""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._generation += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, query, due = self._pending
+                remaining = due - time.monotonic()
+                if remaining > 0:
+                    # still typing: sleep, then look at whatever is pending by then
+                    self._cond.wait(remaining)
+                    continue
+                self._pending = None
+
+            rows = self._search(query, lambda: generation != self._generation)
+            if rows is not None and generation == self._generation:
+                self._deliver(generation, rows)
@@ -0,0 +1,69 @@
+import wx
+
+
+class StatsPanel(wx.Frame):
+    """Live handler timings from an ``Instrumentation``.
+
+    Hidden until toggled (Ctrl+Shift+S in the player), and only refreshed
+    while it is on screen.
+    """
+
+    COLUMNS = (("handler", 190), ("count", 70), ("total ms", 90), ("max ms", 80), ("p99 ms", 80))
+    REFRESH_MS = 1000
+
+    def __init__(self, parent, instrumentation):
+        super().__init__(
+            parent,
+            title="Handler stats",
+            size=(540, 440),
+            style=wx.DEFAULT_FRAME_STYLE | wx.FRAME_TOOL_WINDOW | wx.FRAME_FLOAT_ON_PARENT,
+        )
+        self.instrumentation = instrumentation
+        panel = wx.Panel(self)
+        self.table = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for column, (label, width) in enumerate(self.COLUMNS):
+            align = wx.LIST_FORMAT_LEFT if column == 0 else wx.LIST_FORMAT_RIGHT
+            self.table.InsertColumn(column, label, align, width)
+        self.extras = wx.StaticText(panel, label="")
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.table, 1, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(self.extras, 0, wx.EXPAND | wx.ALL, 5)
+        panel.SetSizer(sizer)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.refresh, self.timer)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+    def toggle(self):
+        if self.IsShown():
+            self.timer.Stop()
+            self.Hide()
+        else:
+            self.Show()
+            self.refresh()
+            self.timer.Start(self.REFRESH_MS)
+
+    def refresh(self, event=None):
+        snapshot = self.instrumentation.snapshot()
+        handlers = snapshot.pop("handlers")
+        self.table.Freeze()
+        try:
+            self.table.DeleteAllItems()
+            for row, (name, stats) in enumerate(handlers.items()):
+                self.table.InsertItem(row, name)
+                self.table.SetItem(row, 1, str(stats["count"]))
+                self.table.SetItem(row, 2, f"{stats['total_ms']:.1f}")
+                self.table.SetItem(row, 3, f"{stats['max_ms']:.2f}")
+                self.table.SetItem(row, 4, f"{stats['p99_ms']:.2f}")
+        finally:
+            self.table.Thaw()
+        self.extras.SetLabel("\n".join(f"{key}: {value}" for key, value in snapshot.items()))
+
+    def on_close(self, event):
+        # closing only hides it; the player owns the window
+        if event.CanVeto():
+            event.Veto()
+            self.toggle()
+        else:
+            event.Skip()
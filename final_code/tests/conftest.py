@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules live side by side in final_code/ and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
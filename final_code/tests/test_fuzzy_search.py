@@ -0,0 +1,51 @@
+from fuzzy_search import FuzzyIndex
+from search_index import SearchIndex
+
+
+def fuzzy_over(names, tags):
+    index = SearchIndex()
+    index.extend(names)
+    return FuzzyIndex(index, tags)
+
+
+def test_tags_added_during_the_first_read_are_kept():
+    def tags():
+        yield 0, "Old Title", None, None
+        # saved and queued while the first build is still reading
+        fuzzy.add_tags([(0, "New Title", "Someone", None), (1, "Late Arrival", None, None)])
+        yield 2, "Early Bird", None, None
+
+    fuzzy = fuzzy_over(["a.mp3", "b.mp3", "c.mp3"], tags)
+    assert fuzzy.search("late") == [1]
+    assert fuzzy.search("someone") == [0]
+    assert fuzzy.search("early") == [2]
+    # the row read for track 0 was older than the one queued meanwhile
+    assert fuzzy.search("old") == []
+
+
+def test_tags_added_before_the_first_read_are_not_posted_twice():
+    rows = [(0, "Blue Song", "Band", None), (1, "Red Song", "Band", None)]
+    fuzzy = fuzzy_over(["a.mp3", "b.mp3"], lambda: iter(rows))
+    fuzzy.add_tags(rows)  # already saved, so the first build reads them from tags()
+    assert sorted(fuzzy.search("band")) == [0, 1]
+    fuzzy.add_tags([(1, "Red Song", "Band", "Live")])
+    assert fuzzy.search("live") == [1]
+    assert sorted(fuzzy.search("song")) == [0, 1]
+    assert list(fuzzy._postings["artist"]["band"]) == [0, 1]
+
+
+def test_a_retagged_track_stops_matching_its_old_tags():
+    rows = [(0, "Blue Song", "Old Band", "First Album"), (1, "Other", "Old Band", None)]
+    fuzzy = fuzzy_over(["blue.mp3", "other.mp3"], lambda: iter(rows))
+    assert sorted(fuzzy.search("old band")) == [0, 1]
+
+    fuzzy.add_tags([(0, "Blue Song", "New Band", None)])
+    assert fuzzy.search("old band") == [1]
+    assert fuzzy.search("first") == []
+    assert fuzzy.search("new band") == [0]
+    # the file name and the title share "blue": the name's entry survives the title being replaced
+    fuzzy.add_tags([(0, "Green", "New Band", None)])
+    assert fuzzy.search("blue") == [0]
+    assert fuzzy.search("song") == []
+    assert fuzzy.search("green") == [0]
+    assert list(fuzzy._postings["artist"]["band"]) == [1, 0]
@@ -0,0 +1,141 @@
+import os
+import struct
+
+from library_db import LibraryDB
+from metadata import TrackMeta, read_metadata, scan_batch
+from player_core import Playlist
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+FRAME = b"\xff\xfb\x90\x00" + bytes(413)
+
+
+def synchsafe(size):
+    return bytes([(size >> 21) & 127, (size >> 14) & 127, (size >> 7) & 127, size & 127])
+
+
+def id3v2(major, frames):
+    """An ID3v2.``major`` tag of (frame id, text) frames: UTF-16 in 2.3, UTF-8 and synchsafe sizes in 2.4."""
+    body = b""
+    for frame_id, text in frames:
+        if major == 4:
+            data = b"\x03" + text.encode("utf-8")
+            body += frame_id + synchsafe(len(data)) + b"\0\0" + data
+        else:
+            data = b"\x01" + text.encode("utf-16")
+            body += frame_id + struct.pack(">I", len(data)) + b"\0\0" + data
+    body += bytes(32)  # padding
+    return b"ID3" + bytes([major, 0, 0]) + synchsafe(len(body)) + body
+
+
+def id3v1(title, artist, album):
+    return b"TAG" + b"".join(value.encode("latin-1").ljust(30, b"\0") for value in (title, artist, album)) + bytes(35)
+
+
+def vorbis_comment(fields):
+    entries = [f"{key}={value}".encode() for key, value in fields.items()]
+    return (struct.pack("<I", 6) + b"tester" + struct.pack("<I", len(entries))
+            + b"".join(struct.pack("<I", len(entry)) + entry for entry in entries))
+
+
+def ogg_page(packet, granule=0):
+    lacing = bytes([255] * (len(packet) // 255) + [len(packet) % 255])
+    return (b"OggS\0\0" + struct.pack("<qII", granule, 1, 0) + b"\0\0\0\0"
+            + bytes([len(lacing)]) + lacing + packet)
+
+
+def write(tmp_path, name, data):
+    path = str(tmp_path / name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_id3v23_tags_and_cbr_duration(tmp_path):
+    tag = id3v2(3, [(b"TIT2", "Midnight Fire"), (b"TPE1", "Neon Rain"), (b"TALB", "Ghost Été")])
+    meta = read_metadata(write(tmp_path, "a.mp3", tag + FRAME * 100))
+    # 100 frames of 417 bytes at 128 kbps
+    assert meta == TrackMeta("Midnight Fire", "Neon Rain", "Ghost Été", 2606, 128)
+
+
+def test_id3v24_length_frame_wins_and_id3v1_fills_the_gaps(tmp_path):
+    tag = id3v2(4, [(b"TIT2", "Title Ünïcode"), (b"TLEN", "185000")])
+    meta = read_metadata(write(tmp_path, "b.mp3", tag + FRAME * 10 + id3v1("Old Title", "Old Artist", "Old Album")))
+    assert (meta.title, meta.artist, meta.album, meta.duration_ms) == ("Title Ünïcode", "Old Artist", "Old Album", 185000)
+
+
+def test_xing_frame_count_gives_the_vbr_duration(tmp_path):
+    # mono, so the Xing header sits after 17 bytes of side info
+    frame = bytearray(b"\xff\xfb\x90\xc0" + bytes(413))
+    frame[21:33] = b"Xing" + struct.pack(">II", 1, 1000)
+    meta = read_metadata(write(tmp_path, "c.mp3", bytes(frame) + FRAME * 5))
+    assert meta.duration_ms == 1000 * 1152 * 1000 // 44100
+    assert meta.title is None
+
+
+def test_flac_streaminfo_and_vorbis_comment(tmp_path):
+    packed = (44100 << 44) | (1 << 41) | (15 << 36) | (44100 * 3)
+    streaminfo = struct.pack(">HH", 4096, 4096) + bytes(6) + packed.to_bytes(8, "big") + bytes(16)
+    comment = vorbis_comment({"title": "Flac Song", "ARTIST": "Someone", "Album": "Lossless"})
+    data = (b"fLaC" + b"\x00" + len(streaminfo).to_bytes(3, "big") + streaminfo
+            + b"\x84" + len(comment).to_bytes(3, "big") + comment + bytes(1000))
+    meta = read_metadata(write(tmp_path, "d.flac", data))
+    assert (meta.title, meta.artist, meta.album, meta.duration_ms) == ("Flac Song", "Someone", "Lossless", 3000)
+
+
+def test_ogg_vorbis_and_opus(tmp_path):
+    fields = {"TITLE": "Ogg Song", "ARTIST": "Band", "ALBUM": "Record"}
+    ident = b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, 44100, 0, 128000, 0) + b"\xb8\x01"
+    data = ogg_page(ident) + ogg_page(b"\x03vorbis" + vorbis_comment(fields) + b"\x01")
+    meta = read_metadata(write(tmp_path, "e.ogg", data + bytes(2000) + ogg_page(b"", granule=44100 * 2)))
+    assert meta[:4] == ("Ogg Song", "Band", "Record", 2000)
+
+    head = b"OpusHead" + bytes([1, 2]) + struct.pack("<H", 312) + struct.pack("<I", 48000) + bytes(3)
+    data = ogg_page(head) + ogg_page(b"OpusTags" + vorbis_comment({"TITLE": "Opus Song"}))
+    meta = read_metadata(write(tmp_path, "f.opus", data + ogg_page(b"", granule=48000 * 4 + 312)))
+    assert (meta.title, meta.duration_ms) == ("Opus Song", 4000)
+
+
+def test_wav_info_chunk_and_duration(tmp_path):
+    info = b"INFO"
+    for key, value in ((b"INAM", "Wave Song"), (b"IART", "Singer"), (b"IPRD", "Demo")):
+        value = value.encode() + b"\0"
+        info += key + struct.pack("<I", len(value)) + value + b"\0" * (len(value) & 1)
+    fmt = struct.pack("<HHIIHH", 1, 1, 8000, 16000, 2, 16)
+    samples = bytes(16000 * 2)  # two seconds
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"LIST" + struct.pack("<I", len(info)) + info
+            + b"data" + struct.pack("<I", len(samples)) + samples)
+    meta = read_metadata(write(tmp_path, "g.wav", b"RIFF" + struct.pack("<I", len(body)) + body))
+    assert meta == TrackMeta("Wave Song", "Singer", "Demo", 2000, 128)
+
+
+def test_unknown_and_truncated_files_give_none(tmp_path):
+    assert read_metadata(write(tmp_path, "h.txt", b"not audio at all")) is None
+    assert read_metadata(write(tmp_path, "i.flac", b"fLaC\x84\x00\x00\x10abc")) is None
+    assert read_metadata(str(tmp_path / "missing.mp3")) is None
+
+
+def test_unchanged_files_are_skipped_on_the_next_scan(tmp_path):
+    paths = [
+        write(tmp_path, "1.mp3", id3v2(3, [(b"TIT2", "One")]) + FRAME * 3),
+        write(tmp_path, "2.mp3", id3v2(3, [(b"TIT2", "Two")]) + FRAME * 3),
+        write(tmp_path, "3.txt", b"unparseable"),
+    ]
+    library = LibraryDB(str(tmp_path / "library.db"))
+    try:
+        playlist = Playlist(library)
+        playlist.add(paths)
+
+        results = scan_batch(library.tag_jobs(playlist.tracks))
+        assert [(track_id, meta and meta.title) for track_id, _, _, meta in results] == [(0, "One"), (1, "Two"), (2, None)]
+        library.save_tags(results)
+
+        # unparseable files are cached too, so nothing is read again
+        assert scan_batch(library.tag_jobs(playlist.tracks)) == []
+        assert library.tag_jobs(playlist.tracks, missing_only=True) == []
+
+        with open(paths[1], "ab") as f:
+            f.write(FRAME)
+        results = scan_batch(library.tag_jobs(playlist.tracks))
+        assert [(track_id, meta.title) for track_id, _, _, meta in results] == [(1, "Two")]
+    finally:
+        library.close()
@@ -0,0 +1,63 @@
+from player_core import NullBackend, Playlist, PlayerController
+
+# even tracks are "rock", odd ones "jazz", so a filter keeps half of them
+PATHS = [f"/music/{i:02d} {'rock' if i % 2 == 0 else 'jazz'}.mp3" for i in range(40)]
+
+
+def shuffled_player(seed=7):
+    playlist = Playlist()
+    playlist.add(PATHS)
+    playlist.filter("")
+    player = PlayerController(playlist, NullBackend())
+    player.queue.seed = seed
+    player.queue.set_shuffle(True)
+    player.queue.set_repeat("off")
+    return playlist, player
+
+
+def play(player, count):
+    played = []
+    for _ in range(count):
+        if not player.next():
+            break
+        played.append(player.current_index)
+    return played
+
+
+def test_filter_changes_keep_the_shuffle_round():
+    playlist, player = shuffled_player()
+    assert player.load(0)
+    heard = [0] + play(player, 9)
+
+    playlist.filter("rock")
+    heard += play(player, 3)
+    playlist.filter("")
+    heard += play(player, 100)
+
+    assert len(heard) == len(PATHS)
+    assert sorted(heard) == list(range(len(PATHS)))
+
+
+def test_every_keystroke_keeps_the_round():
+    playlist, player = shuffled_player(seed=3)
+    assert player.load(5)
+    heard = [5]
+    for text in ("", "r", "ro", "roc", "rock", "roc", "r", "") * 3:
+        playlist.filter(text)
+        heard += play(player, 1)
+    assert len(heard) == len(set(heard))
+
+
+def test_previous_walks_back_through_tracks_heard_before_the_filter():
+    playlist, player = shuffled_player(seed=11)
+    assert player.load(2)
+    heard = [2] + play(player, 12)
+
+    assert heard[-1] % 2 == 0  # the playing track is still shown
+
+    playlist.filter("rock")
+    rock = [track_id for track_id in heard[:-1] if track_id % 2 == 0]
+    backwards = []
+    while player.prev():
+        backwards.append(player.current_index)
+    assert backwards == rock[::-1]
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from player_core import Playlist
+from playlist_io import read_playlist, write_playlist
+
+
+def write_m3u(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n" + "".join(entry + "\n" for entry in entries))
+
+
+def test_reimport_resolves_known_paths_instead_of_appending(tmp_path):
+    playlist_file = str(tmp_path / "mix.m3u8")
+    write_m3u(playlist_file, ["a/one.mp3", "a/two.mp3", "b/one.mp3", "a/one.mp3"])
+    playlist = Playlist()
+    for batch in read_playlist(playlist_file):
+        playlist.add(batch, skip_known=True)
+    assert len(playlist) == 3  # the repeated entry is one track
+
+    for batch in read_playlist(playlist_file):
+        assert not playlist.add(batch, skip_known=True)
+    assert len(playlist) == 3
+    assert playlist.tracks.find(str(tmp_path / "b" / "one.mp3")) == 2
+
+
+def test_tracks_added_after_a_lookup_are_found(tmp_path):
+    playlist = Playlist()
+    playlist.add(["/music/a/one.mp3"])
+    assert playlist.tracks.find("/music/a/two.mp3") is None
+    playlist.add(["/music/a/two.mp3", "/music/c/three.mp3"])
+    assert playlist.tracks.find("/music/a/two.mp3") == 1
+    assert playlist.tracks.find("/music/c/three.mp3") == 2
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    def tracks():
+        yield "/music/one.mp3", None, None
+        raise RuntimeError("library closed")
+
+    target = tmp_path / "out.m3u"
+    with pytest.raises(RuntimeError):
+        write_playlist(str(target), tracks())
+    assert os.listdir(tmp_path) == []
+
+
+def test_round_trip_keeps_order(tmp_path):
+    paths = ["/music/a/one.mp3", "/music/b/two words.flac"]
+    for ext in (".m3u8", ".pls", ".xspf"):
+        target = str(tmp_path / ("out" + ext))
+        assert write_playlist(target, ((p, None, None) for p in paths)) == 2
+        assert [p for batch in read_playlist(target) for p in batch] == paths
@@ -0,0 +1,61 @@
+from playback_clock import PlaybackClock, ProgressDisplay, ProgressUpdater
+from player_core import TimeLabel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(length=240_000, backend_pos=0):
+    now = FakeClock()
+    clock = PlaybackClock(resync_interval=5.0, clock=now)
+    clock.length = length
+    clock.sync(0, True)
+    time_label = TimeLabel()
+    time_label.set_length(length)
+    shown = {"positions": [], "texts": [], "tells": 0}
+
+    def tell():
+        shown["tells"] += 1
+        return backend_pos
+
+    updater = ProgressUpdater(clock, ProgressDisplay(), time_label, tell, shown["positions"].append, shown["texts"].append)
+    return updater, now, shown
+
+
+def test_tick_redraws_only_what_changed():
+    updater, now, shown = make()
+    assert updater.tick(240)  # 1 px a second
+    now.now = 0.3
+    assert updater.tick(240)
+    now.now = 1.0
+    assert updater.tick(240)
+    assert shown["positions"] == [0, 1000]
+    assert shown["texts"] == ["00:00 / 04:00", "00:01 / 04:00"]
+
+
+def test_tick_resyncs_from_the_backend_after_the_interval():
+    updater, now, shown = make(backend_pos=4_000)
+    now.now = 4.9
+    updater.tick(240)
+    assert shown["tells"] == 0
+    now.now = 5.0
+    updater.tick(240)
+    assert shown["tells"] == 1
+    assert updater.clock.position() == 4_000
+
+
+def test_no_ticks_or_wakeups_when_stopped_or_dragging():
+    updater, now, shown = make()
+    assert updater.next_in(240) == 1001
+    updater.tick(240, dragging=True)
+    assert shown["positions"] == [] and shown["texts"] == ["00:00 / 04:00"]
+    assert updater.next_in(240, dragging=True) is None
+    updater.clock.sync(0, False)
+    assert not updater.tick(240)
+    updater.clock.length = 0
+    assert updater.next_in(240) is None
@@ -0,0 +1,52 @@
+from player_core import NullBackend, Playlist, PlayerController
+from row_map import RowMap
+
+# the same file name in three folders: basename lookups cannot tell them apart
+PATHS = [
+    "/music/a/song.mp3",
+    "/music/b/song.mp3",
+    "/music/c/song.mp3",
+    "/music/a/other.mp3",
+]
+
+
+def test_unfiltered_view_maps_rows_to_ids():
+    view = RowMap(range(4))
+    assert [view.track_at(row) for row in range(4)] == [0, 1, 2, 3]
+    assert view.row_of(2) == 2
+    assert view.row_of(7) == -1
+
+
+def test_filtered_view_maps_duplicate_basenames_to_their_own_rows():
+    view = RowMap([3, 2, 0])
+    assert view.row_of(2) == 1
+    assert view.row_of(0) == 2
+    assert view.row_of(1) == -1
+    assert view.row_of(1, default=None) is None
+
+
+def test_next_and_prev_step_through_duplicate_basenames():
+    playlist = Playlist()
+    playlist.add(PATHS)
+    playlist.filter("song")
+    player = PlayerController(playlist, NullBackend())
+    player.queue.set_repeat("off")
+
+    assert player.load(0)
+    assert player.next()
+    assert player.current_index == 1
+    assert player.next()
+    assert player.current_index == 2
+    assert not player.next()  # the end of the filtered view
+    assert player.prev()
+    assert player.current_index == 1
+    assert playlist.path(player.current_index) == "/music/b/song.mp3"
+
+
+def test_selection_follows_the_track_not_its_name():
+    playlist = Playlist()
+    playlist.add(PATHS)
+    view = playlist.filter("song")
+    assert view.row_of(2) == 2
+    view = playlist.filter("")
+    assert view.track_at(view.row_of(1)) == 1
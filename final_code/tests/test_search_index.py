@@ -0,0 +1,106 @@
+import threading
+import time
+
+from row_map import RangeWithout, RowMap
+from search_index import Indexer, SearchIndex
+
+NAMES = ["Midnight Fire.mp3", "Neon Rain.flac", "ghost.ogg", "M.mp3", "Rain On Me.mp3", "x"]
+
+
+def scan(names, query, removed=()):
+    return [i for i, name in enumerate(names) if query.lower() in name.lower() and i not in removed]
+
+
+def built_index(names, indexed=None):
+    index = SearchIndex()
+    index.extend(names[:indexed])
+    index.index_pending()
+    index.extend(names[len(names[:indexed]):])
+    return index
+
+
+def test_short_and_long_queries_match_a_scan():
+    for indexed in (None, 3):
+        index = built_index(NAMES, indexed)
+        for query in ("m", "M", "mp", "on", "rain", "n r", "mp3", "x", "q", "zz", "fire.mp3"):
+            assert list(index.search(query)) == scan(NAMES, query), (query, indexed)
+
+
+def test_typing_narrows_with_removed_tracks():
+    index = built_index(NAMES)
+    index.remove(0)
+    index.remove(4)
+    for query in ("", "r", "ra", "rai", "rain"):
+        assert list(index.search(query)) == scan(NAMES, query, {0, 4}), query
+
+
+def test_results_do_not_change_as_more_names_are_indexed():
+    index = built_index(NAMES)
+    result = index.search("m")
+    expected = list(result)
+    index.extend(["more music.mp3"])
+    index.index_pending()
+    assert list(result) == expected
+    assert list(index.search("m")) == scan(NAMES + ["more music.mp3"], "m")
+
+
+def test_empty_query_without_removed_tracks_is_a_range():
+    index = built_index(NAMES)
+    assert index.search("") == range(len(NAMES))
+    index.remove(2)
+    assert isinstance(index.search(""), RangeWithout)
+
+
+def test_range_without_behaves_like_the_list_it_stands_for():
+    removed = {0, 3, 4, 9}
+    rows = RangeWithout(10, removed | {12})
+    expected = [i for i in range(10) if i not in removed]
+    assert len(rows) == len(expected)
+    assert list(rows) == expected
+    assert [rows[row] for row in range(len(rows))] == expected
+    assert rows[-1] == expected[-1]
+    assert rows[1:4] == expected[1:4]
+    view = RowMap(rows)
+    for track_id in range(12):
+        assert view.row_of(track_id) == (expected.index(track_id) if track_id in expected else -1)
+
+
+def test_names_added_while_another_thread_builds_are_indexed():
+    index = SearchIndex()
+    index.extend(["first.mp3"])
+    build = index._build_pending
+
+    def build_then_add():
+        build()
+        if len(index.names(0, 10)) == 1:
+            # another caller adds a batch; the build lock is held, so its index_pending returns at once
+            index.extend(["late.mp3"])
+            index.index_pending()
+
+    index._build_pending = build_then_add
+    index.index_pending()
+    assert index._indexed == 2
+
+
+def test_indexer_thread_is_reused_and_runs_after_every_wake():
+    threads = set()
+    done = threading.Event()
+
+    def build():
+        threads.add(threading.current_thread())
+        done.set()
+
+    indexer = Indexer(build, "test-index")
+    for _ in range(3):
+        done.clear()
+        indexer.wake()
+        assert done.wait(5)
+    assert len(threads) == 1
+
+    index = SearchIndex()
+    index.extend(f"track {i}.mp3" for i in range(5000))
+    index.index_in_background()
+    deadline = time.monotonic() + 10
+    while index._indexed < 5000 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index._indexed == 5000
@@ -0,0 +1,76 @@
+from playback_clock import SeekCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(settle=0.15):
+    clock = FakeClock()
+    seeks = []
+    return SeekCoalescer(seeks.append, settle=settle, clock=clock), seeks, clock
+
+
+def test_first_drag_position_seeks_at_once():
+    seeker, seeks, _ = make()
+    seeker.begin()
+    assert seeker.drag(1_000) == 0
+    assert seeks == [1_000]
+
+
+def test_drags_while_a_seek_settles_keep_only_the_latest():
+    seeker, seeks, clock = make()
+    seeker.begin()
+    seeker.drag(1_000)
+    clock.now = 0.05
+    wait = seeker.drag(2_000)
+    assert 100 <= wait <= 101  # ms left of the settle time, rounded up
+    seeker.drag(3_000)
+    assert seeks == [1_000]
+    assert seeker.pending == 3_000
+
+
+def test_flush_waits_for_the_settle_time_then_seeks_the_pending_position():
+    seeker, seeks, clock = make()
+    seeker.begin()
+    seeker.drag(1_000)
+    seeker.drag(2_000)
+    clock.now = 0.1
+    assert seeker.flush() > 0
+    assert seeks == [1_000]
+    clock.now = 0.15
+    assert seeker.flush() == 0
+    assert seeks == [1_000, 2_000]
+    assert seeker.flush() == 0  # nothing pending: no seek
+    assert seeks == [1_000, 2_000]
+
+
+def test_release_seeks_unless_the_drag_already_went_there():
+    seeker, seeks, clock = make()
+    seeker.begin()
+    seeker.drag(1_000)
+    seeker.release(1_000)
+    assert seeks == [1_000]
+
+    seeker.begin()
+    clock.now = 0.05
+    seeker.drag(4_000)  # still settling: pending
+    seeker.release(5_000)
+    assert seeks == [1_000, 5_000]
+    assert seeker.pending is None
+
+
+def test_plain_click_is_one_seek_even_while_settling():
+    seeker, seeks, clock = make()
+    seeker.begin()
+    seeker.drag(1_000)
+    seeker.release(1_000)
+    seeker.begin()
+    seeker.drag(8_000)  # pending: the first seek has not settled
+    seeker.release(8_000)
+    assert seeks == [1_000, 8_000]
+    assert seeker.stats() == {"drag_events": 2, "seeks": 2}
@@ -0,0 +1,68 @@
+import player_core
+from player_core import CACHED_SECONDS, TimeLabel, format_time
+
+
+def test_minutes_and_seconds_below_an_hour():
+    assert format_time(0) == "00:00"
+    assert format_time(999) == "00:00"
+    assert format_time(61_500) == "01:01"
+    assert format_time(3_599_999) == "59:59"
+
+
+def test_hours_from_an_hour_up():
+    assert format_time(3_600_000) == "1:00:00"
+    assert format_time(3_723_000) == "1:02:03"
+    assert format_time(10 * 3_600_000 + 5_000) == "10:00:05"
+
+
+def test_none_negative_and_float_input():
+    assert format_time(None) == "00:00"
+    assert format_time(-5_000) == "00:00"
+    assert format_time(90_000.7) == "01:30"
+
+
+def test_only_the_first_hours_are_cached():
+    format_time(3_723_000)
+    assert player_core._formatted[3723] == "1:02:03"
+    beyond = CACHED_SECONDS + 5
+    assert format_time(beyond * 1000) == "2:00:05"
+    assert beyond not in player_core._formatted
+    # a cached string is the same object every time: no formatting on the hot path
+    assert format_time(61_000) is format_time(61_999)
+
+
+def test_label_updates_once_per_second():
+    label = TimeLabel()
+    label.set_length(3_725_000)
+    assert label.text(0) == "00:00 / 1:02:05"
+    assert label.text(400) is None
+    assert label.text(999) is None
+    assert label.text(1_000) == "00:01 / 1:02:05"
+    assert label.text(3_600_000) == "1:00:00 / 1:02:05"
+    assert (label.calls, label.updates) == (5, 3)
+
+
+def test_a_new_length_redraws_the_same_second():
+    label = TimeLabel()
+    label.set_length(60_000)
+    assert label.text(500) == "00:00 / 01:00"
+    label.set_length(120_000)
+    assert label.text(500) == "00:00 / 02:00"
+
+
+def test_none_and_negative_positions_show_zero():
+    label = TimeLabel()
+    label.set_length(None)
+    assert label.text(None) == "00:00 / 00:00"
+    assert label.text(-300) is None  # still second 0
+
+
+def test_set_label_is_skipped_while_the_text_is_unchanged():
+    set_label_calls = []
+    label = TimeLabel()
+    label.set_length(180_000)
+    for position in range(0, 3_000, 100):  # a 100 ms timer over three seconds
+        text = label.text(position)
+        if text is not None:
+            set_label_calls.append(text)
+    assert set_label_calls == ["00:00 / 03:00", "00:01 / 03:00", "00:02 / 03:00"]
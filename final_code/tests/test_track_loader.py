@@ -0,0 +1,62 @@
+import io
+import threading
+
+from track_loader import TrackLoader, WarmPaths
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_warm_paths_expire_and_evict_the_least_recent():
+    clock = FakeClock()
+    warm = WarmPaths(2, ttl=60, clock=clock)
+    warm.add("a")
+    warm.add("b")
+    assert warm.hit("a")
+    warm.add("c")  # "b" was used least recently
+    assert "b" not in warm
+    assert "a" in warm and "c" in warm
+    clock.now = 61
+    assert not warm.hit("a")  # the OS may have dropped its pages by now
+    assert warm.stats() == {"warm": 1, "hits": 1, "misses": 1, "evictions": 1}
+
+
+def test_open_reads_the_head_without_keeping_it():
+    reads = []
+
+    class Recording(io.BytesIO):
+        def readinto(self, buffer):
+            count = super().readinto(buffer)
+            reads.append(count)
+            return count
+
+    def open_file(path, mode="rb"):
+        if path == "missing":
+            raise FileNotFoundError(2, "No such file or directory")
+        return Recording(bytes(1 << 20))
+
+    loader = TrackLoader(workers=1, head_bytes=300 << 10, open_file=open_file)
+    results = []
+    done = threading.Event()
+
+    def on_done(path, error):
+        results.append((path, error))
+        if len(results) == 3:
+            done.set()
+
+    loader.open("track", on_done)
+    loader.open("missing", on_done)
+    loader.open("track", on_done)  # warm now: not read again
+    assert done.wait(5)
+    loader.close()
+
+    assert results == [("track", None), ("missing", "No such file or directory"), ("track", None)]
+    assert sum(reads) == 300 << 10
+    assert loader.is_ready("track") and not loader.is_ready("missing")
+    stats = loader.stats()
+    assert (stats["opened"], stats["failed"], stats["warm"]) == (3, 1, 1)
@@ -0,0 +1,182 @@
+"""Opening tracks off the UI thread, with read-ahead of the ones coming next.
+
+MediaCtrl.Load has to run on the UI thread, and on a slow network mount
+its first open and read of a file can take seconds. ``TrackLoader`` makes
+that first contact on a thread pool instead: it opens the file and reads
+its head, which reports errors (missing file, permissions, a dead mount)
+without blocking and leaves the data in the OS cache, so the Load that
+follows is quick. The bytes themselves are thrown away; ``WarmPaths``
+only remembers which files were read lately, and for how long that is
+worth trusting the OS cache to still hold them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# the head is read through a buffer of this size, and nothing of it is kept
+READ_CHUNK = 256 << 10
+
+
+class WarmPaths:
+    """LRU of the paths read lately (path -> time read), at most ``max_paths``.
+
+    A path counts as warm for ``ttl`` seconds after it was read; after
+    that the OS may have dropped its pages, so it is read again.
+    """
+
+    def __init__(self, max_paths, ttl=120.0, clock=time.monotonic):
+        self.max_paths = max_paths
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._read_at = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, path):
+        with self._lock:
+            return self._is_warm(path)
+
+    def hit(self, path):
+        """True if ``path`` is warm, counted as a hit or a miss."""
+        with self._lock:
+            if not self._is_warm(path):
+                self.misses += 1
+                return False
+            self._read_at.move_to_end(path)
+            self.hits += 1
+            return True
+
+    def add(self, path):
+        with self._lock:
+            self._read_at.pop(path, None)
+            self._read_at[path] = self.clock()
+            while len(self._read_at) > self.max_paths:
+                self._read_at.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"warm": len(self._read_at), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    # -------------- helpers -----------------
+
+    def _is_warm(self, path):
+        read_at = self._read_at.get(path)
+        if read_at is None:
+            return False
+        if self.clock() - read_at > self.ttl:
+            del self._read_at[path]
+            return False
+        return True
+
+
+class TrackLoader:
+    """Reads track heads on background threads.
+
+    ``open(path, done)`` reads the head of the track about to play (unless
+    it is still warm) on a small pool and then calls ``done(path, error)``
+    from that pool thread, with ``error`` None on success; the GUI forwards
+    it with ``wx.CallAfter``. ``prefetch(paths)`` reads ahead the heads of
+    the tracks queued next on one more thread, in order; each call replaces
+    the previous list, so skipping through tracks never builds a backlog.
+    """
+
+    def __init__(self, workers=2, head_bytes=4 << 20, warm_paths=64, open_file=open):
+        self.workers = workers
+        self.head_bytes = head_bytes
+        self.warm = WarmPaths(warm_paths)
+        self._open_file = open_file
+        self._pool = None
+        self._cond = threading.Condition()
+        self._wanted = []
+        self._prefetch_thread = None
+        self._closed = False
+        self._lock = threading.Lock()  # guards the counters, bumped from several threads
+        self.opened = 0
+        self.prefetched = 0
+        self.failed = 0
+
+    def is_ready(self, path):
+        """True when ``path`` was read lately enough to be handed to the player without waiting on storage."""
+        return path in self.warm
+
+    def open(self, path, done):
+        if self._closed:
+            return
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="track-open")
+        self._pool.submit(self._open, path, done)
+
+    def prefetch(self, paths):
+        with self._cond:
+            if self._closed:
+                return
+            self._wanted = list(paths)
+            if self._prefetch_thread is None:
+                self._prefetch_thread = threading.Thread(target=self._run_prefetch, name="track-prefetch", daemon=True)
+                self._prefetch_thread.start()
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._wanted = []
+            self._cond.notify()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            stats = {"opened": self.opened, "prefetched": self.prefetched, "failed": self.failed}
+        stats.update(self.warm.stats())
+        return stats
+
+    # -------------- helpers -----------------
+
+    def _read_head(self, path):
+        """Read the head into a scratch buffer, only to fault it into the OS cache."""
+        buffer = bytearray(min(self.head_bytes, READ_CHUNK))
+        left = self.head_bytes
+        with self._open_file(path, "rb") as f:
+            while left > 0:
+                count = f.readinto(buffer if left >= len(buffer) else memoryview(buffer)[:left])
+                if not count:
+                    break
+                left -= count
+        self.warm.add(path)
+
+    def _open(self, path, done):
+        error = None
+        if not self.warm.hit(path):
+            try:
+                self._read_head(path)
+            except OSError as e:
+                error = e.strerror or str(e)
+        with self._lock:
+            self.opened += 1
+            if error is not None:
+                self.failed += 1
+        if not self._closed:
+            done(path, error)
+
+    def _run_prefetch(self):
+        while True:
+            with self._cond:
+                while not self._wanted and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._wanted.pop(0)
+            if path in self.warm:
+                continue
+            try:
+                self._read_head(path)
+                with self._lock:
+                    self.prefetched += 1
+            except OSError:
+                pass  # reported when (if) the track is opened to play
@@ -0,0 +1,161 @@
+import os
+import sys
+from array import array
+from itertools import accumulate, islice
+
+
+class TrackStore:
+    """Compact, column-oriented storage for the track library.
+
+    Instead of one full path string per track (plus a second basename
+    string for display), the store keeps:
+
+    - every directory once, in ``_dirs``, with ``_track_dirs`` holding the
+      directory number of each track
+    - all basenames UTF-8 encoded back to back in one ``bytearray``, with
+      ``_offsets[i]:_offsets[i + 1]`` marking track ``i``
+
+    Track ids are positions in the store and are never reused. Strings are
+    only rebuilt for the tracks that are actually shown or played.
+    """
+
+    def __init__(self):
+        self._dirs = []
+        self._dir_ids = {}
+        self._track_dirs = array("I")
+        self._names = bytearray()
+        self._offsets = array("Q", (0,))
+        self._reset_lookup()
+
+    def __len__(self):
+        return len(self._track_dirs)
+
+    def __getitem__(self, track_id):
+        return self.path(track_id)
+
+    def add(self, path):
+        """Store one path and return its track id."""
+        folder, name = os.path.split(path)
+        return self.add_entry(folder, name)
+
+    def add_entry(self, folder, name):
+        """Store a track already split into folder and basename."""
+        self._track_dirs.append(self._intern(folder))
+        # surrogatepass keeps undecodable file names round-tripping
+        self._names += name.encode("utf-8", "surrogatepass")
+        self._offsets.append(len(self._names))
+        return len(self._track_dirs) - 1
+
+    def extend(self, paths):
+        for path in paths:
+            self.add(path)
+
+    def extend_columns(self, folders, folder_numbers, names):
+        """Bulk-append tracks given column-wise.
+
+        Track ``i`` lives in ``folders[folder_numbers[i]]`` and is called
+        ``names[i]``. Everything runs in C-level loops, which is what makes
+        reloading a saved library fast.
+        """
+        dir_ids = [self._intern(folder) for folder in folders]
+        self._track_dirs.extend(map(dir_ids.__getitem__, folder_numbers))
+        encoded = [name.encode("utf-8", "surrogatepass") for name in names]
+        base = len(self._names)
+        self._names += b"".join(encoded)
+        self._offsets.extend(islice(accumulate(map(len, encoded), initial=base), 1, None))
+
+    def find(self, path):
+        """Track id of ``path`` if it is stored (the first, if stored twice), else None.
+
+        The first call groups track ids by folder, one pass at 4 bytes a
+        track; a folder's names are only decoded once a path in it is
+        looked up. Tracks added since the last call are picked up on the next.
+        """
+        return self.find_entry(*os.path.split(path))
+
+    def find_entry(self, folder, name):
+        """``find`` for a path already split into folder and basename."""
+        dir_id = self._dir_ids.get(folder)
+        if dir_id is None:
+            return None
+        if self._lookup_indexed < len(self._track_dirs):
+            self._index_new_tracks()
+        names = self._folder_names.get(dir_id)
+        if names is None:
+            names = {}
+            for track_id in self._folder_tracks.get(dir_id, ()):
+                names.setdefault(self.name(track_id), track_id)
+            self._folder_names[dir_id] = names
+        return names.get(name)
+
+    def names(self):
+        """Every basename, in track id order."""
+        bounds = zip(self._offsets, islice(self._offsets, 1, None))
+        if self._names.isascii():
+            # byte offsets are character offsets, so slice one decoded string
+            text = self._names.decode("ascii")
+            return [text[start:end] for start, end in bounds]
+        blob = self._names
+        return [blob[start:end].decode("utf-8", "surrogatepass") for start, end in bounds]
+
+    # -------------- snapshots -----------------
+
+    @staticmethod
+    def snapshot_format():
+        """Identifies the binary layout, so a snapshot from another machine is not misread."""
+        return f"{sys.byteorder}:{array('I').itemsize}:{array('Q').itemsize}"
+
+    def snapshot(self):
+        """The store's columns: the folder list and three byte strings."""
+        return list(self._dirs), self._track_dirs.tobytes(), self._offsets.tobytes(), bytes(self._names)
+
+    def load_snapshot(self, folders, track_dirs, offsets, names):
+        """Replace the contents with the columns from ``snapshot``."""
+        self._dirs = list(folders)
+        self._dir_ids = {folder: i for i, folder in enumerate(self._dirs)}
+        self._track_dirs = array("I")
+        self._track_dirs.frombytes(track_dirs)
+        self._offsets = array("Q")
+        self._offsets.frombytes(offsets)
+        self._names = bytearray(names)
+        self._reset_lookup()
+
+    def _intern(self, folder):
+        dir_id = self._dir_ids.get(folder)
+        if dir_id is None:
+            dir_id = self._dir_ids[folder] = len(self._dirs)
+            self._dirs.append(folder)
+        return dir_id
+
+    def name(self, track_id):
+        """Basename of a track, as shown in the playlist."""
+        if track_id < 0:
+            raise IndexError("track id out of range")
+        start, end = self._offsets[track_id], self._offsets[track_id + 1]
+        return self._names[start:end].decode("utf-8", "surrogatepass")
+
+    def folder(self, track_id):
+        return self._dirs[self._track_dirs[track_id]]
+
+    def path(self, track_id):
+        return os.path.join(self.folder(track_id), self.name(track_id))
+
+    # -------------- helpers -----------------
+
+    def _reset_lookup(self):
+        self._folder_tracks = {}  # dir number -> array of track ids, for ``find``
+        self._folder_names = {}  # dir number -> {name: track id}, for folders looked up so far
+        self._lookup_indexed = 0
+
+    def _index_new_tracks(self):
+        folder_tracks, folder_names = self._folder_tracks, self._folder_names
+        for track_id in range(self._lookup_indexed, len(self._track_dirs)):
+            dir_id = self._track_dirs[track_id]
+            ids = folder_tracks.get(dir_id)
+            if ids is None:
+                ids = folder_tracks[dir_id] = array("I")
+            ids.append(track_id)
+            names = folder_names.get(dir_id)
+            if names is not None:
+                names.setdefault(self.name(track_id), track_id)
+        self._lookup_indexed = len(self._track_dirs)
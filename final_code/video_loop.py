@@ -0,0 +1,41 @@
+"""The looping background video, with no polling and no wx in it.
+
+The frame forwards what changes whether the video can be seen (music
+paused or resumed, window minimized or restored) and the video's own
+end-of-media event; benchmarks drive the same class with a fake control.
+"""
+
+
+class VideoLoop:
+    """Plays ``media`` in a loop while ``wanted()`` is true, and keeps it paused otherwise.
+
+    ``media`` is a MediaCtrl, or anything with GetState, Play, Pause and
+    Seek; ``playing_state`` is its "playing" state. ``update`` plays or
+    pauses to match ``wanted()`` and is called whenever that may have
+    changed. ``restart`` rewinds once the video reached its end; the
+    frame calls it through wx.CallAfter, since some backends ignore Play()
+    from inside their own finished event.
+    """
+
+    def __init__(self, media, playing_state, wanted):
+        self.media = media
+        self.playing_state = playing_state
+        self.wanted = wanted
+
+    def update(self):
+        wanted = self.wanted()
+        try:
+            playing = self.media.GetState() == self.playing_state
+            if wanted and not playing:
+                self.media.Play()
+            elif playing and not wanted:
+                self.media.Pause()
+        except Exception:
+            pass
+
+    def restart(self):
+        try:
+            self.media.Seek(0)
+        except Exception:
+            pass
+        self.update()
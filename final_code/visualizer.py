@@ -0,0 +1,88 @@
+"""Spectrum visualizer drawn from the playing track's own PCM.
+
+Replaces decoding a decorative video: each frame asks a ``SpectrumFeed``
+for the block at the playback position and draws a few dozen bars from
+the levels it last finished. Reading and the FFT happen on the feed's
+thread, so a slow disk never holds up the UI; the bars lag by one frame.
+"""
+
+import wx
+
+from audio_analysis import SpectrumFeed
+
+
+class VisualizerPanel(wx.Panel):
+    """Double-buffered spectrum bars for the track that is playing.
+
+    ``position`` is a callable returning the playback position in ms.
+    Frames are capped at ``fps``; while the panel is not on screen
+    (hidden, minimized, zero-sized) a frame is skipped without asking
+    the feed for anything.
+    """
+
+    def __init__(self, parent, position, fps=30, bands=48):
+        super().__init__(parent)
+        # on_paint clears the buffer itself before the bars; a system erase as well would flash 30 times a second
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.position = position
+        self.fps = fps
+        self.feed = SpectrumFeed(bands)
+        self.has_track = False
+        self.running = False
+        self.frames = 0
+        self.skipped = 0
+        self.bar_brush = wx.Brush(wx.Colour(0, 255, 100))
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_frame, self.timer)
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+
+    def set_track(self, path):
+        self.has_track = bool(path)
+        self.feed.set_track(path)
+        self.Refresh(eraseBackground=False)
+
+    def set_running(self, running):
+        if running == self.running:
+            return
+        self.running = running
+        if running:
+            self.timer.Start(max(1, 1000 // self.fps))
+        else:
+            self.timer.Stop()
+
+    def on_frame(self, event):
+        width, height = self.GetClientSize()
+        if not self.has_track or not self.IsShownOnScreen() or width <= 0 or height <= 0:
+            self.skipped += 1
+            return
+        # draw what the feed has ready; the block asked for now is drawn next frame
+        self.feed.request(self.position())
+        self.frames += 1
+        self.Refresh(eraseBackground=False)
+
+    def on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        width, height = self.GetClientSize()
+        levels = self.feed.levels.tolist()
+        bar_width = width / len(levels)
+        rects = []
+        for i, level in enumerate(levels):
+            bar_height = int(level * height)
+            if bar_height:
+                rects.append((int(i * bar_width) + 1, height - bar_height, max(1, int(bar_width) - 2), bar_height))
+        if rects:
+            dc.SetPen(wx.TRANSPARENT_PEN)
+            dc.DrawRectangleList(rects, brushes=self.bar_brush)
+
+    def on_destroy(self, event):
+        if event.GetEventObject() is self:
+            self.timer.Stop()
+            self.feed.close()
+        event.Skip()
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped, "computed": self.feed.computed}
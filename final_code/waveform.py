@@ -0,0 +1,132 @@
+"""Waveform overviews for the seek bar, cached on disk.
+
+Each track's envelope (``audio_analysis.envelope``: peak and RMS of 1024
+slices, float16, 4 KiB) is computed once by streaming through the file,
+then saved as ``<content key>-<points>.npy`` in the cache folder. Later
+loads memory-map that file, so the overview is drawn without decoding
+anything.
+"""
+
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from audio_analysis import envelope, open_pcm
+
+ENVELOPE_POINTS = 1024
+# bytes hashed from each of the start, middle and end of a file
+KEY_SAMPLE_BYTES = 64 * 1024
+
+
+def content_key(path):
+    """Hash of a file's size and of 64 KiB from its start, middle and end.
+
+    Hashing whole files would read all of a long mix on every load. The
+    sampled key still follows a file through renames and moves, and
+    changes when it is re-encoded or its tags are rewritten.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest.update(size.to_bytes(8, "little"))
+        for offset in sorted({0, max(0, size // 2 - KEY_SAMPLE_BYTES // 2), max(0, size - KEY_SAMPLE_BYTES)}):
+            f.seek(offset)
+            digest.update(f.read(KEY_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+class EnvelopeCache:
+    """One ``.npy`` envelope per distinct file content, in ``folder``."""
+
+    def __init__(self, folder, points=ENVELOPE_POINTS):
+        self.folder = folder
+        self.points = points
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}-{self.points}.npy")
+
+    def get(self, path):
+        """The envelope of ``path``, from the cache or computed and stored; None if it cannot be decoded."""
+        cached = self.path_for(content_key(path))
+        try:
+            levels = np.load(cached, mmap_mode="r")
+        except (OSError, ValueError):
+            pass  # not cached yet, or a torn file from a crash
+        else:
+            if levels.shape == (self.points, 2):
+                self.hits += 1
+                return levels
+        reader = open_pcm(path)
+        if reader is None:
+            return None
+        try:
+            levels = envelope(reader, self.points)
+        finally:
+            reader.close()
+        self.misses += 1
+        self.store(cached, levels)
+        return levels
+
+    def store(self, cached, levels):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, levels)
+        os.replace(tmp, cached)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class EnvelopeLoader:
+    """Fetches envelopes from an ``EnvelopeCache`` on a background thread.
+
+    ``request(path)`` replaces any request that has not started yet, so
+    skipping through tracks only computes the one that is left showing.
+    ``deliver(path, levels)`` runs on the worker thread (``levels`` is None
+    for files that cannot be decoded); the GUI forwards it with
+    ``wx.CallAfter``.
+    """
+
+    def __init__(self, cache, deliver):
+        self.cache = cache
+        self._deliver = deliver
+        self._cond = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._thread = None
+
+    def request(self, path):
+        with self._cond:
+            if self._closed:
+                return
+            self._pending = path
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="waveforms", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path, self._pending = self._pending, None
+            try:
+                levels = self.cache.get(path)
+            except OSError:
+                levels = None
+            if not self._closed:
+                self._deliver(path, levels)
@@ -0,0 +1,166 @@
+import wx
+
+
+class WaveformSlider(wx.Panel):
+    """Progress bar that shows the track's waveform overview.
+
+    A drop-in for the horizontal ``wx.Slider`` it replaces: ``SetRange``,
+    ``SetValue``, ``GetValue``, and EVT_SLIDER (position in ``GetInt``)
+    while the user clicks or drags. The overview (``set_envelope``, peak
+    and RMS rows from ``waveform.EnvelopeCache``) is drawn into a played
+    and an unplayed bitmap once per envelope and size; moving the playhead
+    only repaints the strip it crossed, from those bitmaps.
+    """
+
+    PLAYED = (wx.Colour(0, 150, 60), wx.Colour(0, 255, 100))  # peak, RMS
+    UNPLAYED = (wx.Colour(35, 60, 45), wx.Colour(60, 110, 80))
+    PLAYHEAD = wx.Colour(200, 255, 220)
+
+    def __init__(self, parent, height=48):
+        super().__init__(parent, size=(-1, height))
+        self.SetMinSize((-1, height))
+        # the two bitmaps cover every pixel, so an erase would only blank the strip the playhead repaints
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.minimum = 0
+        self.maximum = 100
+        self.value = 0
+        self.levels = None
+        self.dragging = False
+        self._bitmaps = None  # (played, unplayed) for the current envelope and size
+
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_left_down)
+        self.Bind(wx.EVT_MOTION, self.on_motion)
+        self.Bind(wx.EVT_LEFT_UP, self.on_left_up)
+        self.Bind(wx.EVT_MOUSE_CAPTURE_LOST, self.on_capture_lost)
+
+    # -------------- wx.Slider interface -----------------
+
+    def SetRange(self, minimum, maximum):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum + 1)
+        self.value = min(max(self.value, self.minimum), self.maximum)
+        self.Refresh(eraseBackground=False)
+
+    def GetValue(self):
+        return self.value
+
+    def SetValue(self, value):
+        value = min(max(value, self.minimum), self.maximum)
+        old_x, new_x = self.x_of(self.value), self.x_of(value)
+        self.value = value
+        if old_x != new_x:
+            # one pixel either side for the playhead line
+            left = min(old_x, new_x) - 1
+            self.RefreshRect(wx.Rect(left, 0, abs(new_x - old_x) + 3, self.GetClientSize().height), False)
+
+    # -------------- overview -----------------
+
+    def set_envelope(self, levels):
+        """Show ``levels`` ((points, 2) peak/RMS array), or a plain groove for None."""
+        self.levels = levels.tolist() if levels is not None else None
+        self._bitmaps = None
+        self.Refresh(eraseBackground=False)
+
+    def x_of(self, value):
+        width = self.GetClientSize().width
+        return int((value - self.minimum) * width / (self.maximum - self.minimum))
+
+    def value_at(self, x):
+        width = max(1, self.GetClientSize().width)
+        x = min(max(x, 0), width)
+        return self.minimum + int((self.maximum - self.minimum) * x / width)
+
+    def columns(self, width):
+        """(peak, RMS) per pixel column: the loudest envelope point it covers."""
+        levels = self.levels
+        count = len(levels)
+        columns = []
+        for x in range(width):
+            start = x * count // width
+            covered = levels[start:max(start + 1, (x + 1) * count // width)]
+            columns.append((max(peak for peak, _ in covered), max(rms for _, rms in covered)))
+        return columns
+
+    def render(self, width, height):
+        if self.levels:
+            columns = self.columns(width)
+            # scaled to the loudest peak, so quiet masters still show their shape
+            loudest = max(peak for peak, _ in columns) or 1.0
+            middle = height // 2
+            scale = (middle - 1) / loudest
+            peaks = [(x, middle - int(peak * scale), 1, 2 * int(peak * scale) + 1) for x, (peak, _) in enumerate(columns)]
+            rms = [(x, middle - int(level * scale), 1, 2 * int(level * scale) + 1) for x, (_, level) in enumerate(columns)]
+        else:
+            peaks = []
+            rms = [(0, height // 2 - 2, width, 4)]
+
+        bitmaps = []
+        for peak_colour, rms_colour in (self.PLAYED, self.UNPLAYED):
+            bitmap = wx.Bitmap(width, height)
+            dc = wx.MemoryDC(bitmap)
+            dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+            dc.Clear()
+            dc.SetPen(wx.TRANSPARENT_PEN)
+            if peaks:
+                dc.DrawRectangleList(peaks, brushes=wx.Brush(peak_colour))
+            dc.DrawRectangleList(rms, brushes=wx.Brush(rms_colour))
+            dc.SelectObject(wx.NullBitmap)
+            bitmaps.append(bitmap)
+        return tuple(bitmaps)
+
+    def on_size(self, event):
+        self._bitmaps = None
+        self.Refresh(eraseBackground=False)
+        event.Skip()
+
+    def on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        width, height = self.GetClientSize()
+        if width <= 0 or height <= 0:
+            return
+        if self._bitmaps is None:
+            self._bitmaps = self.render(width, height)
+        played, unplayed = self._bitmaps
+        x = min(self.x_of(self.value), width - 1)
+        dc.DrawBitmap(unplayed, 0, 0)
+        if x > 0:
+            dc.SetClippingRegion(0, 0, x, height)
+            dc.DrawBitmap(played, 0, 0)
+            dc.DestroyClippingRegion()
+        dc.SetPen(wx.Pen(self.PLAYHEAD))
+        dc.DrawLine(x, 0, x, height)
+
+    # -------------- mouse -----------------
+
+    def on_left_down(self, event):
+        self.dragging = True
+        if not self.HasCapture():
+            self.CaptureMouse()
+        self.seek_to(event.GetX())
+        event.Skip()
+
+    def on_motion(self, event):
+        if self.dragging and event.LeftIsDown():
+            self.seek_to(event.GetX())
+        event.Skip()
+
+    def on_left_up(self, event):
+        self.dragging = False
+        if self.HasCapture():
+            self.ReleaseMouse()
+        event.Skip()
+
+    def on_capture_lost(self, event):
+        self.dragging = False
+
+    def seek_to(self, x):
+        value = self.value_at(x)
+        if value == self.value:
+            return
+        self.SetValue(value)
+        slider_event = wx.CommandEvent(wx.wxEVT_SLIDER, self.GetId())
+        slider_event.SetEventObject(self)
+        slider_event.SetInt(value)
+        self.GetEventHandler().ProcessEvent(slider_event)
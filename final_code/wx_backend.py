@@ -0,0 +1,50 @@
+import wx.media
+
+from player_core import PlaybackBackend
+
+
+class MediaCtrlBackend(PlaybackBackend):
+    """PlaybackBackend over the gapless decks; always drives the active one.
+
+    Loading is asynchronous: the frame calls ``PlayerController.start``
+    when the deck sends EVT_MEDIA_LOADED.
+    """
+
+    def __init__(self, decks):
+        self.decks = decks
+
+    def load(self, path):
+        return self.decks.active.Load(path)
+
+    def play(self):
+        self.decks.active.Play()
+
+    def pause(self):
+        self.decks.active.Pause()
+
+    def stop(self):
+        try:
+            self.decks.active.Stop()
+        except Exception:
+            pass
+
+    def seek(self, position):
+        try:
+            self.decks.active.Seek(position)
+        except Exception:
+            pass
+
+    def tell(self):
+        return self.decks.active.Tell()
+
+    def length(self):
+        return self.decks.active.Length()
+
+    def is_playing(self):
+        return self.decks.active.GetState() == wx.media.MEDIASTATE_PLAYING
+
+    def set_volume(self, volume):
+        try:
+            self.decks.active.SetVolume(volume)
+        except Exception:
+            pass